@@ -4,6 +4,15 @@ import time
 from faker import Faker
 from datetime import datetime, timedelta, timezone
 import json
+import asyncio
+import re
+import uuid
+from argparse import ArgumentParser
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
 
 # Initialize Faker instance
 fake = Faker()
@@ -23,6 +32,9 @@ ANOMALY_FILE_TYPE_MAPPING = {
     'Unexpected_Large_Rate_Flow': 'Analytics'
 }
 
+# Relative frequency of the anomaly types above
+ANOMALY_WEIGHTS = [1, 1, 0.5, 1, 1, 0.5, 0.5]
+
 # Compression and format options
 FILE_COMPRESSIONS = ['zip']
 FILE_FORMATS = ['JSON']
@@ -42,23 +54,22 @@ def generate_berlin_coordinates():
         "latitude": round(random.uniform(BERLIN_COORDS["lat_min"], BERLIN_COORDS["lat_max"]), 6),
         "tac": fake.random_number(digits=5, fix_len=True)
     }
-def create_anomaly_file():
+def generate_anomaly_payload():
     """
-        Generates and sends a simulated anomaly file to the API endpoint. The file's content
-        is based on random attributes and pre-defined anomaly types.
+        Generates a simulated anomaly file. The file's content is based on random attributes
+        and pre-defined anomaly types.
 
         The function:
         1. Selects a random anomaly type.
         2. Creates the corresponding event notification structure.
         3. Populates additional information based on the anomaly type.
-        4. Sends the generated file as a POST request to the API.
 
         Returns:
-            None
+            tuple: The anomaly type and the file payload for the API.
     """
     anomaly_type = random.choices(
         list(ANOMALY_FILE_TYPE_MAPPING.keys()),
-        weights=[1, 1, 0.5, 1, 1, 0.5, 0.5]
+        weights=ANOMALY_WEIGHTS
     )[0]
 
     file_data_type = ANOMALY_FILE_TYPE_MAPPING[anomaly_type]
@@ -273,12 +284,6 @@ def create_anomaly_file():
             ]
         }
 
-    # Validate that 'timeStampGen' is present and in the correct format
-    for notification in event_notification["eventNotifications"]:
-        if "timeStampGen" not in notification or not isinstance(notification["timeStampGen"], str):
-            print(f"ERROR: Missing or invalid 'timeStampGen' for subscription ID: {subscription_id}")
-        else:
-            print(f"'timeStampGen' is valid: {notification['timeStampGen']} for subscription ID: {subscription_id}")
     # Construct the payload with the event notification
     payload = {
         'fileDataType': file_data_type,
@@ -289,6 +294,32 @@ def create_anomaly_file():
         'fileCompression': random.choice(FILE_COMPRESSIONS),
         'fileFormat': random.choice(FILE_FORMATS)
     }
+    return anomaly_type, payload
+
+
+def create_anomaly_file():
+    """
+        Generates and sends a simulated anomaly file to the API endpoint. The file's content
+        is based on random attributes and pre-defined anomaly types.
+
+        The function:
+        1. Generates an anomaly file with generate_anomaly_payload.
+        2. Validates and prints it.
+        3. Sends the generated file as a POST request to the API.
+
+        Returns:
+            None
+    """
+    anomaly_type, payload = generate_anomaly_payload()
+    event_notification = payload['fileContent']
+    subscription_id = event_notification['subscriptionId']
+
+    # Validate that 'timeStampGen' is present and in the correct format
+    for notification in event_notification["eventNotifications"]:
+        if "timeStampGen" not in notification or not isinstance(notification["timeStampGen"], str):
+            print(f"ERROR: Missing or invalid 'timeStampGen' for subscription ID: {subscription_id}")
+        else:
+            print(f"'timeStampGen' is valid: {notification['timeStampGen']} for subscription ID: {subscription_id}")
 
     print(json.dumps(payload, indent=2))
     try:
@@ -303,9 +334,299 @@ def create_anomaly_file():
         print(f"An error occurred: {e}")
 
 
+# Placeholders for the fields a payload template fills in for every file
+TEMPLATE_FIELD_PATTERN = re.compile(r'"@@(\w+)@@"')
+
+
+def template_field(name):
+    return f"@@{name}@@"
+
+
+class PayloadTemplate:
+    """
+        A generated anomaly file serialized once, with placeholders for the fields that change
+        from file to file: the subscription ID, the timestamps and the SUPIs.
+
+        Rendering a file only joins the serialized parts with fresh values, which is much
+        cheaper than generating it with Faker and serializing it again.
+    """
+
+    def __init__(self, anomaly_type, payload):
+        """
+                Initializes the template.
+
+                Args:
+                    anomaly_type (str): The anomaly type of the payload.
+                    payload (dict): A payload from generate_anomaly_payload; it is modified.
+        """
+        self.anomaly_type = anomaly_type
+        ready_time = datetime.fromisoformat(payload['fileReadyTime'])
+        self.expiration_delta = datetime.fromisoformat(payload['fileExpirationTime']) - ready_time
+
+        payload['fileReadyTime'] = template_field('ready_time')
+        payload['fileExpirationTime'] = template_field('expiration_time')
+        event_notification = payload['fileContent']
+        event_notification['subscriptionId'] = template_field('subscription_id')
+        self.nested_supis = 0
+        for notification in event_notification['eventNotifications']:
+            notification['timeStampGen'] = template_field('ready_time')
+            notification['expiry'] = template_field('expiration_time')
+            for behaviour in notification['abnorBehavrs']:
+                behaviour['supis'] = [template_field('supi')]
+                for experience in behaviour.get('addtMeasInfo', {}).get('svcExps', []):
+                    experience['supis'] = [template_field('nested_supi')]
+                    self.nested_supis += 1
+
+        # Literal parts alternate with field names
+        parts = TEMPLATE_FIELD_PATTERN.split(json.dumps(payload, separators=(',', ':')))
+        self.literals = parts[0::2]
+        self.fields = parts[1::2]
+
+    def render(self, values):
+        """
+        Renders a file.
+
+        Args:
+            values (dict): The value of every field; values must not need JSON escaping.
+
+        Returns:
+            str: The JSON payload.
+        """
+        chunks = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            value = values[field]
+            if isinstance(value, list):
+                value = value.pop()
+            chunks.append(f'"{value}"')
+            chunks.append(literal)
+        return ''.join(chunks)
+
+
+class PayloadFactory:
+    """
+        Renders anomaly files from a seeded pool of templates.
+
+        The templates are generated like create_anomaly_file does, with the random generators
+        seeded, so a seed always gives the same pool. Every file picks a template and gets a new
+        subscription ID, the current time and SUPIs; the main SUPI is drawn from a shared pool
+        half of the time, so files correlate like the generated ones.
+    """
+
+    def __init__(self, templates=200, supis=5, seed=None):
+        """
+                Generates the template pool.
+
+                Args:
+                    templates (int): Number of templates in the pool.
+                    supis (int): Size of the shared SUPI pool.
+                    seed (int, optional): Seeds the templates and the values filled in.
+        """
+        random.seed(seed)
+        fake.seed_instance(seed)
+        self.random = random.Random(seed)
+        self.common_supis = [self.random_supi() for _ in range(supis)]
+        self.templates = [PayloadTemplate(*generate_anomaly_payload()) for _ in range(templates)]
+
+    def random_supi(self):
+        return f"imsi-{self.random.randrange(10 ** 14, 10 ** 15)}"
+
+    def render(self):
+        """
+        Renders the next file.
+
+        Returns:
+            tuple: The anomaly type and the JSON payload.
+        """
+        template = self.random.choice(self.templates)
+        ready_time = datetime.now(timezone.utc).replace(microsecond=0)
+        supi = self.random.choice(self.common_supis) if self.random.random() < 0.5 else self.random_supi()
+        values = {
+            'subscription_id': str(uuid.UUID(int=self.random.getrandbits(128), version=4)),
+            'ready_time': ready_time.isoformat(),
+            'expiration_time': (ready_time + template.expiration_delta).isoformat(),
+            'supi': supi,
+            'nested_supi': [self.random_supi() for _ in range(template.nested_supis)],
+        }
+        return template.anomaly_type, template.render(values)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class LoadReport:
+    """
+        Counts the requests of a load run and their latencies.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.files = 0
+        self.failed_requests = 0
+        self.failed_files = 0
+        self.errors = {}
+        self.latencies = []
+        # How late requests were sent compared to the schedule, in open-loop pacing
+        self.max_lag = 0.0
+
+    def record(self, files, latency, error=None):
+        self.requests += 1
+        self.latencies.append(latency)
+        if error is None:
+            self.files += files
+        else:
+            self.failed_requests += 1
+            self.failed_files += files
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def summary(self, seconds):
+        """
+        Returns the achieved rates, error counts and latency percentiles.
+
+        Args:
+            seconds (float): Duration of the run.
+
+        Returns:
+            dict: The report.
+        """
+        latencies = sorted(self.latencies)
+        return {
+            'seconds': round(seconds, 3),
+            'requests': self.requests,
+            'files_created': self.files,
+            'failed_requests': self.failed_requests,
+            'failed_files': self.failed_files,
+            'errors': self.errors,
+            'requests_per_second': round(self.requests / seconds, 1) if seconds else 0.0,
+            'files_per_second': round(self.files / seconds, 1) if seconds else 0.0,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.50) * 1000, 3),
+                'p95': round(percentile(latencies, 0.95) * 1000, 3),
+                'p99': round(percentile(latencies, 0.99) * 1000, 3),
+                'max': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            },
+            'max_lag_ms': round(self.max_lag * 1000, 3),
+        }
+
+
+async def send_files(session, url, bulk, payloads, report):
+    """
+        Posts one request, a single file to /files or several to /files/create_many, and
+        records its outcome.
+    """
+    body = f"[{','.join(payloads)}]" if bulk else payloads[0]
+    start = time.perf_counter()
+    error = None
+    try:
+        async with session.post(url, data=body, headers={'Content-Type': 'application/json'}) as response:
+            await response.read()
+            if response.status != 201:
+                error = f"HTTP {response.status}"
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        error = type(e).__name__
+    report.record(len(payloads), time.perf_counter() - start, error)
+
+
+async def run_load(args):
+    """
+        Sends anomaly files as fast as the target rate and concurrency allow.
+
+        Open-loop pacing sends a request every 1/rate seconds whether earlier ones were answered
+        or not, as long as fewer than concurrency requests are open; closed-loop pacing runs
+        concurrency senders that each send their next request once the previous one was
+        answered, capped at rate if one is given.
+
+        Args:
+            args (Namespace): The parsed command line arguments.
+
+        Returns:
+            dict: The report of the run.
+    """
+    factory = PayloadFactory(args.templates, args.supis, args.seed)
+    bulk = args.bulk_size > 1
+    url = f"{args.url.rstrip('/')}/files" + ('/create_many' if bulk else '')
+    total_requests = -(-args.files // args.bulk_size)
+    report = LoadReport()
+
+    def next_payloads(index):
+        files = min(args.bulk_size, args.files - index * args.bulk_size)
+        return [factory.render()[1] for _ in range(files)]
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        interval = 1 / args.rate if args.rate else 0.0
+
+        if args.pacing == 'open':
+            in_flight = asyncio.Semaphore(args.concurrency)
+            tasks = set()
+
+            async def send(payloads):
+                try:
+                    await send_files(session, url, bulk, payloads, report)
+                finally:
+                    in_flight.release()
+
+            for index in range(total_requests):
+                payloads = next_payloads(index)
+                due = start + index * interval
+                if due > loop.time():
+                    await asyncio.sleep(due - loop.time())
+                await in_flight.acquire()
+                if interval:
+                    report.max_lag = max(report.max_lag, loop.time() - due)
+                task = asyncio.create_task(send(payloads))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        else:
+            next_index = 0
+
+            async def sender():
+                nonlocal next_index
+                while next_index < total_requests:
+                    index = next_index
+                    next_index += 1
+                    due = start + index * interval
+                    if due > loop.time():
+                        await asyncio.sleep(due - loop.time())
+                    await send_files(session, url, bulk, next_payloads(index), report)
+
+            await asyncio.gather(*(sender() for _ in range(args.concurrency)))
+
+        return report.summary(loop.time() - start)
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser(description="Generates simulated anomaly files and sends them to the File Data "
+                                        "Reporting API. Without --load, sends 10 files 15 seconds apart.")
+    parser.add_argument('--load', action='store_true',
+                        help="high-rate mode: render files from a template pool and send them asynchronously")
+    parser.add_argument('--url', default=API_BASE_URL, help="base URL of the File Data Reporting API")
+    parser.add_argument('--files', type=int, default=10000, help="number of files to send")
+    parser.add_argument('--rate', type=float, default=0,
+                        help="target requests per second, 0 sends as fast as concurrency allows")
+    parser.add_argument('--concurrency', type=int, default=64, help="maximum number of open requests")
+    parser.add_argument('--pacing', choices=['open', 'closed'], default='open')
+    parser.add_argument('--bulk-size', type=int, default=1,
+                        help="files per request, more than 1 sends them to /files/create_many")
+    parser.add_argument('--templates', type=int, default=200, help="size of the payload template pool")
+    parser.add_argument('--supis', type=int, default=5, help="size of the shared SUPI pool")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=30, help="seconds until a request fails")
+    return parser
+
+
 def main():
     """
-        Main function to generate and send anomaly files at regular intervals.
+        Main function to generate and send anomaly files at regular intervals, or at high rate
+        with --load.
 
         The function:
         1. Sets the number of files to generate.
@@ -314,6 +635,13 @@ def main():
         Returns:
             None
     """
+    args = argparser().parse_args()
+    if args.load:
+        if aiohttp is None:
+            raise SystemExit("--load requires aiohttp, install it with pip install aiohttp")
+        print(json.dumps(asyncio.run(run_load(args)), indent=2))
+        return
+
     num_files = 10  # Adjust as needed
     time_interval = 15  # Adjust as needed
 
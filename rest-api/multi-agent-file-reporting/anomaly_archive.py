@@ -0,0 +1,245 @@
+import asyncio
+import gzip
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+from anomaly_store import TIMESTAMP_FIELD
+from correlation_event import to_utc
+from serialization import dumps
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The fields of a stored event that are archived: the event itself and its correlations
+ARCHIVED_FIELDS = ("_id", "eventNotifications", "correlation_data")
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def compact_document(document, fields=ARCHIVED_FIELDS):
+    """
+    Returns the archived form of a stored event.
+
+    Args:
+        document (dict): The stored event.
+        fields (tuple, optional): The top-level fields to keep. None keeps the whole event.
+
+    Returns:
+        dict: The event to archive.
+    """
+    if fields is None:
+        return document
+    return {field: document[field] for field in fields if field in document}
+
+
+def generated_at(document):
+    """Returns the timeStampGen of an event as UTC datetime."""
+    return to_utc(document["eventNotifications"][0]["timeStampGen"])
+
+
+class MongoAnomalyArchive:
+    """
+        Archives events to a MongoDB collection of their own, outside the working set of the
+        anomalies collection Hermes queries.
+    """
+
+    def __init__(self, mongo_uri="mongodb://localhost:27017", db_name="anomaly_data",
+                 collection_name="anomalies_archive"):
+        """
+                Initializes the archive.
+
+                Args:
+                    mongo_uri (str): The MongoDB connection URI.
+                    db_name (str): The MongoDB database name.
+                    collection_name (str): The collection holding the archived events.
+        """
+        self.client = AsyncIOMotorClient(mongo_uri)
+        self.collection = self.client[db_name][collection_name]
+
+    async def ensure_indexes(self):
+        """Creates the timeStampGen index of the archive."""
+        await self.collection.create_index([(TIMESTAMP_FIELD, ASCENDING)])
+
+    async def write(self, documents):
+        """
+        Archives a batch of events. Events archived before, e.g. by a run that was interrupted
+        before deleting them from the anomalies collection, are skipped.
+
+        Args:
+            documents (list[dict]): The events to archive.
+        """
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY_ERROR]
+            if errors:
+                raise
+
+    def close(self):
+        self.client.close()
+
+
+class NdjsonAnomalyArchive:
+    """
+        Archives events to gzip-compressed NDJSON files in a local directory, one file per UTC
+        day of their timeStampGen, e.g. anomalies-2024-01-31.ndjson.gz.
+
+        Every write appends a gzip member, which gzip readers decompress as one stream. An event
+        may appear twice if a run was interrupted between archiving and deleting it.
+    """
+
+    def __init__(self, directory, prefix="anomalies", compresslevel=6):
+        """
+                Initializes the archive.
+
+                Args:
+                    directory (str): The directory of the archive files; it is created if missing.
+                    prefix (str): The prefix of the file names.
+                    compresslevel (int): The gzip compression level.
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.compresslevel = compresslevel
+
+    async def ensure_indexes(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, day):
+        """Returns the archive file of a UTC day."""
+        return os.path.join(self.directory, f"{self.prefix}-{day.isoformat()}.ndjson.gz")
+
+    def _append(self, documents):
+        by_day = {}
+        for document in documents:
+            by_day.setdefault(generated_at(document).date(), []).append(dumps(document))
+        for day, lines in by_day.items():
+            with gzip.open(self.path(day), "ab", compresslevel=self.compresslevel) as file:
+                file.write(b"\n".join(lines) + b"\n")
+
+    async def write(self, documents):
+        """
+        Archives a batch of events. Compression and file I/O run in a thread, outside the event loop.
+
+        Args:
+            documents (list[dict]): The events to archive.
+        """
+        await asyncio.to_thread(self._append, documents)
+
+    def close(self):
+        pass
+
+
+class AnomalyArchiver:
+    """
+        Moves events out of the anomalies collection once they left the hot window.
+
+        In the background, events generated more than hot_window ago are read in batches of
+        batch_size, oldest first, written to the archive and only then deleted from the store.
+        The anomalies collection therefore holds only the events correlation can still match.
+    """
+
+    def __init__(self, store, archive, hot_window, interval_seconds=60, batch_size=1000,
+                 archived_fields=ARCHIVED_FIELDS):
+        """
+                Initializes the archiver.
+
+                Args:
+                    store: The anomaly store, see MongoAnomalyStore.
+                    archive: Where events are moved to, a MongoAnomalyArchive or NdjsonAnomalyArchive.
+                    hot_window (timedelta or Callable[[], timedelta]): How long events stay in the store.
+                        A callable is evaluated on every run, e.g. to follow reloaded rules.
+                    interval_seconds (float): The time between two runs.
+                    batch_size (int): The number of events moved at once.
+                    archived_fields (tuple, optional): See compact_document.
+        """
+        self.store = store
+        self.archive = archive
+        self.hot_window = hot_window
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.archived_fields = archived_fields
+        self._task = None
+
+        # Counters
+        self.runs = 0
+        self.failed_runs = 0
+        self.archived_documents = 0
+        self.last_run_seconds = 0.0
+
+    def current_hot_window(self):
+        return self.hot_window() if callable(self.hot_window) else self.hot_window
+
+    async def start(self):
+        """Prepares the archive and starts the background task."""
+        await self.archive.ensure_indexes()
+        if self._task is None:
+            self._task = asyncio.create_task(self._archive_periodically())
+
+    async def stop(self):
+        """Stops the background task and closes the archive."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.archive.close()
+
+    async def _archive_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.archive_expired()
+
+    async def archive_expired(self, now=None):
+        """
+        Moves every event older than the hot window to the archive.
+
+        Args:
+            now (datetime, optional): The current time, defaults to the clock.
+
+        Returns:
+            int: The number of archived events.
+        """
+        start = datetime.now(timezone.utc)
+        before = (now or start) - self.current_hot_window()
+        archived = 0
+        try:
+            while True:
+                documents = await self.store.find_expired(before, self.batch_size)
+                if not documents:
+                    break
+                await self.archive.write([compact_document(document, self.archived_fields)
+                                          for document in documents])
+                await self.store.delete_ids([document["_id"] for document in documents])
+                archived += len(documents)
+                if len(documents) < self.batch_size:
+                    break
+        except Exception as e:
+            self.failed_runs += 1
+            logger.error(f"Failed to archive anomalies older than {before}: {e}")
+
+        self.runs += 1
+        self.archived_documents += archived
+        self.last_run_seconds = (datetime.now(timezone.utc) - start).total_seconds()
+        if archived:
+            logger.info(f"Archived {archived} anomalies older than {before}")
+        return archived
+
+    def stats(self):
+        """
+        Returns the archiver's counters.
+
+        Returns:
+            dict: Runs, failures, archived events and the current hot window.
+        """
+        return {
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "archived_documents": self.archived_documents,
+            "last_run_seconds": self.last_run_seconds,
+            "hot_window_seconds": self.current_hot_window() / timedelta(seconds=1),
+        }
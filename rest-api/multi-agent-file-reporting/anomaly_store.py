@@ -0,0 +1,307 @@
+import asyncio
+import copy
+import logging
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from correlation_event import CorrelationEvent, anomaly_type_id, to_utc
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FIELD = "eventNotifications.timeStampGen"
+SUPIS_FIELD = "eventNotifications.abnorBehavrs.supis"
+EXCEP_ID_FIELD = "eventNotifications.abnorBehavrs.excep.excepId"
+
+# The fields of a stored event CorrelationEvent.from_document reads
+CORRELATION_PROJECTION = {
+    TIMESTAMP_FIELD: 1,
+    SUPIS_FIELD: 1,
+    "eventNotifications.abnorBehavrs.excep": 1,
+    "eventNotifications.abnorBehavrs.confidence": 1,
+    "eventNotifications.abnorBehavrs.ratio": 1,
+    "eventNotifications.abnorBehavrs.addtMeasInfo.circums.locArea": 1,
+    "eventNotifications.abnorBehavrs.addtMeasInfo.nwPerfs.signalQuality": 1,
+}
+
+
+def candidates_filter(since, supis, anomaly_types):
+    """
+    Builds the filter of the events generated at or after since that share a UE ID with an
+    event and have one of the given anomaly types.
+
+    Args:
+        since (datetime): The oldest timeStampGen to match.
+        supis (Iterable[str]): The UE IDs of the event.
+        anomaly_types (Iterable[str]): The relevant excepIds.
+
+    Returns:
+        dict: The MongoDB filter.
+    """
+    return {
+        TIMESTAMP_FIELD: {"$gte": since},
+        SUPIS_FIELD: {"$in": sorted(supis)},
+        EXCEP_ID_FIELD: {"$in": sorted(anomaly_types)},
+    }
+
+
+def plan_stages(explain):
+    """
+    Returns the stages of the winning plan of an explain() result, e.g. ["FETCH", "IXSCAN"].
+
+    Args:
+        explain (dict): The output of explain().
+
+    Returns:
+        list[str]: The stages, outermost first.
+    """
+    stages = []
+    plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    # Newer servers wrap the classic plan of the query engine
+    plan = plan.get("queryPlan", plan)
+    pending = [plan]
+    while pending:
+        stage = pending.pop(0)
+        if "stage" in stage:
+            stages.append(stage["stage"])
+        if "inputStage" in stage:
+            pending.append(stage["inputStage"])
+        pending.extend(stage.get("inputStages", []))
+    return stages
+
+
+class MongoAnomalyStore:
+    """
+        Non-blocking access to the anomalies collection through motor, so database round-trips
+        never stall the event loop serving Hermes' requests.
+    """
+
+    def __init__(self, mongo_uri="mongodb://localhost:27017", db_name="anomaly_data", collection_name="anomalies",
+                 pool_size=100):
+        """
+                Initializes the store.
+
+                Args:
+                    mongo_uri (str): The MongoDB connection URI.
+                    db_name (str): The MongoDB database name.
+                    collection_name (str): The collection holding the anomalies.
+                    pool_size (int): The maximum number of pooled MongoDB connections.
+        """
+        self.pool_size = pool_size
+        self.client = AsyncIOMotorClient(mongo_uri, maxPoolSize=pool_size)
+        self.db = self.client[db_name]
+        self.collection = self.db[collection_name]
+
+    async def ensure_indexes(self, retention_seconds=None):
+        """
+        Creates the indexes Hermes' queries rely on, if they do not exist yet: timeStampGen,
+        the SUPIs (multikey) and the excepId of the events.
+
+        Args:
+            retention_seconds (float, optional): Turns the timeStampGen index into a TTL index,
+                so MongoDB deletes events this long after they were generated.
+        """
+        await self.collection.create_index([(SUPIS_FIELD, ASCENDING)])
+        await self.collection.create_index([(EXCEP_ID_FIELD, ASCENDING)])
+
+        options = {} if retention_seconds is None else {"expireAfterSeconds": int(retention_seconds)}
+        try:
+            await self.collection.create_index([(TIMESTAMP_FIELD, ASCENDING)], **options)
+        except OperationFailure as e:
+            # The index exists with another retention
+            if retention_seconds is None:
+                logger.warning(f"Keeping the existing retention of the {TIMESTAMP_FIELD} index: {e}")
+                return
+            await self.db.command("collMod", self.collection.name,
+                                  index={"keyPattern": {TIMESTAMP_FIELD: 1},
+                                         "expireAfterSeconds": int(retention_seconds)})
+        if retention_seconds is not None:
+            logger.info(f"Anomalies expire {retention_seconds} seconds after they were generated")
+
+    async def find_recent(self, since, projection=None):
+        """
+        Returns the events generated at or after the given time.
+
+        Args:
+            since (datetime): The oldest timeStampGen to return.
+            projection (dict, optional): The fields to return, e.g. CORRELATION_PROJECTION.
+
+        Returns:
+            list[dict]: The stored events.
+        """
+        cursor = self.collection.find({
+            "eventNotifications.timeStampGen": {
+                "$gte": since
+            }
+        }, projection)
+        return await cursor.to_list(length=None)
+
+    async def find_candidates(self, since, supis, anomaly_types, projection=CORRELATION_PROJECTION):
+        """
+        Returns the events generated at or after since that share a UE ID with an event and
+        have one of the given anomaly types. The conditions are evaluated by MongoDB, through
+        the indexes of ensure_indexes, and only the fields correlation needs are returned.
+
+        Args:
+            since (datetime): The oldest timeStampGen to return.
+            supis (Iterable[str]): The UE IDs of the event.
+            anomaly_types (Iterable[str]): The relevant excepIds.
+            projection (dict, optional): The fields to return.
+
+        Returns:
+            list[dict]: The stored events.
+        """
+        if not supis or not anomaly_types:
+            return []
+        cursor = self.collection.find(candidates_filter(since, supis, anomaly_types), projection)
+        return await cursor.to_list(length=None)
+
+    async def find_expired(self, before, limit):
+        """
+        Returns the oldest events generated before the given time, e.g. to archive them.
+
+        Args:
+            before (datetime): Events with an older timeStampGen are returned.
+            limit (int): The maximum number of events to return.
+
+        Returns:
+            list[dict]: The stored events, oldest first.
+        """
+        cursor = self.collection.find({TIMESTAMP_FIELD: {"$lt": before}}) \
+            .sort(TIMESTAMP_FIELD, ASCENDING).limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def delete_ids(self, ids):
+        """
+        Deletes events by _id.
+
+        Args:
+            ids (list): The _ids of the events.
+
+        Returns:
+            int: The number of deleted events.
+        """
+        result = await self.collection.delete_many({"_id": {"$in": list(ids)}})
+        return result.deleted_count
+
+    async def explain_find_candidates(self, since, supis, anomaly_types):
+        """Returns the explain() output of the find_candidates query."""
+        return await self.collection.find(candidates_filter(since, supis, anomaly_types),
+                                          CORRELATION_PROJECTION).explain()
+
+    async def explain_find_recent(self, since):
+        """Returns the explain() output of the find_recent query."""
+        return await self.collection.find({TIMESTAMP_FIELD: {"$gte": since}}, CORRELATION_PROJECTION).explain()
+
+    async def insert_one(self, document):
+        """Stores an event; the generated _id is set on the document."""
+        await self.collection.insert_one(document)
+
+    async def insert_many(self, documents):
+        """
+        Stores a batch of events in one round-trip. The write is unordered, so one failing
+        document does not stop the others from being inserted.
+
+        Args:
+            documents (list[dict]): The events to store.
+
+        Raises:
+            BulkWriteError: If some of the documents could not be written.
+        """
+        await self.collection.insert_many(documents, ordered=False)
+
+    def close(self):
+        self.client.close()
+
+
+class InMemoryAnomalyStore:
+    """
+        An in-process stand-in for MongoAnomalyStore, used to run Hermes without a database.
+
+        The connection pool is modelled by a semaphore of pool_size slots, each operation holding
+        a slot for latency_seconds, so concurrent throughput behaves like a pooled client.
+    """
+
+    def __init__(self, pool_size=100, latency_seconds=0.0):
+        """
+                Initializes an empty store.
+
+                Args:
+                    pool_size (int): The number of operations that may run at the same time.
+                    latency_seconds (float): The simulated round-trip time per operation.
+        """
+        self.pool_size = pool_size
+        self.latency_seconds = latency_seconds
+        self.documents = {}
+        self._pool = asyncio.Semaphore(pool_size)
+
+    async def _round_trip(self):
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+    async def ensure_indexes(self, retention_seconds=None):
+        pass
+
+    async def find_recent(self, since, projection=None):
+        async with self._pool:
+            await self._round_trip()
+            return [
+                copy.deepcopy(document) for document in self.documents.values()
+                if any(to_utc(notification["timeStampGen"]) >= since
+                       for notification in document.get("eventNotifications", []))
+            ]
+
+    async def find_candidates(self, since, supis, anomaly_types, projection=None):
+        async with self._pool:
+            await self._round_trip()
+            since = since.timestamp()
+            anomaly_types = {anomaly_type_id(anomaly_type) for anomaly_type in anomaly_types}
+            candidates = []
+            for document in self.documents.values():
+                record = CorrelationEvent.from_document(document)
+                if record.time >= since and record.type_id in anomaly_types and not record.supis.isdisjoint(supis):
+                    candidates.append(copy.deepcopy(document))
+            return candidates
+
+    async def find_expired(self, before, limit):
+        async with self._pool:
+            await self._round_trip()
+            before = before.timestamp()
+            expired = []
+            for document in self.documents.values():
+                times = [to_utc(notification["timeStampGen"]).timestamp()
+                         for notification in document.get("eventNotifications", [])]
+                if times and min(times) < before:
+                    expired.append((min(times), document))
+            expired.sort(key=lambda entry: entry[0])
+            return [copy.deepcopy(document) for _, document in expired[:limit]]
+
+    async def delete_ids(self, ids):
+        async with self._pool:
+            await self._round_trip()
+            return sum(self.documents.pop(_id, None) is not None for _id in ids)
+
+    async def insert_one(self, document):
+        async with self._pool:
+            await self._round_trip()
+            document.setdefault("_id", ObjectId())
+            if document["_id"] in self.documents:
+                raise DuplicateKeyError(f"E11000 duplicate key error: {document['_id']}")
+            self.documents[document["_id"]] = copy.deepcopy(document)
+
+    async def insert_many(self, documents):
+        async with self._pool:
+            await self._round_trip()
+            write_errors = []
+            for index, document in enumerate(documents):
+                document.setdefault("_id", ObjectId())
+                if document["_id"] in self.documents:
+                    write_errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"})
+                    continue
+                self.documents[document["_id"]] = copy.deepcopy(document)
+            if write_errors:
+                raise BulkWriteError({"writeErrors": write_errors, "nInserted": len(documents) - len(write_errors)})
+
+    def close(self):
+        pass
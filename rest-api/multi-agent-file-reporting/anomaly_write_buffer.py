@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from instrumentation import MONGO_INSERT
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AnomalyWriteBuffer:
+    """
+        A write-behind buffer in front of an anomaly store.
+
+        Events are collected in memory and written with one unordered insert_many once the buffer
+        reaches max_batch_size documents or its oldest document is max_latency_seconds old.
+        Every document gets its _id when it is buffered, so it can be referenced (e.g. by the
+        correlation window) before it reaches the database.
+    """
+
+    def __init__(self, store, max_batch_size=100, max_latency_seconds=0.2, max_buffered=10000, metrics=None):
+        """
+                Initializes the buffer.
+
+                Args:
+                    store: The anomaly store providing an async insert_many.
+                    max_batch_size (int): Number of buffered documents that triggers a flush.
+                    max_latency_seconds (float): Maximum time a document waits before it is flushed.
+                    max_buffered (int): Upper bound of buffered documents. Adding to a full buffer
+                        flushes it first; if the buffer is still full, the oldest document is dropped.
+                    metrics (Metrics, optional): Records the duration of every write as mongo_insert.
+        """
+        self.store = store
+        self.max_batch_size = max_batch_size
+        self.max_latency_seconds = max_latency_seconds
+        self.max_buffered = max(max_buffered, max_batch_size)
+        self.metrics = metrics
+
+        self._buffer = []
+        # Batches taken by a flush that is still writing them
+        self._in_flight = []
+        self._oldest_buffered_at = None
+        self._flush_tasks = set()
+        self._timer_task = None
+
+        # Counters
+        self.flushes = 0
+        self.documents_written = 0
+        self.failed_documents = 0
+        self.failed_flushes = 0
+        self.last_flush_size = 0
+        self.last_flush_latency_seconds = 0.0
+        self.total_flush_latency_seconds = 0.0
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def pending(self):
+        """
+        Returns the documents that were added but are not written yet, including those of
+        flushes still in progress, so readers of the store can take them into account.
+
+        Returns:
+            list[dict]: The pending documents.
+        """
+        return [document for batch in self._in_flight for document in batch] + self._buffer
+
+    async def start(self):
+        """Starts the background task flushing documents that reached the maximum latency."""
+        if self._timer_task is None:
+            self._timer_task = asyncio.create_task(self._flush_on_age())
+
+    async def stop(self):
+        """Stops the background task and flushes every buffered document."""
+        if self._timer_task is not None:
+            self._timer_task.cancel()
+            try:
+                await self._timer_task
+            except asyncio.CancelledError:
+                pass
+            self._timer_task = None
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        while self._buffer:
+            if not await self.flush():
+                logger.error(f"Dropping {len(self._buffer)} buffered anomalies on shutdown")
+                self.failed_documents += len(self._buffer)
+                self._buffer = []
+
+    async def add(self, document):
+        """
+        Buffers a document for writing.
+
+        Args:
+            document (dict): The event to store. An _id is assigned if it has none.
+        """
+        if len(self._buffer) >= self.max_buffered:
+            await self.flush()
+            if len(self._buffer) >= self.max_buffered:
+                logger.error("Anomaly write buffer full, dropping 1 oldest anomaly")
+                del self._buffer[0]
+                self.failed_documents += 1
+
+        document.setdefault("_id", ObjectId())
+        if not self._buffer:
+            self._oldest_buffered_at = time.monotonic()
+        self._buffer.append(document)
+
+        if len(self._buffer) >= self.max_batch_size:
+            task = asyncio.create_task(self.flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_on_age(self):
+        interval = self.max_latency_seconds / 2
+        while True:
+            await asyncio.sleep(interval)
+            if self._buffer and time.monotonic() - self._oldest_buffered_at >= self.max_latency_seconds:
+                await self.flush()
+
+    async def flush(self):
+        """
+        Writes the buffered documents with one unordered insert_many.
+
+        Documents rejected by the database (e.g. duplicate keys) are counted and dropped. If the
+        write fails as a whole, the batch is put back in front of the buffer for the next flush.
+
+        Returns:
+            bool: False if the whole batch could not be written.
+        """
+        # The batch is taken without awaiting, so concurrent flushes never share documents
+        batch = self._buffer[:self.max_batch_size]
+        if not batch:
+            return True
+        del self._buffer[:len(batch)]
+        self._oldest_buffered_at = time.monotonic() if self._buffer else None
+
+        start = time.perf_counter()
+        succeeded = True
+        self._in_flight.append(batch)
+        try:
+            await self.store.insert_many(batch)
+            self.documents_written += len(batch)
+        except BulkWriteError as e:
+            failed = len(e.details.get("writeErrors", []))
+            self.documents_written += len(batch) - failed
+            self.failed_documents += failed
+            logger.error(f"Failed to insert {failed} of {len(batch)} anomalies: {e}")
+        except Exception as e:
+            succeeded = False
+            self.failed_flushes += 1
+            logger.error(f"Failed to flush {len(batch)} anomalies: {e}")
+            self._buffer[:0] = batch
+            self._oldest_buffered_at = time.monotonic()
+            overflow = len(self._buffer) - self.max_buffered
+            if overflow > 0:
+                logger.error(f"Anomaly write buffer full, dropping {overflow} oldest anomalies")
+                del self._buffer[:overflow]
+                self.failed_documents += overflow
+        finally:
+            self._in_flight = [in_flight for in_flight in self._in_flight if in_flight is not batch]
+
+        latency = time.perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.observe(MONGO_INSERT, latency)
+        self.flushes += 1
+        self.last_flush_size = len(batch)
+        self.last_flush_latency_seconds = latency
+        self.total_flush_latency_seconds += latency
+        return succeeded
+
+    def stats(self):
+        """
+        Returns the buffer's counters.
+
+        Returns:
+            dict: Flush sizes, latencies and failure counts.
+        """
+        return {
+            "buffered": len(self._buffer),
+            "flushes": self.flushes,
+            "documents_written": self.documents_written,
+            "failed_documents": self.failed_documents,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_size": self.last_flush_size,
+            "last_flush_latency_seconds": self.last_flush_latency_seconds,
+            "average_flush_latency_seconds": self.total_flush_latency_seconds / self.flushes if self.flushes else 0.0,
+        }
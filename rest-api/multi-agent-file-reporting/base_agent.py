@@ -1,9 +1,19 @@
+import asyncio
 import logging
+import time
 import aiohttp
 import nest_asyncio
 import uvicorn
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Response
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
+from functools import partial
+from file_content_cache import FileContentCache
+from hermes_forwarder import HermesForwarder
+from instrumentation import (FILE_FETCH, FILTER, HERMES_FORWARD, IGNORED_FILES, JSON_DECODE, RELEVANT_FILES, REQUEST,
+                             Metrics)
+from serialization import FastJSONResponse, decode_file_info_list, dumps_str, loads
+from tracing import TRACEPARENT, Tracer, span_exporter_from_env
 
 # Apply nest_asyncio for compatibility with interactive environments
 nest_asyncio.apply()
@@ -12,12 +22,21 @@ nest_asyncio.apply()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maximum number of IDs the File Data Reporting service accepts per /files/retrieve_many request
+MAX_FILES_PER_RETRIEVAL = 1000
+
 class BaseExaminerAgent:
     """
         A base class for creating an examiner agent that handles file notifications, fetches file details,
         and forwards data to a Hermes agent for further processing.
     """
-    def __init__(self, host, port, file_types, hermes_agent_url):
+    # The excepIds the agent is interested in; when set, only files containing one of them are notified
+    RELEVANT_EXCEP_IDS = None
+
+    def __init__(self, host, port, file_types, hermes_agent_url, connection_limit=100, connection_limit_per_host=20,
+                 dns_cache_ttl=300, keepalive_timeout=60, max_concurrent_files=10, ack_first=False,
+                 queue_size=1000, worker_count=10, file_cache_max_bytes=64 * 1024 * 1024,
+                 file_cache_ttl_seconds=300, hermes_batch_size=100, hermes_linger_ms=5, span_exporter=None):
         """
                 Initializes the agent.
 
@@ -26,19 +45,136 @@ class BaseExaminerAgent:
                     port (int): Port number for the agent.
                     file_types (list[str] or str): Types of files to handle notifications for.
                     hermes_agent_url (str): URL for the Hermes agent to send data to.
+                    connection_limit (int): Maximum number of pooled HTTP connections.
+                    connection_limit_per_host (int): Maximum number of pooled HTTP connections per host.
+                    dns_cache_ttl (int): Seconds resolved host names are cached.
+                    keepalive_timeout (float): Seconds idle connections are kept open for reuse.
+                    max_concurrent_files (int): Maximum number of files of a notification processed at once.
+                    ack_first (bool): Acknowledge notifications right away and process their files in the
+                        background instead of before responding.
+                    queue_size (int): Maximum number of files waiting for processing in ack-first mode.
+                    worker_count (int): Number of background workers processing files in ack-first mode.
+                    file_cache_max_bytes (int): Upper bound of the size of the cached file contents.
+                    file_cache_ttl_seconds (float): Maximum time fetched file contents are cached.
+                    hermes_batch_size (int): Maximum number of events forwarded to Hermes in one request,
+                        see HermesForwarder. 1 posts every event on its own.
+                    hermes_linger_ms (float): Maximum time an event waits for others to join its batch.
+                    span_exporter (optional): Where the spans of traced files are exported, a
+                        FileSpanExporter or InMemorySpanCollector. Defaults to the file named by
+                        the TRACE_EXPORT_PATH environment variable, if set.
         """
         self.file_types = file_types if isinstance(file_types, list) else [file_types]
         self.hermes_agent_url = hermes_agent_url
         self.subscription_url = "http://localhost:8080/fileDataReportingMnS/v1/subscriptions/"
         self.host = host
         self.port = port
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+
+        # Shared HTTP session, opened and closed by the lifespan
+        self.session = None
+        self.max_concurrent_files = max_concurrent_files
+        self._file_semaphore = asyncio.Semaphore(max_concurrent_files)
+        # Files a background worker takes from the queue at once
+        self._worker_batch_size = max(1, min(max_concurrent_files, MAX_FILES_PER_RETRIEVAL))
+
+        # Ack-first mode: files queued by the handlers and drained by the workers
+        self.ack_first = ack_first
+        self.worker_count = worker_count
+        self._file_queue = asyncio.Queue(maxsize=queue_size)
+        self._workers = []
+
+        # Fetched files by fileLocation, shared by repeated and concurrent notifications
+        self.file_cache = FileContentCache(max_bytes=file_cache_max_bytes, ttl_seconds=file_cache_ttl_seconds)
+
+        # Per-stage latency histograms and counters, served by /metrics
+        self.metrics = Metrics(type(self).__name__)
+
+        # Spans of the files whose notification carries a traceparent; the trace continues at Hermes
+        self.tracer = Tracer(type(self).__name__,
+                             span_exporter if span_exporter is not None else span_exporter_from_env())
+
+        # Events for Hermes, posted in micro-batches to its batch endpoint
+        self.hermes_forwarder = None
+        if hermes_batch_size > 1:
+            self.hermes_forwarder = HermesForwarder(f"{hermes_agent_url.rstrip('/')}/batch",
+                                                    max_batch_size=hermes_batch_size, linger_ms=hermes_linger_ms,
+                                                    metrics=self.metrics)
 
         # FastAPI instance with lifespan setup
-        self.app = FastAPI(lifespan=self.lifespan_context)
+        self.app = FastAPI(lifespan=self.lifespan_context, default_response_class=FastJSONResponse)
 
-        # Set up separate routes for each file type
+        # fileDataType -> processing of the notified files of that type
+        self.file_type_handlers = {
+            file_type: partial(self.process_file_info_list, file_type) for file_type in self.file_types
+        }
+
+        # Routes are registered once: the multiplexed intake endpoint, and per file type the
+        # endpoints of subscriptions made before it existed
+        self.app.post("/notifications")(self.handle_notification)
         for file_type in self.file_types:
             self.app.post(f"/handle_{file_type.lower()}_file_notification")(self.create_file_handler(file_type))
+        self.app.get("/stats")(self.get_stats)
+        self.app.get("/metrics")(self.get_metrics)
+
+    async def get_metrics(self, format: str = "prometheus"):
+        """
+        Returns the per-stage latency histograms and the file counters of the agent.
+
+        Args:
+            format (str): "prometheus" for the text exposition format, "json" for a summary with
+                p50/p95/p99 per stage.
+
+        Returns:
+            PlainTextResponse or dict: The metrics.
+        """
+        if format == "json":
+            return self.metrics.snapshot()
+        return PlainTextResponse(self.metrics.render(), media_type="text/plain; version=0.0.4")
+
+    async def get_stats(self):
+        """Returns the counters of the agent's file cache and Hermes forwarder."""
+        stats = {"file_cache": self.file_cache.stats()}
+        if self.hermes_forwarder is not None:
+            stats["hermes_forwarder"] = self.hermes_forwarder.stats()
+        return stats
+
+    async def handle_notification(self, request: Request):
+        """
+        Handles a notification of any of the agent's file types. Its files are dispatched by their
+        fileDataType; files of other types are skipped.
+
+        Args:
+            request (Request): The notification.
+
+        Returns:
+            dict or Response: The acknowledgement of the notification.
+        """
+        start = time.perf_counter()
+        try:
+            body = await request.body()
+            with self.metrics.time(JSON_DECODE):
+                file_info_list = decode_file_info_list(body)
+
+            file_info_lists = {}
+            skipped = 0
+            for file_info in file_info_list:
+                file_type = file_info.get("fileDataType")
+                if file_type in self.file_type_handlers:
+                    file_info_lists.setdefault(file_type, []).append(file_info)
+                else:
+                    skipped += 1
+        except Exception as e:
+            logger.error(f"Error processing notification: {e}")
+            raise HTTPException(status_code=422, detail="Invalid notification format")
+
+        if skipped:
+            logger.warning(f"Skipped {skipped} files of types the agent does not handle")
+        response = await self.handle_files(file_info_lists)
+        self.metrics.observe(REQUEST, time.perf_counter() - start)
+        return response or {"message": "Notification processed"}
 
     def create_file_handler(self, file_type):
         """
@@ -51,69 +187,256 @@ class BaseExaminerAgent:
             Callable: A function to handle notifications.
         """
         async def handle_file_notification(request: Request):
+            start = time.perf_counter()
             try:
-                notification = await request.json()
-                logger.info(f"Received {file_type} file notification: {notification}")
-
-                file_info_list = notification.get("fileInfoList", [])
-                if not file_info_list or not isinstance(file_info_list, list):
-                    raise HTTPException(status_code=422, detail="Invalid fileInfoList structure")
-
-                for file_info in file_info_list:
-                    file_location = file_info.get("fileLocation")
-                    route = f"/handle_{file_type.lower()}_file_notification"
-                    logger.info(f"Registering route: {route}")
-                    self.app.post(route)(self.create_file_handler(file_type))
-                    if not file_location:
-                        logger.error("File location missing in file information.")
-                        continue
-
-                    # Fetch and structure file details
-                    file_details = await self.fetch_file_details(file_location)
-                    if not file_details:
-                        continue
-
-                    # Prepare the data to send to Hermes
-                    shared_data = {
-                        "event_type": f"NEW_{file_type.upper()}_FILE",
-                        "event_data": {
-                            "_id": file_details.get("_id"),
-                            "fileLocation": file_details["fileInfo"].get("fileLocation"),
-                            "fileReadyTime": file_details["fileInfo"].get("fileReadyTime"),
-                            "fileSize": file_details["fileInfo"].get("fileSize"),
-                            "fileCompression": file_details["fileInfo"].get("fileCompression"),
-                            "fileFormat": file_details["fileInfo"].get("fileFormat"),
-                            "fileDataType": file_details["fileInfo"].get("fileDataType"),
-                            "fileContent": {key: value for key, value in file_details.items() if key != "fileInfo"},
-                            # Include additional content based on file type
-                            **(file_details.get("analysisId") and {
-                                "analysisId": file_details["analysisId"],
-                                "findings": file_details.get("findings"),
-                                "generatedOn": file_details.get("generatedOn")
-                            } or {}),
-                            **(file_details.get("vendorSpecificData") and {
-                                "vendorSpecificData": file_details["vendorSpecificData"]
-                            } or {}),
-                            **(file_details.get("sessionId") and {
-                                "sessionId": file_details["sessionId"],
-                                "events": file_details.get("events")
-                            } or {}),
-                        }
-                    }
-                    # Send data to Hermes
-                    await self.send_to_hermes(shared_data)
-                return {"message": f"{file_type} notification processed"}
+                body = await request.body()
+                with self.metrics.time(JSON_DECODE):
+                    file_info_list = decode_file_info_list(body)
+                logger.info(f"Received {file_type} file notification with {len(file_info_list)} files")
 
             except Exception as e:
                 logger.error(f"Error processing {file_type} notification: {e}")
                 raise HTTPException(status_code=422, detail="Invalid notification format")
 
+            response = await self.handle_file_info_list(file_type, file_info_list)
+            self.metrics.observe(REQUEST, time.perf_counter() - start)
+            return response or {"message": f"{file_type} notification processed"}
+
         return handle_file_notification
 
+    async def handle_file_info_list(self, file_type, file_info_list):
+        """
+        Processes the files of a validated notification. In ack-first mode they are only queued
+        for the background workers and the notification is acknowledged right away.
+
+        Args:
+            file_type (str): The type of the notified files.
+            file_info_list (list[dict]): The FileInfos of the notification.
+
+        Returns:
+            Response or None: The 204 acknowledgement in ack-first mode, None once the files
+            were processed.
+
+        Raises:
+            HTTPException: 429 if the queue cannot take the whole notification, so the
+                File Data Reporting service retries it later.
+        """
+        return await self.handle_files({file_type: file_info_list})
+
+    async def handle_files(self, file_info_lists):
+        """
+        Processes the files of a validated notification, which may contain several file types.
+        See handle_file_info_list.
+
+        Args:
+            file_info_lists (dict): The FileInfos of the notification by file type.
+
+        Returns:
+            Response or None: The 204 acknowledgement in ack-first mode, None once the files
+            were processed.
+
+        Raises:
+            HTTPException: 429 if the queue cannot take the whole notification.
+        """
+        if not self.ack_first:
+            await asyncio.gather(*(self.file_type_handlers[file_type](file_info_list)
+                                   for file_type, file_info_list in file_info_lists.items()))
+            return None
+
+        # Queue all files or none, a retried notification must not duplicate part of it
+        file_count = sum(len(file_info_list) for file_info_list in file_info_lists.values())
+        if self._file_queue.maxsize - self._file_queue.qsize() < file_count:
+            logger.warning(f"File queue is full, rejecting notification of {file_count} files")
+            raise HTTPException(status_code=429, detail="Too many pending files")
+        for file_type, file_info_list in file_info_lists.items():
+            for file_info in file_info_list:
+                self._file_queue.put_nowait((file_type, file_info))
+        return Response(status_code=204)
+
+    async def process_file_info_list(self, file_type, file_info_list):
+        """
+        Processes the files of a notification concurrently, at most max_concurrent_files at a time.
+        A failing file is logged and does not affect the others.
+
+        Args:
+            file_type (str): The type of the notified files.
+            file_info_list (list[dict]): The FileInfos of the notification.
+
+        Returns:
+            list: The result of process_file_info per file, or the exception it raised.
+        """
+        # Fetch all files of the notification with as few requests as possible
+        file_locations = [file_info.get("fileLocation") for file_info in file_info_list]
+        fetch_start_ns = time.time_ns()
+        try:
+            with self.metrics.time(FILE_FETCH):
+                prefetched = await self.fetch_files_details([location for location in file_locations if location])
+        except Exception as e:
+            logger.error(f"Bulk fetch of {len(file_locations)} {file_type} files failed, fetching them one by one: {e!r}")
+            prefetched = {}
+        if self.tracer.recording:
+            # The bulk fetch is a step of every traced file of the notification
+            fetch_end_ns = time.time_ns()
+            for file_info in file_info_list:
+                if file_info.get(TRACEPARENT):
+                    self.tracer.record_span("examiner.file_fetch", file_info[TRACEPARENT], fetch_start_ns,
+                                            fetch_end_ns, files=len(file_locations))
+
+        results = await asyncio.gather(
+            *(self._process_file_info_bounded(file_type, file_info, prefetched) for file_info in file_info_list),
+            return_exceptions=True
+        )
+        for file_info, result in zip(file_info_list, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing {file_type} file {file_info.get('fileLocation')}: {result!r}")
+        return results
+
+    async def _process_file_info_bounded(self, file_type, file_info, prefetched=None):
+        async with self._file_semaphore:
+            return await self.process_file_info(file_type, file_info, prefetched)
+
+    async def _process_queued_files(self):
+        while True:
+            # Take up to max_concurrent_files pending files so they are fetched together, and leave
+            # the rest to the other workers
+            batch = [await self._file_queue.get()]
+            while len(batch) < self._worker_batch_size and not self._file_queue.empty():
+                batch.append(self._file_queue.get_nowait())
+            file_info_lists = {}
+            for file_type, file_info in batch:
+                file_info_lists.setdefault(file_type, []).append(file_info)
+            try:
+                for file_type, file_info_list in file_info_lists.items():
+                    # A failing file type does not drop the files of the other types
+                    try:
+                        await self.file_type_handlers[file_type](file_info_list)
+                    except Exception as e:
+                        logger.error(f"Error processing {len(file_info_list)} queued {file_type} files: {e!r}")
+            finally:
+                for _ in batch:
+                    self._file_queue.task_done()
+
+    async def start_workers(self):
+        """Starts the background workers draining the file queue."""
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._process_queued_files()) for _ in range(self.worker_count)]
+
+    async def stop_workers(self, drain_timeout_seconds=10):
+        """
+        Waits for the queued files to be processed, then stops the background workers.
+
+        Args:
+            drain_timeout_seconds (float): How long to wait for the queue to drain.
+        """
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._file_queue.join(), timeout=drain_timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.error(f"Stopping workers with {self._file_queue.qsize()} files still queued")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def process_file_info(self, file_type, file_info, prefetched=None):
+        """
+        Fetches a single notified file and forwards it to Hermes if it is relevant.
+
+        Args:
+            file_type (str): The type of the notified file.
+            file_info (dict): The FileInfo of the file.
+            prefetched (dict): Files already fetched by fetch_files_details. The file is only
+                fetched on its own if its location is missing.
+
+        Returns:
+            bool: Whether the file was forwarded to Hermes.
+        """
+        file_location = file_info.get("fileLocation")
+        if not file_location:
+            logger.error("File location missing in file information.")
+            return False
+
+        with self.tracer.start_span("examiner.process_file", file_info.get(TRACEPARENT),
+                                    fileLocation=file_location) as span:
+            # Fetch and structure file details
+            if prefetched is not None and file_location in prefetched:
+                file_details = prefetched[file_location]
+            else:
+                with self.metrics.time(FILE_FETCH):
+                    file_details = await self.fetch_file_details(file_location)
+            if not file_details:
+                span.set_attribute("forwarded", False)
+                return False
+
+            with self.metrics.time(FILTER):
+                shared_data = self.build_shared_data(file_type, file_details)
+            if shared_data is None:
+                self.metrics.increment(IGNORED_FILES)
+                span.set_attribute("forwarded", False)
+                return False
+            self.metrics.increment(RELEVANT_FILES)
+
+            # Send data to Hermes, whose spans of the event become children of this one
+            shared_data[TRACEPARENT] = span.traceparent
+            await self.send_to_hermes(shared_data)
+            span.set_attribute("forwarded", True)
+            return True
+
+    def build_shared_data(self, file_type, file_details):
+        """
+        Prepares the data sent to Hermes for a fetched file. Subclasses filter irrelevant files
+        by returning None.
+
+        Args:
+            file_type (str): The type of the file.
+            file_details (dict): The file as returned by the File Data Reporting service.
+
+        Returns:
+            dict or None: The data to send to Hermes, None to ignore the file.
+        """
+        return {
+            "event_type": f"NEW_{file_type.upper()}_FILE",
+            "event_data": {
+                "_id": file_details.get("_id"),
+                "fileLocation": file_details["fileInfo"].get("fileLocation"),
+                "fileReadyTime": file_details["fileInfo"].get("fileReadyTime"),
+                "fileSize": file_details["fileInfo"].get("fileSize"),
+                "fileCompression": file_details["fileInfo"].get("fileCompression"),
+                "fileFormat": file_details["fileInfo"].get("fileFormat"),
+                "fileDataType": file_details["fileInfo"].get("fileDataType"),
+                "fileContent": {key: value for key, value in file_details.items() if key != "fileInfo"},
+                # Include additional content based on file type
+                **(file_details.get("analysisId") and {
+                    "analysisId": file_details["analysisId"],
+                    "findings": file_details.get("findings"),
+                    "generatedOn": file_details.get("generatedOn")
+                } or {}),
+                **(file_details.get("vendorSpecificData") and {
+                    "vendorSpecificData": file_details["vendorSpecificData"]
+                } or {}),
+                **(file_details.get("sessionId") and {
+                    "sessionId": file_details["sessionId"],
+                    "events": file_details.get("events")
+                } or {}),
+            }
+        }
+
+    @staticmethod
+    def get_excep_id(file_details):
+        """Returns the excepId of the first abnormal behaviour in a file, if any."""
+        return (
+            file_details.get("eventNotifications", [{}])[0]
+            .get("abnorBehavrs", [{}])[0]
+            .get("excep", {})
+            .get("excepId")
+        )
+
     @asynccontextmanager
     async def lifespan_context(self, app: FastAPI):
         """
-                Manages the startup and shutdown of the agent, including subscriptions.
+                Manages the startup and shutdown of the agent, including subscriptions, the
+                shared HTTP session, the Hermes forwarder, the ack-first workers and the tracer.
 
                 Args:
                     app (FastAPI): The FastAPI application.
@@ -121,44 +444,152 @@ class BaseExaminerAgent:
                 Yields:
                     None
         """
-        await self.subscribe_to_multiple_files()
-        yield  # Allow the application to start
+        self.session = self.create_session()
+        try:
+            if self.hermes_forwarder is not None:
+                await self.hermes_forwarder.start(self.session)
+            if self.ack_first:
+                await self.start_workers()
+            await self.subscribe_to_multiple_files()
+            yield  # Allow the application to start
+        finally:
+            await self.stop_workers()
+            if self.hermes_forwarder is not None:
+                await self.hermes_forwarder.stop()
+            await self.session.close()
+            self.tracer.close()
+
+    def create_session(self):
+        """
+        Creates the HTTP session shared by all requests of this agent, so connections to the
+        File Data Reporting service and to Hermes are reused instead of opened per request.
+
+        Returns:
+            aiohttp.ClientSession: The session.
+        """
+        connector = aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            limit_per_host=self.connection_limit_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        return aiohttp.ClientSession(connector=connector, json_serialize=dumps_str)
 
     async def subscribe_to_multiple_files(self):
         """Subscribe to each file type defined in self.file_types."""
         for file_type in self.file_types:
             await self.subscribe_to_single_file_type(file_type)
 
+    def subscription_filter(self, file_type):
+        """
+        Builds the filter of the subscription to a file type. With RELEVANT_EXCEP_IDS, the REST API
+        only notifies files with an abnormal behaviour of one of these types.
+
+        Args:
+            file_type (str): The fileDataType subscribed to.
+
+        Returns:
+            dict: The subscription filter.
+        """
+        subscription_filter = {"fileDataType": file_type}
+        if self.RELEVANT_EXCEP_IDS:
+            # Arrays of the file are searched for a match, the filter's array lists the alternatives
+            subscription_filter["fileContent"] = {
+                "eventNotifications": {
+                    "abnorBehavrs": {
+                        "excep": {"excepId": sorted(self.RELEVANT_EXCEP_IDS)}
+                    }
+                }
+            }
+        return subscription_filter
+
     async def subscribe_to_single_file_type(self, file_type):
         """Subscribes to files of the specified file_type."""
-        consumer_url = f"http://{self.host}:{self.port}/handle_{file_type.lower()}_file_notification"
+        consumer_url = f"http://{self.host}:{self.port}/notifications"
         subscription_payload = {
             "consumerReference": consumer_url,
-            "filter": {
-                "fileDataType": file_type
-            }
+            "filter": self.subscription_filter(file_type)
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.subscription_url, json=subscription_payload) as response:
-                if response.status != 201:
-                    logger.error(f"Failed to subscribe to {file_type} files: {response.status}")
-                else:
-                    logger.info(f"Successfully subscribed to {file_type} files.")
+        async with self.session.post(self.subscription_url, json=subscription_payload) as response:
+            if response.status != 201:
+                logger.error(f"Failed to subscribe to {file_type} files: {response.status}")
+            else:
+                logger.info(f"Successfully subscribed to {file_type} files.")
 
     async def fetch_file_details(self, file_location):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(file_location) as response:
-                if response.status == 200:
-                    file_details = await response.json()
-                    logger.info(f"Fetched file details: {file_details}")
-                    return file_details
-                else:
-                    logger.error(f"Failed to fetch file details from {file_location}. Status code: {response.status}")
-                    return None
+        """Returns a file, from the cache if it was fetched before."""
+        return await self.file_cache.get_or_fetch(file_location, lambda: self._get_file_details(file_location))
+
+    async def _get_file_details(self, file_location):
+        async with self.session.get(file_location) as response:
+            if response.status == 200:
+                body = await response.read()
+                file_details = loads(body)
+                logger.info(f"Fetched file details: {file_details}")
+                return file_details, len(body)
+            else:
+                logger.error(f"Failed to fetch file details from {file_location}. Status code: {response.status}")
+                return None
+
+    async def fetch_files_details(self, file_locations):
+        """
+        Returns many files. Files that are not cached are fetched with the bulk
+        /files/retrieve_many endpoint, one request per MAX_FILES_PER_RETRIEVAL files of the same
+        service.
+
+        Args:
+            file_locations (list[str]): The fileLocations of the files.
+
+        Returns:
+            dict: The file details by fileLocation, None for files that do not exist. Locations
+            whose request failed are left out, so they can be fetched one by one instead.
+        """
+        return await self.file_cache.get_many_or_fetch(file_locations, self._retrieve_files_details)
+
+    async def _retrieve_files_details(self, file_locations):
+        # fileLocation is "<files url>/<file id>"
+        ids_by_files_url = {}
+        for file_location in dict.fromkeys(file_locations):
+            files_url, _, file_id = file_location.rstrip("/").rpartition("/")
+            ids_by_files_url.setdefault(files_url, {})[file_id] = file_location
+
+        files_details = {}
+        for files_url, locations_by_id in ids_by_files_url.items():
+            file_ids = list(locations_by_id)
+            for start in range(0, len(file_ids), MAX_FILES_PER_RETRIEVAL):
+                chunk = file_ids[start:start + MAX_FILES_PER_RETRIEVAL]
+                try:
+                    async with self.session.post(f"{files_url}/retrieve_many", json=chunk) as response:
+                        if response.status != 200:
+                            logger.error(f"Failed to fetch {len(chunk)} files from {files_url}. "
+                                         f"Status code: {response.status}")
+                            continue
+                        body = await response.read()
+                except aiohttp.ClientError as e:
+                    logger.error(f"Failed to fetch {len(chunk)} files from {files_url}: {e}")
+                    continue
+                found = {file_details.get("_id"): file_details for file_details in loads(body)}
+                # The files of a response share its body's size evenly
+                size = len(body) // max(1, len(found))
+                for file_id in chunk:
+                    files_details[locations_by_id[file_id]] = (found.get(file_id), size)
+        logger.info(f"Fetched {sum(details is not None for details, _ in files_details.values())} "
+                    f"of {len(file_locations)} files")
+        return files_details
 
     async def send_to_hermes(self, shared_data):
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.hermes_agent_url, json=shared_data) as response:
+        """
+        Forwards an event to Hermes: through the micro-batching forwarder, or with a request of
+        its own if batching is disabled.
+
+        Args:
+            shared_data (dict): The event for Hermes.
+        """
+        if self.hermes_forwarder is not None:
+            await self.hermes_forwarder.add(shared_data)
+            return
+        with self.metrics.time(HERMES_FORWARD):
+            async with self.session.post(self.hermes_agent_url, json=shared_data) as response:
                 if response.status == 200:
                     logger.info(f"Data successfully sent to Hermes.")
                 else:
@@ -0,0 +1,192 @@
+import logging
+import numpy as np
+from operator import attrgetter
+from geopy.distance import geodesic
+from correlation_event import ANOMALY_TYPES
+from spatial_index import haversine_km
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Same weights as HermesAgent.calculate_correlation_score
+WEIGHT_UE_IDS = 0.3
+WEIGHT_TIME_PROXIMITY = 0.4
+WEIGHT_LOCATION_PROXIMITY = 0.3
+WEIGHT_ADDITIONAL_CONDITIONS = 0.1
+
+
+class CandidateColumns:
+    """
+        The correlation candidates of one incoming event, laid out as NumPy columns so each rule
+        scores all of them with a few vectorized operations.
+
+        Columns other than the type IDs, the UE ID match and the times are built on first use,
+        so rules without location or additional metric conditions never pay for them.
+    """
+
+    def __init__(self, event, records):
+        """
+                Builds the columns.
+
+                Args:
+                    event (CorrelationEvent): The incoming event.
+                    records (list[CorrelationEvent]): Its candidates.
+        """
+        self.records = records
+        self.type_ids = np.array(list(map(attrgetter("type_id"), records)), dtype=np.int32)
+        self.ue_ids_match = np.array([not event.supis.isdisjoint(record.supis) for record in records], dtype=bool)
+        self._columns = {}
+        self.times = self.column("time")
+
+    def __len__(self):
+        return len(self.records)
+
+    def column(self, field):
+        """
+        Returns a record field as float column, missing values are NaN.
+
+        Args:
+            field (str): The CorrelationEvent attribute.
+
+        Returns:
+            np.ndarray: The column.
+        """
+        if field not in self._columns:
+            self._columns[field] = np.array(list(map(attrgetter(field), self.records)), dtype=float)
+        return self._columns[field]
+
+
+def time_differences(event, columns, rows):
+    """
+    Returns the absolute time differences in seconds, rounded to microseconds like the
+    timedelta the scalar path compares.
+    """
+    return np.round(np.abs(columns.times[rows] - event.time), 6)
+
+
+def proximity_scores(event, columns, rows, threshold_km, exact_margin_km=None):
+    """
+    Returns the location proximity of the rows to the event, NaN for rows without a location.
+    Distances are haversine distances, refined with the exact geodesic distance within
+    exact_margin_km of the threshold.
+    """
+    latitudes = columns.column("latitude")[rows]
+    longitudes = columns.column("longitude")[rows]
+    distances = haversine_km(event.latitude, event.longitude, latitudes, longitudes)
+    if exact_margin_km:
+        for index in np.flatnonzero(np.abs(distances - threshold_km) <= exact_margin_km):
+            distances[index] = geodesic(event.location, (latitudes[index], longitudes[index])).kilometers
+    return np.maximum(0.0, 1 - distances / threshold_km)
+
+
+def additional_metric_scores(event, columns, rows, condition):
+    """
+    Vectorized HermesAgent.calculate_additional_metric for the given rows.
+
+    Args:
+        event (CorrelationEvent): The incoming event.
+        columns (CandidateColumns): The candidates.
+        rows (np.ndarray): Indices of the candidates to score.
+        condition (dict): The rule condition.
+
+    Returns:
+        np.ndarray: Scores between 0 and 1.
+    """
+    metric = condition.get("type")
+    if metric == "signal_quality":
+        if event.rsrp is None:
+            return np.zeros(len(rows))
+        rsrp_diff = np.abs(event.rsrp - columns.column("rsrp")[rows])
+        sinr_diff = np.abs(event.sinr - columns.column("sinr")[rows])
+        score = np.maximum(0.0, 1 - rsrp_diff / 20) * 0.5 + np.maximum(0.0, 1 - sinr_diff / 20) * 0.5
+        # Candidates without signal measurements score 0
+        score = np.nan_to_num(score, nan=0.0)
+    elif metric == "confidence":
+        score = np.minimum(event.confidence, columns.column("confidence")[rows]) / 100
+    elif metric == "exception_level":
+        score = np.maximum(0.0, 1 - np.abs(event.excep_level - columns.column("excep_level")[rows]) / 5)
+    elif metric == "ratio":
+        score = np.maximum(0.0, 1 - np.abs(event.ratio - columns.column("ratio")[rows]))
+    else:
+        return np.zeros(len(rows))
+    return np.minimum(score, 1.0)
+
+
+def score_rule(event, columns, rows, time_difference_seconds, rule, exact_margin_km=None):
+    """
+    Vectorized HermesAgent.calculate_correlation_score for candidates that share a UE ID with the
+    event and meet the rule's time condition.
+
+    Args:
+        event (CorrelationEvent): The incoming event.
+        columns (CandidateColumns): The candidates.
+        rows (np.ndarray): Indices of the candidates to score.
+        time_difference_seconds (np.ndarray): Their time differences to the event.
+        rule (CorrelationRule): The rule.
+        exact_margin_km (float, optional): See proximity_scores.
+
+    Returns:
+        np.ndarray: The correlation scores of the rows.
+    """
+    threshold_seconds = rule.time_threshold.total_seconds()
+    scores = WEIGHT_UE_IDS + WEIGHT_TIME_PROXIMITY * (1 - time_difference_seconds / threshold_seconds)
+
+    if rule.location_threshold_km is not None and event.location is not None:
+        proximity = proximity_scores(event, columns, rows, rule.location_threshold_km, exact_margin_km)
+        scores += WEIGHT_LOCATION_PROXIMITY * np.nan_to_num(proximity, nan=0.0)
+
+    for condition in rule.additional_metrics:
+        scores += WEIGHT_ADDITIONAL_CONDITIONS * additional_metric_scores(event, columns, rows, condition)
+
+    return np.minimum(scores, 1.0)
+
+
+def score_candidates(event, candidates, rule_index, exact_margin_km=None):
+    """
+    Finds and scores the correlations of an event with a batch of candidates. The result equals
+    HermesAgent.check_correlation_rules, including the order of the correlations.
+
+    Args:
+        event (CorrelationEvent): The incoming event.
+        candidates (list[CorrelationEvent]): The candidate events.
+        rule_index (CorrelationRuleIndex): The correlation rules.
+        exact_margin_km (float, optional): See proximity_scores.
+
+    Returns:
+        list: The correlations as (candidate index, rule position, rule, score) tuples.
+    """
+    columns = CandidateColumns(event, candidates)
+    event_type = event.anomaly_type
+    found_rules = []
+    found_rows, found_positions, found_rule_indices, found_scores = [], [], [], []
+
+    for type_id in np.unique(columns.type_ids[columns.ue_ids_match]):
+        rules = rule_index.rules_for(event_type, ANOMALY_TYPES[type_id])
+        if not rules:
+            continue
+        rows = np.flatnonzero((columns.type_ids == type_id) & columns.ue_ids_match)
+        time_difference_seconds = time_differences(event, columns, rows)
+
+        for position, rule in enumerate(rules):
+            if not rule.time_overlap:
+                continue
+            within = time_difference_seconds <= rule.time_threshold.total_seconds()
+            if not within.any():
+                continue
+            rule_rows = rows[within]
+            found_rows.append(rule_rows)
+            found_positions.append(np.full(len(rule_rows), position))
+            found_rule_indices.append(np.full(len(rule_rows), len(found_rules)))
+            found_rules.append(rule)
+            found_scores.append(score_rule(event, columns, rule_rows, time_difference_seconds[within], rule,
+                                           exact_margin_km))
+
+    if not found_rows:
+        return []
+
+    # Order by candidate, then by the rule's position, like the pair-by-pair loop
+    rows = np.concatenate(found_rows)
+    positions = np.concatenate(found_positions)
+    order = np.lexsort((positions, rows))
+    rules = [found_rules[index] for index in np.concatenate(found_rule_indices)[order].tolist()]
+    return list(zip(rows[order].tolist(), positions[order].tolist(), rules, np.concatenate(found_scores)[order].tolist()))
@@ -0,0 +1,154 @@
+"""
+Compares Hermes' pair-by-pair correlation scoring with the NumPy batch scoring for growing
+correlation windows.
+
+The window is filled with synthetic events of a small SUPI pool, so an incoming event has
+many candidates. Each incoming event is scored against its candidates with both
+check_correlation_rules (batch scoring turned off) and check_correlation_rules_batch.
+
+With --check, both paths must find the same correlations in the same order with scores equal
+within --tolerance, the vectorized additional metrics must match
+HermesAgent.calculate_additional_metric for every metric type, and the batch path must be
+faster at the largest window size.
+
+Usage:
+    python benchmarks/bench_batch_scoring.py --window-sizes 1000 10000 100000 --check
+"""
+import gc
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from anomaly_store import InMemoryAnomalyStore  # noqa: E402
+from batch_scoring import CandidateColumns, additional_metric_scores  # noqa: E402
+from correlation_event import CorrelationEvent  # noqa: E402
+from hermes_agent import HermesAgent  # noqa: E402
+from synthetic import build_event, build_supis  # noqa: E402
+
+METRIC_TYPES = ["signal_quality", "confidence", "exception_level", "ratio"]
+
+
+def build_document(rng, supis, key, max_age_minutes, anomaly_type=None):
+    document = build_event(rng, supis, anomaly_type=anomaly_type, max_age_minutes=max_age_minutes)
+    document["_id"] = key
+    for notification in document["eventNotifications"]:
+        notification["timeStampGen"] = datetime.fromisoformat(notification["timeStampGen"]).astimezone(timezone.utc)
+    return document
+
+
+def build_agent(window_size, num_supis, exact_margin_km, seed):
+    """Returns a HermesAgent with window_size events in its correlation window, and the SUPIs used."""
+    rng = random.Random(seed)
+    supis = build_supis(rng, num_supis)
+    agent = HermesAgent(store=InMemoryAnomalyStore(), exact_proximity_margin_km=exact_margin_km)
+    agent.correlation_window.warm(
+        build_document(rng, supis, f"{index:024x}", max_age_minutes=55) for index in range(window_size))
+    return agent, supis
+
+
+def incoming_events(agent, supis, num_events, seed):
+    """Returns incoming records with their candidates from the window."""
+    rng = random.Random(seed + 1)
+    events = []
+    for _ in range(num_events):
+        event = CorrelationEvent.from_document(build_document(rng, supis, None, max_age_minutes=0))
+        candidates = agent.correlation_window.candidates(event, agent.relevant_anomaly_types(event.anomaly_type))
+        events.append((event, candidates))
+    return events
+
+
+def time_path(check, events):
+    """Returns the mean seconds per event and the correlations of every event."""
+    # Untimed warm-up, e.g. for NumPy's lazy imports
+    check(*events[0])
+    results = []
+    # Like timeit, collections of the large window must not land in one path's timing
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for event, candidates in events:
+            results.append(check(event, candidates))
+        seconds = time.perf_counter() - start
+    finally:
+        gc.enable()
+    return seconds / len(events), results
+
+
+def compare(scalar_results, batch_results, tolerance):
+    """Returns the number of correlations compared, raises AssertionError on a mismatch."""
+    compared = 0
+    for scalar, batch in zip(scalar_results, batch_results):
+        assert [(c["rule_name"], c["correlated_event_id"]) for c in scalar] == \
+               [(c["rule_name"], c["correlated_event_id"]) for c in batch], "correlations differ"
+        for scalar_correlation, batch_correlation in zip(scalar, batch):
+            difference = abs(scalar_correlation["correlation_score"] - batch_correlation["correlation_score"])
+            assert difference <= tolerance, f"scores differ by {difference}: {scalar_correlation}"
+        compared += len(scalar)
+    return compared
+
+
+def check_additional_metrics(events, tolerance):
+    """Compares the vectorized additional metrics with the scalar ones for every metric type."""
+    for event, candidates in events:
+        if not candidates:
+            continue
+        columns = CandidateColumns(event, candidates)
+        rows = np.arange(len(candidates))
+        for metric in METRIC_TYPES:
+            condition = {"type": metric}
+            batch = additional_metric_scores(event, columns, rows, condition)
+            for row, candidate in enumerate(candidates):
+                scalar = HermesAgent.calculate_additional_metric(event, candidate, condition)
+                assert abs(scalar - batch[row]) <= tolerance, f"{metric} differs for {candidate}"
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser()
+    parser.add_argument("--window-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--events", type=int, default=20, help="incoming events scored per window size")
+    parser.add_argument("--supis", type=int, default=5, help="size of the SUPI pool")
+    parser.add_argument("--exact-margin-km", type=float, default=None)
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error if the paths disagree or batch scoring is not faster")
+    return parser
+
+
+def main():
+    args = argparser().parse_args()
+    speedups = []
+    for window_size in args.window_sizes:
+        agent, supis = build_agent(window_size, args.supis, args.exact_margin_km, args.seed)
+        events = incoming_events(agent, supis, args.events, args.seed)
+        mean_candidates = sum(len(candidates) for _, candidates in events) / len(events)
+
+        agent.batch_min_candidates = None
+        scalar_seconds, scalar_results = time_path(agent.check_correlation_rules, events)
+        batch_seconds, batch_results = time_path(agent.check_correlation_rules_batch, events)
+        speedups.append(scalar_seconds / batch_seconds)
+        print(f"window={window_size:>7} candidates={mean_candidates:>8.0f} "
+              f"scalar={scalar_seconds * 1000:9.2f} ms/event batch={batch_seconds * 1000:8.2f} ms/event "
+              f"speedup={speedups[-1]:6.1f}x")
+
+        if args.check:
+            compared = compare(scalar_results, batch_results, args.tolerance)
+            check_additional_metrics(events[:5], args.tolerance)
+            print(f"  {compared} correlations match")
+
+    if args.check and speedups[-1] <= 1.0:
+        sys.exit(f"batch scoring is not faster at window size {args.window_sizes[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,576 @@
+"""
+Load-tests the whole pipeline on one Linux machine: the File Data Reporting API, the examiner
+agents and Hermes, each in a process of its own and talking HTTP over localhost.
+
+The File Data Reporting API is replaced by the in-process FileDataReportingStandIn and MongoDB by
+the InMemoryAnomalyStore (with an optional simulated round-trip time), so nothing has to be
+installed or running besides this script. The PhysicalLayerInspectorAgent and BackendAdvisorAgent
+subscribe to the stand-in like they subscribe to the REST API.
+
+Anomaly files are posted to the stand-in's /files endpoint at a steady rate, or in bursts with
+the same mean rate, with a seeded mix of anomaly types and a shared SUPI pool. Every service
+exports its spans to one NDJSON file; once the pipeline is drained they give the end-to-end
+latency of every file, from its ingestion to Hermes' correlation and to the upload of its
+correlated file, and the time spent in each hop, notification buffer linger included.
+
+The report holds throughput, p50/p95/p99 per stage (from the spans and from every service's
+/metrics), and CPU time and RSS per process. It is printed and, with --output, saved as JSON
+together with the commit and configuration, so runs of different commits can be compared;
+--baseline prints the changes against a saved report.
+
+With --check, the run fails if a file could not be posted or notified, or if Hermes did not
+process every event the agents forwarded.
+
+Usage:
+    python benchmarks/bench_end_to_end.py --rate 200 --duration 30 --output e2e.json
+    python benchmarks/bench_end_to_end.py --pattern bursty --rate 200 --burst-seconds 1 --idle-seconds 4 \\
+        --baseline e2e.json --check
+"""
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+AGENTS_DIR = os.path.dirname(BENCHMARKS_DIR)
+REST_API_DIR = os.path.dirname(AGENTS_DIR)
+sys.path.insert(0, AGENTS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+# The BackendAdvisorAgent lives next to the REST API
+sys.path.append(REST_API_DIR)
+
+import aiohttp  # noqa: E402
+from instrumentation import LatencyHistogram  # noqa: E402
+from serialization import dumps, loads  # noqa: E402
+from synthetic import ANOMALY_FILE_TYPES, ANOMALY_TYPES, ANOMALY_WEIGHTS, build_event, build_supis  # noqa: E402
+
+HOST = "127.0.0.1"
+
+# The services of the pipeline, in start order: the agents subscribe to the stand-in on startup
+# and forward to Hermes
+SERVICES = ("file_data_reporting", "hermes", "physical_layer_inspector", "backend_advisor")
+AGENTS = ("physical_layer_inspector", "backend_advisor")
+
+# The end-to-end latencies reported besides the spans
+TO_HERMES = "ingest_to_correlation"
+TO_CORRELATED_UPLOAD = "ingest_to_correlated_upload"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def service_url(ports, name):
+    return f"http://{HOST}:{ports[name]}"
+
+
+def build_service(name, config):
+    """Builds the ASGI app of a service, in its own process."""
+    from tracing import FileSpanExporter, Tracer
+
+    ports = config["ports"]
+    exporter = FileSpanExporter(config["trace_path"])
+    hermes_url = f"{service_url(ports, 'hermes')}/receive_shared_data"
+    subscription_url = f"{service_url(ports, 'file_data_reporting')}/fileDataReportingMnS/v1/subscriptions/"
+    agent_options = {"hermes_batch_size": config["hermes_batch_size"],
+                     "hermes_linger_ms": config["hermes_linger_ms"], "span_exporter": exporter}
+
+    if name == "file_data_reporting":
+        from file_data_reporting_standin import FileDataReportingStandIn
+        return FileDataReportingStandIn(service_url(ports, name), buffer_size=config["notification_buffer_size"],
+                                        linger_ms=config["notification_linger_ms"],
+                                        tracer=Tracer("file-data-reporting", exporter)).app
+    if name == "hermes":
+        from anomaly_store import InMemoryAnomalyStore
+        from hermes_agent import HermesAgent
+        store = InMemoryAnomalyStore(latency_seconds=config["mongo_latency_ms"] / 1000)
+        hermes = HermesAgent(HOST, ports[name], store=store, correlation_workers=config["correlation_workers"],
+                             files_url=f"{service_url(ports, 'file_data_reporting')}/fileDataReportingMnS/v1/files",
+                             span_exporter=exporter)
+        return hermes.app
+    if name == "physical_layer_inspector":
+        from physical_layer_inspectorAgent_agent import PhysicalLayerInspectorAgent
+        agent = PhysicalLayerInspectorAgent(HOST, ports[name], hermes_url, **agent_options)
+    else:
+        from backend_advisor_agent import BackendAdvisorAgent
+        agent = BackendAdvisorAgent(HOST, ports[name], hermes_url, **agent_options)
+    agent.subscription_url = subscription_url
+    return agent.app
+
+
+def run_service(name, config):
+    """Serves a service until it is terminated; the entry point of its process."""
+    import uvicorn
+
+    logging.basicConfig(level=logging.WARNING)
+    if not config["service_logs"]:
+        # The services log every file at INFO, which would be measured as well
+        logging.disable(logging.INFO)
+    app = build_service(name, config)
+    server = uvicorn.Server(uvicorn.Config(app, host=HOST, port=config["ports"][name], log_level="warning",
+                                           access_log=False))
+    asyncio.run(server.serve())
+
+
+def process_usage(pid):
+    """
+    Returns the CPU time and memory of a process from /proc.
+
+    Returns:
+        dict: User and system CPU seconds, current and peak RSS in MiB.
+    """
+    with open(f"/proc/{pid}/stat") as file:
+        # The fields after the command name, which may contain spaces
+        fields = file.read().rpartition(")")[2].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    memory = {}
+    with open(f"/proc/{pid}/status") as file:
+        for line in file:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                memory[key] = int(value.split()[0]) / 1024
+    return {
+        "cpu_user_seconds": int(fields[11]) / ticks,
+        "cpu_system_seconds": int(fields[12]) / ticks,
+        "rss_mb": memory.get("VmRSS", 0.0),
+        "rss_peak_mb": memory.get("VmHWM", 0.0),
+    }
+
+
+def parse_mix(values):
+    """Returns the anomaly types and weights of --mix TYPE=WEIGHT arguments, file-generator.py's by default."""
+    if not values:
+        return list(ANOMALY_TYPES), list(ANOMALY_WEIGHTS)
+    types, weights = [], []
+    for value in values:
+        anomaly_type, _, weight = value.partition("=")
+        anomaly_type = anomaly_type.upper()
+        if anomaly_type not in ANOMALY_FILE_TYPES:
+            sys.exit(f"unknown anomaly type {anomaly_type}, expected one of {', '.join(ANOMALY_TYPES)}")
+        types.append(anomaly_type)
+        weights.append(float(weight or 1))
+    return types, weights
+
+
+def build_files(args, count):
+    """Builds the JSON bodies of the files to post, drawn from the seeded generator."""
+    rng = random.Random(args.seed)
+    supis = build_supis(rng, args.supis)
+    types, weights = parse_mix(args.mix)
+    bodies = []
+    for _ in range(count):
+        anomaly_type = rng.choices(types, weights=weights)[0]
+        bodies.append(dumps({
+            "fileDataType": ANOMALY_FILE_TYPES[anomaly_type],
+            "fileContent": build_event(rng, supis, anomaly_type),
+            "fileReadyTime": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "fileCompression": "zip",
+            "fileFormat": "JSON",
+        }))
+    return bodies
+
+
+def send_offsets(args, count):
+    """
+    Returns when each file is posted, in seconds from the start.
+
+    steady posts at --rate; bursty posts at a higher rate for --burst-seconds, then pauses for
+    --idle-seconds, with the same mean rate.
+    """
+    if args.pattern == "steady":
+        return [index / args.rate for index in range(count)]
+    cycle_seconds = args.burst_seconds + args.idle_seconds
+    files_per_cycle = args.rate * cycle_seconds
+    burst_rate = files_per_cycle / args.burst_seconds
+    offsets = []
+    for index in range(count):
+        cycle = math.floor(index / files_per_cycle)
+        offsets.append(cycle * cycle_seconds + (index - cycle * files_per_cycle) / burst_rate)
+    return offsets
+
+
+async def drive(session, files_url, bodies, offsets, max_in_flight):
+    """
+    Posts the files on schedule, open loop: a file is posted when it is due, whether earlier ones
+    were answered or not, as long as fewer than max_in_flight requests are open.
+
+    Returns:
+        dict: Files sent, errors, achieved rate and how late files were posted.
+    """
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(max_in_flight)
+    lag = LatencyHistogram()
+    errors = 0
+    tasks = set()
+
+    async def post(body):
+        nonlocal errors
+        try:
+            async with session.post(files_url, data=body, headers={"Content-Type": "application/json"}) as response:
+                if response.status != 201:
+                    errors += 1
+        except aiohttp.ClientError:
+            errors += 1
+        finally:
+            in_flight.release()
+
+    start = loop.time()
+    for body, offset in zip(bodies, offsets):
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await in_flight.acquire()
+        lag.observe(max(0.0, loop.time() - start - offset))
+        task = asyncio.create_task(post(body))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    sending_seconds = loop.time() - start
+    if tasks:
+        await asyncio.gather(*tasks)
+    return {
+        "files_sent": len(bodies),
+        "send_errors": errors,
+        "seconds": sending_seconds,
+        "achieved_rate": len(bodies) / sending_seconds if sending_seconds else 0.0,
+        "send_lag_seconds": lag.snapshot(),
+    }
+
+
+async def get_json(session, url):
+    async with session.get(url) as response:
+        response.raise_for_status()
+        return await response.json(loads=loads)
+
+
+async def start_services(session, config, processes, timeout_seconds=30):
+    """
+    Starts the services one after the other, each once the previous one answers its /stats
+    endpoint, since the agents subscribe to the stand-in on startup.
+    """
+    context = multiprocessing.get_context("spawn")
+    for name in SERVICES:
+        process = context.Process(target=run_service, args=(name, config), name=name, daemon=True)
+        process.start()
+        processes[name] = process
+        deadline = time.monotonic() + timeout_seconds
+        while True:
+            if not process.is_alive():
+                sys.exit(f"{name} exited during startup with code {process.exitcode}")
+            try:
+                await get_json(session, f"{service_url(config['ports'], name)}/stats")
+                break
+            except (aiohttp.ClientError, OSError):
+                if time.monotonic() > deadline:
+                    sys.exit(f"{name} did not start within {timeout_seconds} s")
+                await asyncio.sleep(0.1)
+
+
+async def wait_until_drained(session, ports, timeout_seconds, poll_seconds=0.2, stable_polls=3):
+    """
+    Waits until no notification is pending, no agent buffers events and Hermes' event count
+    stopped changing.
+
+    Returns:
+        bool: False if the pipeline did not drain within timeout_seconds.
+    """
+    deadline = time.monotonic() + timeout_seconds
+    last_processed = None
+    stable = 0
+    while time.monotonic() < deadline:
+        standin = await get_json(session, f"{service_url(ports, 'file_data_reporting')}/stats")
+        buffered = 0
+        for name in AGENTS:
+            stats = await get_json(session, f"{service_url(ports, name)}/stats")
+            buffered += stats.get("hermes_forwarder", {}).get("buffered", 0)
+        hermes = await get_json(session, f"{service_url(ports, 'hermes')}/metrics?format=json")
+        processed = hermes["counters"].get("events_processed", 0)
+        if standin["pending"] == 0 and buffered == 0 and processed == last_processed:
+            stable += 1
+            if stable >= stable_polls:
+                return True
+        else:
+            stable = 0
+        last_processed = processed
+        await asyncio.sleep(poll_seconds)
+    return False
+
+
+def analyze_spans(trace_path):
+    """
+    Summarizes the spans of the run.
+
+    Returns:
+        dict: Per span name and per end-to-end latency the histogram summary in seconds, and the
+        number of traces.
+    """
+    traces = {}
+    with open(trace_path, "rb") as file:
+        for line in file:
+            if line.strip():
+                span = loads(line)
+                # Decimal strings, see Span.to_dict
+                span["startTimeUnixNano"] = int(span["startTimeUnixNano"])
+                span["endTimeUnixNano"] = int(span["endTimeUnixNano"])
+                traces.setdefault(span["traceId"], []).append(span)
+
+    spans = {}
+    end_to_end = {TO_HERMES: LatencyHistogram(), TO_CORRELATED_UPLOAD: LatencyHistogram()}
+    for trace in traces.values():
+        hermes_ids = set()
+        hermes_end = None
+        for span in trace:
+            spans.setdefault(span["name"], LatencyHistogram()).observe(
+                (span["endTimeUnixNano"] - span["startTimeUnixNano"]) / 1e9)
+            if span["name"] == "hermes.process_event":
+                hermes_ids.add(span["spanId"])
+                hermes_end = max(hermes_end or 0, span["endTimeUnixNano"])
+        roots = [span for span in trace if span["name"] == "fdr.file_ingest" and span["parentSpanId"] is None]
+        if not roots:
+            continue
+        ingested = roots[0]["startTimeUnixNano"]
+        if hermes_end is not None:
+            end_to_end[TO_HERMES].observe((hermes_end - ingested) / 1e9)
+        uploads = [span["startTimeUnixNano"] for span in trace
+                   if span["name"] == "fdr.file_ingest" and span["parentSpanId"] in hermes_ids]
+        if uploads:
+            end_to_end[TO_CORRELATED_UPLOAD].observe((min(uploads) - ingested) / 1e9)
+    return {
+        "traces": len(traces),
+        "end_to_end": {name: histogram.snapshot() for name, histogram in end_to_end.items()},
+        "spans": {name: histogram.snapshot() for name, histogram in sorted(spans.items())},
+    }
+
+
+def git_commit():
+    """Returns the checked out commit and whether the tree has changes, None outside a git checkout."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=AGENTS_DIR, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=AGENTS_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {"commit": commit, "dirty": bool(dirty)}
+
+
+async def run(args, config, processes):
+    ports = config["ports"]
+    count = int(args.rate * args.duration)
+    bodies = build_files(args, count)
+    offsets = send_offsets(args, count)
+
+    connector = aiohttp.TCPConnector(limit=args.max_in_flight)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await start_services(session, config, processes)
+        before = {name: process_usage(process.pid) for name, process in processes.items()}
+        started = time.monotonic()
+
+        load = await drive(session, f"{service_url(ports, 'file_data_reporting')}/fileDataReportingMnS/v1/files",
+                           bodies, offsets, args.max_in_flight)
+        drained = await wait_until_drained(session, ports, args.drain_timeout)
+        seconds = time.monotonic() - started
+
+        after = {name: process_usage(process.pid) for name, process in processes.items()}
+        metrics = {name: await get_json(session, f"{service_url(ports, name)}/metrics?format=json")
+                   for name in ("hermes",) + AGENTS}
+        stats = {name: await get_json(session, f"{service_url(ports, name)}/stats") for name in SERVICES}
+
+    resources = {}
+    for name in SERVICES:
+        cpu_seconds = (after[name]["cpu_user_seconds"] + after[name]["cpu_system_seconds"]
+                       - before[name]["cpu_user_seconds"] - before[name]["cpu_system_seconds"])
+        resources[name] = {
+            "cpu_seconds": cpu_seconds,
+            "cpu_percent": 100 * cpu_seconds / seconds,
+            "rss_mb": after[name]["rss_mb"],
+            "rss_peak_mb": after[name]["rss_peak_mb"],
+        }
+
+    hermes_counters = metrics["hermes"]["counters"]
+    events = hermes_counters.get("events_processed", 0)
+    return {
+        "load": load,
+        "drained": drained,
+        "throughput": {
+            "seconds": seconds,
+            "files_per_second": load["files_sent"] / seconds,
+            "relevant_files": sum(metrics[name]["counters"].get("relevant_files", 0) for name in AGENTS),
+            "ignored_files": sum(metrics[name]["counters"].get("ignored_files", 0) for name in AGENTS),
+            "events_processed": events,
+            "events_per_second": events / seconds,
+            "correlations_found": hermes_counters.get("correlations_found", 0),
+            "correlated_files_uploaded": stats["hermes"]["uploader"]["uploaded_files"],
+        },
+        "stages": {name: metrics[name]["stages"] for name in metrics},
+        "services": stats,
+        "resources": resources,
+    }
+
+
+# Metrics compared against a baseline: their path in the report, and whether higher is better
+COMPARED_METRICS = [
+    (("throughput", "events_per_second"), True),
+    (("latency", "end_to_end", TO_HERMES, "p50"), False),
+    (("latency", "end_to_end", TO_HERMES, "p95"), False),
+    (("latency", "end_to_end", TO_HERMES, "p99"), False),
+    (("stages", "hermes", "request", "p99"), False),
+    (("stages", "hermes", "rule_evaluation", "p99"), False),
+    (("resources", "hermes", "cpu_seconds"), False),
+    (("resources", "hermes", "rss_peak_mb"), False),
+]
+
+
+def compare(report, baseline):
+    """Prints the change of the main metrics against a baseline report."""
+    print(f"against {baseline.get('git', {}) and baseline['git'].get('commit', '')[:12] or 'baseline'}:")
+    for path, higher_is_better in COMPARED_METRICS:
+        current, previous = report, baseline
+        for key in path:
+            current = current.get(key, {}) if isinstance(current, dict) else {}
+            previous = previous.get(key, {}) if isinstance(previous, dict) else {}
+        if not isinstance(current, (int, float)) or not isinstance(previous, (int, float)) or not previous:
+            continue
+        change = (current - previous) / previous * 100
+        better = change > 0 if higher_is_better else change < 0
+        print(f"  {'.'.join(path):<50} {previous:12.6g} -> {current:12.6g}  {change:+7.1f} %"
+              f"{'' if abs(change) < 5 else ' better' if better else ' worse'}")
+
+
+def print_summary(report):
+    load, throughput = report["load"], report["throughput"]
+    print(f"sent {load['files_sent']} files at {load['achieved_rate']:.1f}/s ({load['send_errors']} errors), "
+          f"Hermes processed {throughput['events_processed']} events at {throughput['events_per_second']:.1f}/s, "
+          f"{throughput['correlations_found']} correlations, "
+          f"{throughput['correlated_files_uploaded']} correlated files uploaded")
+    for name, summary in report["latency"]["end_to_end"].items():
+        print(f"  {name:<38} p50 {summary['p50'] * 1e3:9.2f} ms  p95 {summary['p95'] * 1e3:9.2f} ms  "
+              f"p99 {summary['p99'] * 1e3:9.2f} ms  ({summary['count']} files)")
+    for name, summary in report["latency"]["spans"].items():
+        print(f"  span {name:<33} p50 {summary['p50'] * 1e3:9.2f} ms  p95 {summary['p95'] * 1e3:9.2f} ms  "
+              f"p99 {summary['p99'] * 1e3:9.2f} ms")
+    for service, stages in report["stages"].items():
+        for stage, summary in stages.items():
+            print(f"  {service}.{stage:<{37 - len(service)}} p50 {summary['p50'] * 1e3:9.3f} ms  "
+                  f"p95 {summary['p95'] * 1e3:9.3f} ms  p99 {summary['p99'] * 1e3:9.3f} ms")
+    for service, usage in report["resources"].items():
+        print(f"  {service:<38} cpu {usage['cpu_seconds']:7.2f} s ({usage['cpu_percent']:5.1f} %)  "
+              f"rss {usage['rss_mb']:7.1f} MiB  peak {usage['rss_peak_mb']:7.1f} MiB")
+
+
+def check(report):
+    """Returns the problems --check fails on."""
+    problems = []
+    if report["load"]["send_errors"]:
+        problems.append(f"{report['load']['send_errors']} files could not be posted")
+    if not report["drained"]:
+        problems.append("the pipeline did not drain")
+    failed = report["services"]["file_data_reporting"]["failed_notifications"]
+    if failed:
+        problems.append(f"{failed} notifications failed")
+    throughput = report["throughput"]
+    if throughput["events_processed"] != throughput["relevant_files"]:
+        problems.append(f"Hermes processed {throughput['events_processed']} events, "
+                        f"the agents forwarded {throughput['relevant_files']}")
+    return problems
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser()
+    parser.add_argument("--rate", type=float, default=100, help="mean files posted per second")
+    parser.add_argument("--duration", type=float, default=20, help="seconds files are posted for")
+    parser.add_argument("--pattern", choices=["steady", "bursty"], default="steady")
+    parser.add_argument("--burst-seconds", type=float, default=1.0)
+    parser.add_argument("--idle-seconds", type=float, default=4.0)
+    parser.add_argument("--mix", nargs="+", metavar="TYPE=WEIGHT",
+                        help="anomaly types and their weights, file-generator.py's mix by default")
+    parser.add_argument("--supis", type=int, default=50, help="size of the SUPI pool")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-in-flight", type=int, default=256, help="maximum number of open /files requests")
+    parser.add_argument("--notification-buffer-size", type=int, default=10)
+    parser.add_argument("--notification-linger-ms", type=float, default=5000)
+    parser.add_argument("--hermes-batch-size", type=int, default=100)
+    parser.add_argument("--hermes-linger-ms", type=float, default=5)
+    parser.add_argument("--correlation-workers", type=int, default=0)
+    parser.add_argument("--mongo-latency-ms", type=float, default=0.0,
+                        help="simulated round-trip time of every MongoDB operation")
+    parser.add_argument("--drain-timeout", type=float, default=60)
+    parser.add_argument("--service-logs", action="store_true", help="keep the services' INFO logs")
+    parser.add_argument("--output", help="save the report as JSON to this file")
+    parser.add_argument("--baseline", help="a report saved before, to compare against")
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error if files were lost on the way or the pipeline did not drain")
+    return parser
+
+
+def main():
+    args = argparser().parse_args()
+    if not sys.platform.startswith("linux"):
+        sys.exit("the benchmark reads CPU time and RSS from /proc and runs on Linux only")
+
+    ports = {name: free_port() for name in SERVICES}
+    trace_directory = tempfile.mkdtemp(prefix="bench_end_to_end_")
+    trace_path = os.path.join(trace_directory, "spans.ndjson")
+    config = {
+        "ports": ports,
+        "trace_path": trace_path,
+        "notification_buffer_size": args.notification_buffer_size,
+        "notification_linger_ms": args.notification_linger_ms,
+        "hermes_batch_size": args.hermes_batch_size,
+        "hermes_linger_ms": args.hermes_linger_ms,
+        "correlation_workers": args.correlation_workers,
+        "mongo_latency_ms": args.mongo_latency_ms,
+        "service_logs": args.service_logs,
+    }
+
+    processes = {}
+    try:
+        report = asyncio.run(run(args, config, processes))
+    finally:
+        # Terminating lets uvicorn shut down gracefully, which writes the remaining spans
+        for process in reversed(list(processes.values())):
+            process.terminate()
+            process.join(timeout=30)
+
+    report["latency"] = analyze_spans(trace_path)
+    report = {
+        "benchmark": "end_to_end",
+        "git": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": vars(args),
+        **report,
+    }
+    print_summary(report)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"saved report to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(report, json.load(file))
+    if args.check:
+        problems = check(report)
+        if problems:
+            sys.exit("; ".join(problems))
+        print("every forwarded event was processed")
+
+
+if __name__ == "__main__":
+    main()
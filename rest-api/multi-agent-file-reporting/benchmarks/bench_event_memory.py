@@ -0,0 +1,83 @@
+"""
+Compares the memory held per event by the correlation window: the full event documents it used
+to keep against the CorrelationEvent records it keeps now.
+
+Both variants are measured with tracemalloc on the same synthetic events, with timeStampGen
+already parsed to a datetime as Hermes stores it.
+
+Usage:
+    python benchmarks/bench_event_memory.py --events 10000
+"""
+import gc
+import os
+import random
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from correlation_event import CorrelationEvent  # noqa: E402
+from correlation_window import CorrelationWindow  # noqa: E402
+from synthetic import build_event, build_supis  # noqa: E402
+
+
+def build_documents(num_events, seed):
+    rng = random.Random(seed)
+    supis = build_supis(rng, 500)
+    documents = []
+    for index in range(num_events):
+        document = build_event(rng, supis, max_age_minutes=30)
+        document["_id"] = f"{index:024x}"
+        for notification in document["eventNotifications"]:
+            notification["timeStampGen"] = datetime.fromisoformat(notification["timeStampGen"]).astimezone(
+                timezone.utc)
+        documents.append(document)
+    return documents
+
+
+def measure(build):
+    """Returns the bytes still allocated by what build() returns."""
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    result = build()
+    gc.collect()
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return end - start
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser()
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser
+
+
+def main():
+    args = argparser().parse_args()
+
+    documents_bytes = measure(lambda: build_documents(args.events, args.seed))
+    documents = build_documents(args.events, args.seed)
+    records_bytes = measure(lambda: [CorrelationEvent.from_document(document) for document in documents])
+
+    def build_window():
+        window = CorrelationWindow()
+        window.warm(documents)
+        return window
+    window_bytes = measure(build_window)
+
+    print(f"events={args.events}")
+    print(f"documents       {documents_bytes / args.events:8.0f} bytes/event")
+    print(f"records         {records_bytes / args.events:8.0f} bytes/event")
+    print(f"window (total)  {window_bytes / args.events:8.0f} bytes/event")
+    print(f"records use {records_bytes / documents_bytes:.1%} of the memory of the documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Compares Hermes' per-event intake (/receive_shared_data) with its batch intake
+(/receive_shared_data/batch) at several batch sizes.
+
+Events are posted in-process through the ASGI interface, without a server or network, to a
+Hermes whose MongoDB is replaced by the InMemoryAnomalyStore and whose window is filled with
+synthetic events. Every mode receives the same events in the same order; the time per event
+covers request handling, decoding, correlation and buffering the enriched event. The time spent
+in process_event is measured as well; the rest is the intake overhead per event, which batching
+divides among the events of a batch. Stored events are written after the run.
+
+With --check, every batch size must find the same correlations for every event as the
+per-event intake, and the largest batch size must cut the intake overhead per event at least
+--min-overhead-reduction times.
+
+Usage:
+    python benchmarks/bench_hermes_batch_intake.py --events 5000 --batch-sizes 1 10 50 100 --check
+"""
+import asyncio
+import gc
+import json
+import logging
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from anomaly_store import InMemoryAnomalyStore  # noqa: E402
+from bench_notification_routing import post  # noqa: E402
+from hermes_agent import HermesAgent  # noqa: E402
+from synthetic import build_event, build_supis  # noqa: E402
+
+
+async def run_mode(batch_size, window, events):
+    """
+    Posts the events to a fresh Hermes, one by one or in batches.
+
+    Returns:
+        tuple: Microseconds per event, of them in process_event, and the correlations found by event _id.
+    """
+    store = InMemoryAnomalyStore()
+    await store.insert_many(json.loads(json.dumps(window)))
+    # Nothing is written while the events are posted
+    agent = HermesAgent(store=store, write_batch_size=len(events) + 1)
+    await agent.warm_correlation_window()
+    # Correlated files are generated but not uploaded
+    agent.uploader.enqueue = lambda file_data: None
+
+    processing_seconds = 0.0
+    process_event = agent.process_event
+
+    async def timed_process_event(shared_data):
+        nonlocal processing_seconds
+        start = time.perf_counter()
+        try:
+            return await process_event(shared_data)
+        finally:
+            processing_seconds += time.perf_counter() - start
+
+    agent.process_event = timed_process_event
+
+    bodies = []
+    for start in range(0, len(events), batch_size):
+        batch = events[start:start + batch_size]
+        if batch_size == 1:
+            bodies.append(("/receive_shared_data", json.dumps(batch[0]).encode()))
+        else:
+            bodies.append(("/receive_shared_data/batch", json.dumps(batch).encode()))
+
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    for path, body in bodies:
+        status = await post(agent.app, path, body)
+        if status != 200:
+            sys.exit(f"{path} failed with status {status}")
+    seconds = time.perf_counter() - start
+    gc.enable()
+    await agent.write_buffer.stop()
+
+    correlations = {_id: document["correlation_data"]
+                    for _id, document in store.documents.items() if "correlation_data" in document}
+    return seconds / len(events) * 1e6, processing_seconds / len(events) * 1e6, correlations
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    supis = build_supis(rng, args.supis)
+    # Old enough to stay in every mode's window for the whole run
+    window = [build_event(rng, supis, max_age_minutes=50) for _ in range(args.window_size)]
+    events = [build_event(rng, supis) for _ in range(args.events)]
+    # Fixed _ids, so the correlations of the modes can be compared
+    for index, event in enumerate(window + events):
+        event["_id"] = f"{index:024x}"
+    for event in events:
+        for notification in event["eventNotifications"]:
+            notification["timeStampGen"] = str(notification["timeStampGen"])
+
+    results = {}
+    for batch_size in args.batch_sizes:
+        # The run with the least overhead counts
+        runs = [await run_mode(batch_size, window, events) for _ in range(args.repeat)]
+        per_event_us, processing_us, correlations = min(runs, key=lambda run: run[0] - run[1])
+        overhead_us = per_event_us - processing_us
+        results[batch_size] = (overhead_us, correlations)
+        print(f"batch size {batch_size:>5}  {per_event_us:8.1f} us/event  process_event {processing_us:7.1f} us  "
+              f"intake overhead {overhead_us:7.1f} us  {sum(map(len, correlations.values()))} correlations")
+
+    if args.check:
+        baseline = results[args.batch_sizes[0]]
+        for batch_size, (_, correlations) in results.items():
+            if correlations != baseline[1]:
+                sys.exit(f"batch size {batch_size} finds other correlations than batch size {args.batch_sizes[0]}")
+        largest = max(args.batch_sizes)
+        if baseline[0] < results[largest][0] * args.min_overhead_reduction:
+            sys.exit(f"batch size {largest} cuts the intake overhead less than {args.min_overhead_reduction}x")
+        print("all batch sizes find the same correlations")
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--window-size", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 50, 100],
+                        help="1 posts every event to /receive_shared_data; the first size is the baseline")
+    parser.add_argument("--supis", type=int, default=500, help="size of the SUPI pool")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode, the fastest counts")
+    parser.add_argument("--min-overhead-reduction", type=float, default=4.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error if correlations differ or batching is not faster")
+    return parser
+
+
+def main():
+    # Hermes logs every request it receives; only the intake itself is measured
+    logging.disable(logging.INFO)
+    asyncio.run(run(argparser().parse_args()))
+
+
+if __name__ == "__main__":
+    main()
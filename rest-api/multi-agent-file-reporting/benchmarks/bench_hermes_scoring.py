@@ -0,0 +1,361 @@
+"""
+Microbenchmarks of Hermes' correlation hot path, each function timed in isolation:
+check_correlation_rules, calculate_correlation_score, calculate_proximity_score,
+calculate_additional_metric and generate_file_content.
+
+The correlation windows are synthetic events distributed like file-generator.py's: its anomaly
+weights, Berlin coordinates and a shared SUPI pool. check_correlation_rules is timed with the
+candidates Hermes' window hands it, over three sweeps:
+
+- window size, at the default SUPI overlap and anomaly mix;
+- SUPI overlap, the share of window events whose SUPI comes from the pool incoming events use,
+  at --base-window events;
+- location share, the share of window and incoming events whose anomaly type takes part in a
+  location proximity rule, at --base-window events.
+
+The other functions are timed per call over pairs taken from the --base-window window.
+
+Like pytest-benchmark, every benchmark runs rounds over its inputs until --min-rounds and
+--max-time are reached, with the garbage collector disabled, and reports min, max, mean,
+median, standard deviation and operations per second per call. The results can be saved as
+JSON together with the commit and machine; --compare prints the change of every benchmark's
+median (or --compare-stat) against a saved run, and --compare-fail makes the run fail on a
+slowdown beyond the given percentage.
+
+Usage:
+    python benchmarks/bench_hermes_scoring.py --output scoring.json
+    python benchmarks/bench_hermes_scoring.py --window-sizes 100 1000 10000 100000 --compare scoring.json \\
+        --compare-fail 10
+"""
+import dataclasses
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from anomaly_store import InMemoryAnomalyStore  # noqa: E402
+from bench_batch_scoring import METRIC_TYPES  # noqa: E402
+from bench_end_to_end import git_commit  # noqa: E402
+from correlation_event import CorrelationEvent  # noqa: E402
+from correlation_rules import DEFAULT_CORRELATION_RULES, CorrelationRule  # noqa: E402
+from hermes_agent import HermesAgent  # noqa: E402
+from synthetic import ANOMALY_TYPES, ANOMALY_WEIGHTS, berlin_location, build_event, build_supis  # noqa: E402
+
+# The anomaly types taking part in a rule with a location proximity condition
+LOCATION_RULE_TYPES = sorted({
+    anomaly_type
+    for rule in DEFAULT_CORRELATION_RULES
+    if any(condition["type"] == "location" for condition in rule["conditions"])
+    for anomaly_type in rule["anomalies"]
+})
+
+# A rule scoring every additional metric; the default rules have none. The metrics are set on the
+# compiled rule, since calculate_additional_metric dispatches on the metric name as "type"
+ADDITIONAL_METRICS_RULE = dataclasses.replace(
+    CorrelationRule.from_dict(DEFAULT_CORRELATION_RULES[0]),
+    name="Every additional metric",
+    additional_metrics=tuple({"type": metric} for metric in METRIC_TYPES),
+)
+
+# Sizes of the correlation lists generate_file_content embeds
+CORRELATION_COUNTS = [0, 10, 100]
+
+
+class Workload:
+    """
+        A Hermes agent with a synthetic correlation window and incoming events drawn from the
+        same distribution.
+    """
+
+    def __init__(self, window_size, overlap, location_share, num_supis, num_events, seed):
+        """
+                Builds the window and the incoming events.
+
+                Args:
+                    window_size (int): Number of events in the correlation window.
+                    overlap (float): Share of window events with a SUPI of the pool incoming events use,
+                        the others get a SUPI of their own.
+                    location_share (float or None): Share of events with an anomaly type of a location
+                        rule, None for file-generator.py's weights.
+                    num_supis (int): Size of the shared SUPI pool.
+                    num_events (int): Number of incoming events.
+                    seed (int): Seeds the window and the incoming events.
+        """
+        rng = random.Random(seed)
+        self.location_share = location_share
+        self.supis = build_supis(rng, num_supis)
+        self.agent = HermesAgent(store=InMemoryAnomalyStore())
+        documents = []
+        for index in range(window_size):
+            supis = self.supis if rng.random() < overlap else build_supis(rng, 1)
+            documents.append(self.build_document(rng, supis, f"{index:024x}", max_age_minutes=55))
+        self.agent.correlation_window.warm(documents)
+
+        self.documents = [self.build_document(rng, self.supis, None, max_age_minutes=0) for _ in range(num_events)]
+        self.events = []
+        for document in self.documents:
+            event = CorrelationEvent.from_document(document)
+            candidates = self.agent.correlation_window.candidates(
+                event, self.agent.relevant_anomaly_types(event.anomaly_type))
+            self.events.append((event, candidates))
+
+    def anomaly_type(self, rng):
+        if self.location_share is None:
+            return rng.choices(ANOMALY_TYPES, weights=ANOMALY_WEIGHTS)[0]
+        location = rng.random() < self.location_share
+        types, weights = zip(*((anomaly_type, weight) for anomaly_type, weight in zip(ANOMALY_TYPES, ANOMALY_WEIGHTS)
+                               if (anomaly_type in LOCATION_RULE_TYPES) == location))
+        return rng.choices(types, weights=weights)[0]
+
+    def build_document(self, rng, supis, key, max_age_minutes):
+        document = build_event(rng, supis, self.anomaly_type(rng), max_age_minutes)
+        document["_id"] = key
+        for notification in document["eventNotifications"]:
+            notification["timeStampGen"] = datetime.fromisoformat(notification["timeStampGen"]).astimezone(timezone.utc)
+        return document
+
+    @property
+    def mean_candidates(self):
+        return sum(len(candidates) for _, candidates in self.events) / len(self.events)
+
+    def scored_pairs(self):
+        """
+        Returns the arguments of calculate_correlation_score for every candidate pair with a rule
+        whose time condition is met, grouped by the kind of rule.
+
+        Returns:
+            dict: Lists of keyword arguments for "time" rules, "location" rules and a rule with
+            every additional metric.
+        """
+        pairs = {"time": [], "location": [], "additional_metrics": []}
+        for event, candidates in self.events:
+            for candidate in candidates:
+                if event.supis.isdisjoint(candidate.supis):
+                    continue
+                time_difference = timedelta(seconds=abs(event.time - candidate.time))
+                arguments = {"ue_ids_match": True, "time_difference": time_difference, "event": event,
+                             "recent_event": candidate}
+                for rule in self.agent.correlation_rules.rules_for(event.anomaly_type, candidate.anomaly_type):
+                    if rule.time_condition_met(time_difference):
+                        kind = "time" if rule.location_threshold_km is None else "location"
+                        pairs[kind].append({**arguments, "rule": rule})
+                pairs["additional_metrics"].append({**arguments, "rule": ADDITIONAL_METRICS_RULE})
+        return pairs
+
+
+def run_benchmark(function, inputs, min_rounds, max_time):
+    """
+    Times function over all inputs per round, until min_rounds rounds ran and max_time passed.
+
+    Args:
+        function (callable): Called with every input, unpacked if it is a dict.
+        inputs (list): The inputs of one round.
+        min_rounds (int): Minimum number of rounds.
+        max_time (float): Rounds are started until this many seconds passed.
+
+    Returns:
+        dict: The statistics of one call in seconds, the rounds and the calls per round.
+    """
+    calls = [(lambda kwargs=item: function(**kwargs)) if isinstance(item, dict)
+             else (lambda args=item: function(*args)) for item in inputs]
+    # Untimed warm-up, e.g. for lazy imports and caches
+    for call in calls[:10]:
+        call()
+
+    per_call = []
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        while len(per_call) < min_rounds or time.perf_counter() - started < max_time:
+            start = time.perf_counter()
+            for call in calls:
+                call()
+            per_call.append((time.perf_counter() - start) / len(calls))
+    finally:
+        gc.enable()
+
+    mean = statistics.fmean(per_call)
+    return {
+        "min": min(per_call),
+        "max": max(per_call),
+        "mean": mean,
+        "median": statistics.median(per_call),
+        "stddev": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        "rounds": len(per_call),
+        "iterations": len(calls),
+        "ops": 1 / mean if mean else 0.0,
+    }
+
+
+def fullname(name, params):
+    return f"{name}[{'-'.join(f'{key}={value}' for key, value in params.items())}]"
+
+
+class Suite:
+    """
+        Runs the benchmarks and collects their results.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+
+    def run(self, group, name, params, function, inputs, **extra_info):
+        if not inputs:
+            print(f"{fullname(name, params):<80} skipped, no inputs")
+            return
+        stats = run_benchmark(function, inputs, self.args.min_rounds, self.args.max_time)
+        self.results.append({
+            "group": group,
+            "name": name,
+            "fullname": fullname(name, params),
+            "params": params,
+            "stats": stats,
+            "extra_info": extra_info,
+        })
+        print(f"{fullname(name, params):<80} median {stats['median'] * 1e6:12.3f} us  "
+              f"stddev {stats['stddev'] * 1e6:10.3f} us  rounds {stats['rounds']:>5}")
+
+    def workload(self, window_size, overlap, location_share):
+        return Workload(window_size, overlap, location_share, self.args.supis, self.args.events, self.args.seed)
+
+    def check_correlation_rules(self, group, workload, params):
+        self.run(group, "check_correlation_rules", params, workload.agent.check_correlation_rules, workload.events,
+                 mean_candidates=workload.mean_candidates)
+
+    def run_all(self):
+        args = self.args
+        for window_size in args.window_sizes:
+            workload = self.workload(window_size, args.overlap, args.location_share)
+            self.check_correlation_rules("window_size", workload, {"window": window_size})
+
+        for overlap in args.overlaps:
+            workload = self.workload(args.base_window, overlap, args.location_share)
+            self.check_correlation_rules("supi_overlap", workload, {"window": args.base_window, "overlap": overlap})
+
+        for location_share in args.location_shares:
+            workload = self.workload(args.base_window, args.overlap, location_share)
+            self.check_correlation_rules("location_share", workload,
+                                         {"window": args.base_window, "location_share": location_share})
+
+        workload = self.workload(args.base_window, args.overlap, args.location_share)
+        agent = workload.agent
+        limit = args.max_pairs
+        for kind, pairs in workload.scored_pairs().items():
+            self.run("calculate_correlation_score", "calculate_correlation_score", {"rule": kind},
+                     agent.calculate_correlation_score, pairs[:limit])
+
+        rng = random.Random(args.seed)
+        locations = [tuple(berlin_location(rng)[key] for key in ("latitude", "longitude")) for _ in range(limit + 1)]
+        self.run("calculate_proximity_score", "calculate_proximity_score", {"threshold_km": 5},
+                 HermesAgent.calculate_proximity_score,
+                 [(locations[index], locations[index + 1], 5) for index in range(limit)])
+
+        event_pairs = [(event, candidate) for event, candidates in workload.events for candidate in candidates][:limit]
+        for metric in METRIC_TYPES:
+            condition = {"type": metric}
+            self.run("calculate_additional_metric", "calculate_additional_metric", {"metric": metric},
+                     HermesAgent.calculate_additional_metric,
+                     [(event, candidate, condition) for event, candidate in event_pairs])
+
+        correlations = [
+            {"rule_name": "Synthetic correlation", "correlated_event_id": f"{index:024x}", "correlation_score": 0.5}
+            for index in range(max(CORRELATION_COUNTS))
+        ]
+        for count in CORRELATION_COUNTS:
+            self.run("generate_file_content", "generate_file_content", {"correlations": count},
+                     agent.generate_file_content,
+                     [(document, correlations[:count]) for document in workload.documents])
+
+
+def compare(results, baseline, stat="median", fail_percent=None):
+    """
+    Prints the change of a statistic of every benchmark against a baseline run.
+
+    Returns:
+        list[str]: The benchmarks slower than the baseline by more than fail_percent.
+    """
+    previous = {benchmark["fullname"]: benchmark["stats"] for benchmark in baseline["benchmarks"]}
+    commit = (baseline.get("commit_info") or {}).get("commit", "")[:12] or "baseline"
+    print(f"{stat} against {commit}:")
+    failed = []
+    for benchmark in results:
+        stats = previous.get(benchmark["fullname"])
+        if stats is None or not stats[stat]:
+            continue
+        change = (benchmark["stats"][stat] - stats[stat]) / stats[stat] * 100
+        print(f"  {benchmark['fullname']:<78} {stats[stat] * 1e6:12.3f} -> "
+              f"{benchmark['stats'][stat] * 1e6:12.3f} us  {change:+7.1f} %")
+        if fail_percent is not None and change > fail_percent:
+            failed.append(f"{benchmark['fullname']} {change:+.1f} %")
+    return failed
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser()
+    parser.add_argument("--window-sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--base-window", type=int, default=10000,
+                        help="window size of the overlap and location share sweeps and the per-call benchmarks")
+    parser.add_argument("--overlap", type=float, default=1.0, help="SUPI overlap outside the overlap sweep")
+    parser.add_argument("--overlaps", type=float, nargs="+", default=[0.01, 0.1, 0.5, 1.0])
+    parser.add_argument("--location-share", type=float, default=None,
+                        help="location share outside the location sweep, file-generator.py's weights by default")
+    parser.add_argument("--location-shares", type=float, nargs="+", default=[0.0, 0.5, 1.0])
+    parser.add_argument("--supis", type=int, default=5, help="size of the shared SUPI pool, like file-generator.py")
+    parser.add_argument("--events", type=int, default=20, help="incoming events per window")
+    parser.add_argument("--max-pairs", type=int, default=1000, help="inputs of the per-call benchmarks")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--max-time", type=float, default=1.0, help="seconds each benchmark runs rounds for")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="save the results as JSON to this file")
+    parser.add_argument("--compare", help="results saved before, to compare against")
+    parser.add_argument("--compare-stat", choices=["min", "median", "mean"], default="median",
+                        help="the statistic compared; min is the least sensitive to noise of a busy machine")
+    parser.add_argument("--compare-fail", type=float, metavar="PERCENT",
+                        help="exit with an error if a benchmark is this many percent slower than in --compare")
+    return parser
+
+
+def main():
+    args = argparser().parse_args()
+    suite = Suite(args)
+    suite.run_all()
+
+    report = {
+        "machine_info": {
+            "python_version": platform.python_version(),
+            "python_implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+        },
+        "commit_info": git_commit(),
+        "datetime": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "benchmarks": suite.results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"saved results to {args.output}")
+    if args.compare:
+        with open(args.compare) as file:
+            failed = compare(suite.results, json.load(file), args.compare_stat, args.compare_fail)
+        if failed:
+            sys.exit(f"slower than the baseline: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Measures what it costs an examiner agent to route a notification to its file type handling, over
+a long run of notifications.
+
+Notifications are posted to the agent's /notifications endpoint in-process through the ASGI
+interface, without a server or network. The file processing behind the dispatch table is
+replaced by a no-op, so only request handling, routing and dispatch are timed. For every block
+of notifications the mean time per notification and the number of registered routes are
+reported; both have to stay flat as the run goes on.
+
+With --check, the run fails if routes were added while serving or the last block is more than
+--max-slowdown times slower than the first.
+
+Usage:
+    python benchmarks/bench_notification_routing.py --notifications 2000000 --block-size 200000 --check
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base_agent import BaseExaminerAgent  # noqa: E402
+
+FILE_TYPES = ["Trace", "Analytics", "Proprietary"]
+
+
+def build_body(index, files_per_notification):
+    file_info_list = [
+        {
+            "fileLocation": f"http://localhost:8080/fileDataReportingMnS/v1/files/{index * files_per_notification + offset:024x}",
+            "fileDataType": FILE_TYPES[(index + offset) % len(FILE_TYPES)],
+            "fileReadyTime": "2024-01-01T00:00:00+00:00",
+        }
+        for offset in range(files_per_notification)
+    ]
+    return json.dumps({"notificationType": "notifyFileReady", "fileInfoList": file_info_list}).encode()
+
+
+async def post(app, path, body):
+    """Posts a JSON body to the ASGI app and returns the response status."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 5558),
+    }
+    received = False
+    status = None
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run(args):
+    agent = BaseExaminerAgent("127.0.0.1", 5558, FILE_TYPES, "http://localhost:8081/receive_shared_data")
+    dispatched = {file_type: 0 for file_type in FILE_TYPES}
+
+    def count(file_type):
+        async def handle(file_info_list):
+            dispatched[file_type] += len(file_info_list)
+        return handle
+
+    # Only routing and dispatch are measured
+    agent.file_type_handlers = {file_type: count(file_type) for file_type in FILE_TYPES}
+    routes_before = len(agent.app.router.routes)
+
+    # Prebuilt bodies, reused round robin
+    bodies = [build_body(index, args.files_per_notification) for index in range(100)]
+
+    blocks = []
+    sent = 0
+    while sent < args.notifications:
+        block = min(args.block_size, args.notifications - sent)
+        start = time.perf_counter()
+        for index in range(sent, sent + block):
+            status = await post(agent.app, "/notifications", bodies[index % len(bodies)])
+            if status != 200:
+                sys.exit(f"notification {index} failed with status {status}")
+        blocks.append((time.perf_counter() - start) / block)
+        sent += block
+        print(f"{sent:>9} notifications  {blocks[-1] * 1e6:8.1f} us/notification  "
+              f"routes={len(agent.app.router.routes)}")
+
+    routes_after = len(agent.app.router.routes)
+    print(f"dispatched files: {dispatched}")
+
+    if args.check:
+        if routes_after != routes_before:
+            sys.exit(f"routes grew from {routes_before} to {routes_after} while serving")
+        if blocks[-1] > blocks[0] * args.max_slowdown:
+            sys.exit(f"routing slowed down from {blocks[0] * 1e6:.1f} to {blocks[-1] * 1e6:.1f} us/notification")
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser()
+    parser.add_argument("--notifications", type=int, default=200000)
+    parser.add_argument("--block-size", type=int, default=20000)
+    parser.add_argument("--files-per-notification", type=int, default=3)
+    parser.add_argument("--max-slowdown", type=float, default=1.5)
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error if routes grow or routing gets slower over the run")
+    return parser
+
+
+def main():
+    asyncio.run(run(argparser().parse_args()))
+
+
+if __name__ == "__main__":
+    main()
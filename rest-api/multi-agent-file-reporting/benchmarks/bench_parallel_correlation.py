@@ -0,0 +1,113 @@
+"""
+Compares scoring large candidate sets inline in the event loop with scoring them in the
+CorrelationPool's worker processes.
+
+The window is filled with synthetic events of a small SUPI pool, so an incoming event has
+thousands of candidates. The incoming events are scored once inline with
+check_correlation_rules and once, concurrently, by the pool. Meanwhile a ticker task measures
+how late the event loop wakes it up, i.e. how long the loop is blocked.
+
+With --check, both modes must find the same correlations in the same order with scores equal
+within --tolerance, and the loop must stay more responsive while the pool scores.
+
+Usage:
+    python benchmarks/bench_parallel_correlation.py --window-size 100000 --workers 4 --check
+"""
+import asyncio
+import os
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_batch_scoring import build_agent, compare, incoming_events  # noqa: E402
+from correlation_pool import CorrelationPool  # noqa: E402
+
+TICK_SECONDS = 0.001
+
+
+async def measure_loop_lag(stop):
+    """Returns the largest delay of a 1 ms tick while stop is unset."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        worst = max(worst, time.perf_counter() - start - TICK_SECONDS)
+    return worst
+
+
+async def run_mode(score, events):
+    """Runs score() while the ticker runs; returns seconds per event, worst loop lag and the results."""
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(TICK_SECONDS)
+    start = time.perf_counter()
+    results = await score(events)
+    seconds = time.perf_counter() - start
+    stop.set()
+    return seconds / len(events), await ticker, results
+
+
+async def run(args):
+    agent, supis = build_agent(args.window_size, args.supis, None, args.seed)
+    events = incoming_events(agent, supis, args.events, args.seed)
+    mean_candidates = sum(len(candidates) for _, candidates in events) / len(events)
+
+    async def inline(events):
+        results = []
+        for event, candidates in events:
+            results.append(agent.check_correlation_rules(event, candidates))
+            # Yields like process_event would between events
+            await asyncio.sleep(0)
+        return results
+
+    async def pooled(events):
+        return await asyncio.gather(*(agent.correlation_pool.check_correlation_rules(event, candidates)
+                                      for event, candidates in events))
+
+    start = time.perf_counter()
+    agent.correlation_pool = CorrelationPool(args.workers, agent.correlation_rules)
+    agent.correlation_pool.start(agent.correlation_window)
+    # The workers receive their shards when they first run
+    await agent.correlation_pool.check_correlation_rules(*events[0])
+    print(f"window={args.window_size} candidates={mean_candidates:.0f} workers={args.workers} "
+          f"pool start-up {time.perf_counter() - start:.2f} s")
+
+    try:
+        inline_seconds, inline_lag, inline_results = await run_mode(inline, events)
+        pool_seconds, pool_lag, pool_results = await run_mode(pooled, events)
+    finally:
+        agent.correlation_pool.stop()
+
+    print(f"inline  {inline_seconds * 1000:8.2f} ms/event, event loop blocked up to {inline_lag * 1000:8.2f} ms")
+    print(f"pool    {pool_seconds * 1000:8.2f} ms/event, event loop blocked up to {pool_lag * 1000:8.2f} ms")
+
+    if args.check:
+        compared = compare(inline_results, pool_results, args.tolerance)
+        print(f"{compared} correlations match")
+        if pool_lag >= inline_lag:
+            sys.exit("the event loop is not more responsive with the pool")
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser()
+    parser.add_argument("--window-size", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--supis", type=int, default=5, help="size of the SUPI pool")
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error if the modes disagree or the pool blocks the loop as much")
+    return parser
+
+
+def main():
+    asyncio.run(run(argparser().parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compares the serialization backends on the payloads of the agents and Hermes: anomaly events as
+Hermes receives them, notifyFileReady notifications as the agents receive them, and events
+encoded for forwarding.
+
+With --check, every installed backend must decode the same events (timeStampGen as UTC
+datetime) and FileInfos as the json backend, and the selected default backend must be faster
+than json at decoding events.
+
+Usage:
+    python benchmarks/bench_serialization.py --events 2000 --check
+"""
+import json
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import serialization  # noqa: E402
+from synthetic import build_event, build_supis  # noqa: E402
+
+
+def build_payloads(num_events, seed):
+    rng = random.Random(seed)
+    supis = build_supis(rng, 100)
+    events = []
+    for index in range(num_events):
+        event = build_event(rng, supis, max_age_minutes=30)
+        event["_id"] = f"{index:024x}"
+        events.append(json.dumps(event).encode())
+    notifications = [
+        json.dumps({
+            "href": "10.0.4.101:2000",
+            "notificationId": 1,
+            "notificationType": "notifyFileReady",
+            "eventTime": "2024-01-01T00:00:00+00:00",
+            "systemDN": "",
+            "fileInfoList": [
+                {
+                    "fileLocation": f"http://localhost:8080/fileDataReportingMnS/v1/files/{index * 10 + offset:024x}",
+                    "fileDataType": "Trace",
+                    "fileReadyTime": "2024-01-01T00:00:00+00:00",
+                    "fileExpirationTime": "2024-01-02T00:00:00+00:00",
+                }
+                for offset in range(10)
+            ],
+            "additionalText": "",
+        }).encode()
+        for index in range(max(1, num_events // 10))
+    ]
+    return events, notifications
+
+
+def timed(function, payloads):
+    """Returns the mean microseconds per payload and the results."""
+    start = time.perf_counter()
+    results = [function(payload) for payload in payloads]
+    return (time.perf_counter() - start) / len(payloads) * 1e6, results
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error if the backends disagree or the default is not faster than json")
+    return parser
+
+
+def main():
+    args = argparser().parse_args()
+    events, notifications = build_payloads(args.events, args.seed)
+    default = serialization.backend.name
+    installed = [name for name, available in serialization._available().items() if available]
+
+    results = {}
+    timings = {}
+    for name in installed:
+        backend = serialization.BACKENDS[name]()
+        decode_us, decoded = timed(backend.decode_event, events)
+        notification_us, file_infos = timed(backend.decode_file_info_list, notifications)
+        encode_us, _ = timed(backend.dumps, decoded)
+        results[name] = (decoded, file_infos)
+        timings[name] = decode_us
+        print(f"{name:8} decode event {decode_us:7.1f} us  decode notification {notification_us:7.1f} us  "
+              f"encode event {encode_us:7.1f} us{'  (default)' if name == default else ''}")
+
+    if args.check:
+        for name in installed:
+            if results[name] != results["json"]:
+                sys.exit(f"{name} decodes differently from json")
+        if default != "json" and timings[default] >= timings["json"]:
+            sys.exit(f"{default} is not faster than json at decoding events")
+        print(f"{', '.join(installed)} decode identically")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measures how Hermes' event throughput scales with the size of the storage connection pool.
+
+MongoDB is replaced by the in-process InMemoryAnomalyStore, whose simulated round-trip latency
+holds one pool slot per operation. Write batching is turned off (one insert per event), so the
+run isolates the storage layer: with non-blocking access, concurrent events overlap their
+database round-trips and throughput grows with the pool size instead of staying flat.
+
+Usage:
+    python benchmarks/bench_store_concurrency.py --events 400 --latency-ms 5 --pool-sizes 1 4 16 --check
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from anomaly_store import InMemoryAnomalyStore  # noqa: E402
+from hermes_agent import HermesAgent  # noqa: E402
+from serialization import decode_event, dumps  # noqa: E402
+from synthetic import build_event, build_supis  # noqa: E402
+
+
+async def run(pool_size, num_events, latency_seconds, seed):
+    """
+    Pushes num_events concurrent events through HermesAgent.process_event.
+
+    Returns:
+        float: The achieved throughput in events per second.
+    """
+    rng = random.Random(seed)
+    supis = build_supis(rng, 50)
+    agent = HermesAgent(store=InMemoryAnomalyStore(pool_size=pool_size, latency_seconds=latency_seconds),
+                        write_batch_size=1)
+    # Decoded like Hermes decodes a received event
+    events = [decode_event(dumps(build_event(rng, supis))) for _ in range(num_events)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(agent.process_event(event) for event in events))
+    await agent.write_buffer.stop()
+    return num_events / (time.perf_counter() - start)
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser()
+    parser.add_argument("--events", type=int, default=400)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error if throughput does not grow with the pool size")
+    return parser
+
+
+def main():
+    args = argparser().parse_args()
+    results = []
+    for pool_size in args.pool_sizes:
+        throughput = asyncio.run(run(pool_size, args.events, args.latency_ms / 1000, args.seed))
+        results.append((pool_size, throughput))
+        print(f"pool_size={pool_size:<4} throughput={throughput:10.1f} events/s")
+
+    if args.check:
+        for (small_pool, small), (large_pool, large) in zip(results, results[1:]):
+            if large <= small * 1.5:
+                print(f"FAIL: pool_size {large_pool} is not faster than pool_size {small_pool}")
+                sys.exit(1)
+        print("OK: throughput scales with pool size")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Checks that Hermes' queries of the anomalies collection are served by the indexes it creates.
+
+Synthetic events are inserted into a scratch collection, the indexes are created with
+MongoAnomalyStore.ensure_indexes, and the winning plans of the recent-events query (warming) and
+of the candidate query (non-resident window) are printed together with the time they take.
+
+With --check, both plans must use an index scan and no collection scan, and the candidate query
+must return exactly the events matching its conditions. The scratch collection is dropped
+afterwards.
+
+Usage:
+    python benchmarks/check_anomaly_indexes.py --mongo-uri mongodb://localhost:27017 --events 100000 --check
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from anomaly_store import MongoAnomalyStore, plan_stages  # noqa: E402
+from correlation_event import CorrelationEvent, to_utc  # noqa: E402
+from correlation_rules import CorrelationRuleIndex, DEFAULT_CORRELATION_RULES  # noqa: E402
+from synthetic import build_event, build_supis  # noqa: E402
+
+
+def uses_index(stages):
+    return "IXSCAN" in stages and "COLLSCAN" not in stages
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    supis = build_supis(rng, args.supis)
+    store = MongoAnomalyStore(args.mongo_uri, args.db_name, args.collection)
+    await store.collection.drop()
+    try:
+        events = []
+        for _ in range(args.events):
+            event = build_event(rng, supis, max_age_minutes=args.max_age_minutes)
+            for notification in event["eventNotifications"]:
+                notification["timeStampGen"] = to_utc(notification["timeStampGen"])
+            events.append(event)
+        for start in range(0, len(events), 10000):
+            await store.insert_many(events[start:start + 10000])
+        await store.ensure_indexes(retention_seconds=args.retention_days * 24 * 3600)
+
+        since = datetime.now(timezone.utc) - timedelta(minutes=args.window_minutes)
+        event = CorrelationEvent.from_document(events[0])
+        anomaly_types = CorrelationRuleIndex(DEFAULT_CORRELATION_RULES).relevant_anomaly_types(event.anomaly_type)
+
+        recent_stages = plan_stages(await store.explain_find_recent(since))
+        candidates_stages = plan_stages(await store.explain_find_candidates(since, event.supis, anomaly_types))
+
+        start = time.perf_counter()
+        recent = await store.find_recent(since)
+        recent_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        candidates = await store.find_candidates(since, event.supis, anomaly_types)
+        candidates_seconds = time.perf_counter() - start
+
+        print(f"find_recent      {len(recent):>8} events {recent_seconds * 1000:8.1f} ms  plan {recent_stages}")
+        print(f"find_candidates  {len(candidates):>8} events {candidates_seconds * 1000:8.1f} ms  "
+              f"plan {candidates_stages}")
+
+        if args.check:
+            for name, stages in (("find_recent", recent_stages), ("find_candidates", candidates_stages)):
+                if not uses_index(stages):
+                    sys.exit(f"{name} does not use an index: {stages}")
+            expected = set()
+            for document in events:
+                record = CorrelationEvent.from_document(document)
+                if record.time >= since.timestamp() and record.anomaly_type in anomaly_types \
+                        and not record.supis.isdisjoint(event.supis):
+                    expected.add(document["_id"])
+            found = {document["_id"] for document in candidates}
+            if found != expected:
+                sys.exit(f"find_candidates returned {len(found)} events, expected {len(expected)}")
+            print("both queries use an index and find_candidates matches the filter")
+    finally:
+        await store.collection.drop()
+        store.close()
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser()
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="anomaly_data")
+    parser.add_argument("--collection", default="anomalies_index_check")
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--supis", type=int, default=1000, help="size of the SUPI pool")
+    parser.add_argument("--max-age-minutes", type=float, default=24 * 60)
+    parser.add_argument("--window-minutes", type=float, default=60)
+    parser.add_argument("--retention-days", type=float, default=7)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error if a query scans the collection or returns other events")
+    return parser
+
+
+def main():
+    asyncio.run(run(argparser().parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Randomized equivalence check of Hermes' NumPy batch scoring against the pair-by-pair scoring.
+
+Every trial draws its own correlation rules (anomaly pairs, time thresholds, location
+thresholds and additional metrics), a correlation window of synthetic events around a small
+SUPI pool, and an exact proximity margin. The events have the anomaly types of the drawn rules,
+so most rules find partners. Each incoming event is scored against several
+candidate lists taken from the window, including the empty list, a single candidate and the
+whole window with events that share no UE ID with the event, by both check_correlation_rules
+(batch scoring turned off) and check_correlation_rules_batch.
+
+Both paths must find the same correlations in the same order with scores equal within
+--tolerance, for every rule. The script exits with an error naming the failing seed otherwise.
+It also reports how many of the drawn rules produced correlations, so a run that compares
+nothing does not pass unnoticed.
+
+Usage:
+    python benchmarks/check_batch_scoring_equivalence.py --trials 200 --seed 1
+"""
+import dataclasses
+import os
+import random
+import sys
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_batch_scoring import METRIC_TYPES, build_document, compare  # noqa: E402
+from correlation_event import CorrelationEvent  # noqa: E402
+from correlation_rules import CorrelationRuleIndex  # noqa: E402
+from correlation_scoring import CorrelationScorer  # noqa: E402
+from correlation_window import CorrelationWindow  # noqa: E402
+from instrumentation import Metrics  # noqa: E402
+from synthetic import ANOMALY_TYPES, build_supis  # noqa: E402
+
+# Wider than the largest drawn time threshold, so no candidate is cut off by the window itself
+WINDOW_MINUTES = 120
+
+EXACT_MARGINS_KM = [None, 0.0, 0.5, 5.0, 1000.0]
+
+
+class MetricRuleIndex:
+    """
+        A CorrelationRuleIndex whose rules score the given additional metrics. They are set on the
+        compiled rules, since calculate_additional_metric dispatches on the metric name as "type".
+    """
+
+    def __init__(self, index, metrics_by_rule):
+        """
+                Initializes the index.
+
+                Args:
+                    index (CorrelationRuleIndex): The compiled rules.
+                    metrics_by_rule (dict): The metric names of each rule, by rule name.
+        """
+        self.index = index
+        self._rules = {
+            id(rule): dataclasses.replace(
+                rule, additional_metrics=tuple({"type": metric} for metric in metrics_by_rule[rule.name]))
+            for rule in index
+        }
+
+    def rules_for(self, event_type, recent_event_type):
+        return tuple(self._rules[id(rule)] for rule in self.index.rules_for(event_type, recent_event_type))
+
+
+class Scorer(CorrelationScorer):
+    """Hermes' scoring over a trial's window and rules."""
+
+    def __init__(self, window, correlation_rules, exact_proximity_margin_km):
+        self.correlation_window = window
+        self.correlation_rules = correlation_rules
+        self.exact_proximity_margin_km = exact_proximity_margin_km
+        # The scalar path must not hand large candidate lists to the batch path
+        self.batch_min_candidates = None
+        self.metrics = Metrics("check")
+
+
+def random_rule(rng, name):
+    """Returns a rule definition and the additional metrics it scores."""
+    conditions = [{"type": "ue_ids", "match": "intersection"}]
+    draw = rng.random()
+    if draw < 0.75:
+        threshold_minutes = rng.choice([rng.randint(1, 90), rng.uniform(0.5, 90)])
+        conditions.append({"type": "time", "match": "overlap", "threshold_minutes": threshold_minutes})
+    elif draw < 0.9:
+        # No time overlap condition, the rule never applies
+        conditions.append({"type": "time_interval", "match": "overlap"})
+    if rng.random() < 0.5:
+        threshold_km = rng.choice([rng.randint(1, 50), rng.uniform(0.1, 60)])
+        conditions.append({"type": "location", "match": "proximity", "threshold_km": threshold_km})
+    metrics = rng.sample(METRIC_TYPES, rng.randint(0, len(METRIC_TYPES)))
+    conditions.extend({"type": "additional_metric", "metric": metric} for metric in metrics)
+    rule = {"name": name, "anomalies": rng.sample(ANOMALY_TYPES, rng.choice([2, 2, 3])), "conditions": conditions}
+    return rule, metrics
+
+
+def candidate_lists(rng, event, window):
+    """Returns the candidate lists an incoming event is scored against."""
+    events = list(window)
+    sharing = window.candidates(event, ANOMALY_TYPES)
+    lists = [[], events, sharing, sharing[:1], rng.sample(events, rng.randint(0, len(events)))]
+    if events:
+        lists.append([rng.choice(events)])
+    return lists
+
+
+def run_trial(seed, args, fired):
+    """
+    Draws and checks one trial.
+
+    Args:
+        seed (int): The trial's seed.
+        args (Namespace): The command line arguments.
+        fired (dict): Correlations found per rule name, updated in place.
+
+    Returns:
+        tuple: The numbers of rules, candidate lists and correlations compared.
+    """
+    rng = random.Random(seed)
+    rules = [random_rule(rng, f"rule {seed}/{index}") for index in range(rng.randint(1, args.max_rules))]
+    index = MetricRuleIndex(CorrelationRuleIndex([rule for rule, _ in rules]),
+                            {rule["name"]: metrics for rule, metrics in rules})
+    for rule, _ in rules:
+        if any(condition["type"] == "time" for condition in rule["conditions"]):
+            fired.setdefault(rule["name"], 0)
+
+    supis = build_supis(rng, rng.randint(1, 5))
+    window = CorrelationWindow(window_minutes=WINDOW_MINUTES)
+    anomaly_types = sorted({anomaly_type for rule, _ in rules for anomaly_type in rule["anomalies"]})
+    # Empty and tiny windows now and then, their candidate lists take the edge cases
+    window_size = rng.randint(0, 2) if rng.random() < 0.2 else rng.randint(3, args.max_window)
+    window.warm(build_document(rng, supis, f"{seed:08x}{position:016x}", max_age_minutes=100,
+                               anomaly_type=rng.choice(anomaly_types))
+                for position in range(window_size))
+    scorer = Scorer(window, index, rng.choice(EXACT_MARGINS_KM))
+
+    lists = compared = 0
+    for _ in range(args.events):
+        document = build_document(rng, supis, None, max_age_minutes=20, anomaly_type=rng.choice(anomaly_types))
+        event = CorrelationEvent.from_document(document)
+        for candidates in candidate_lists(rng, event, window):
+            scalar = scorer.check_correlation_rules(event, candidates)
+            batch = scorer.check_correlation_rules_batch(event, candidates)
+            compared += compare([scalar], [batch], args.tolerance)
+            for correlation in scalar:
+                fired[correlation["rule_name"]] += 1
+            lists += 1
+    return len(rules), lists, compared
+
+
+def argparser() -> ArgumentParser:
+    """Returns command line arguments parser."""
+    parser = ArgumentParser()
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--events", type=int, default=5, help="incoming events scored per trial")
+    parser.add_argument("--max-rules", type=int, default=12, help="most rules drawn per trial")
+    parser.add_argument("--max-window", type=int, default=400, help="largest window drawn per trial")
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first trial")
+    return parser
+
+
+def main():
+    args = argparser().parse_args()
+    fired = {}
+    totals = [0, 0, 0]
+    for seed in range(args.seed, args.seed + args.trials):
+        try:
+            counts = run_trial(seed, args, fired)
+        except AssertionError as e:
+            sys.exit(f"seed {seed}: batch scoring differs from scalar scoring: {e}")
+        totals = [total + count for total, count in zip(totals, counts)]
+
+    print(f"trials={args.trials} rules={totals[0]} candidate_lists={totals[1]} correlations={totals[2]}")
+    never_fired = [name for name, count in fired.items() if not count]
+    print(f"{len(fired) - len(never_fired)} of {len(fired)} rules with a time condition produced correlations")
+    if not totals[2]:
+        sys.exit("no correlations were compared")
+
+
+if __name__ == "__main__":
+    main()
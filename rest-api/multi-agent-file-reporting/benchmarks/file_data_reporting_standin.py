@@ -0,0 +1,220 @@
+"""
+An in-process stand-in for the File Data Reporting REST API, for the end-to-end benchmark.
+
+It serves the endpoints the examiner agents and Hermes use (creating, fetching and retrieving
+files, subscribing) from memory and notifies subscribers like the REST API does: file infos are
+buffered per subscriber and sent once buffer_size of them are collected or no file was added for
+linger_ms. Subscription filters are matched the same way as the REST API's SubscriptionsService,
+and the same fdr.file_ingest, fdr.notification_buffer and fdr.notification_delivery spans are
+recorded.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+import aiohttp
+from fastapi import FastAPI, HTTPException, Request
+from serialization import FastJSONResponse, dumps, loads
+from tracing import TRACEPARENT, Tracer
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/fileDataReportingMnS/v1"
+
+# The FileInfo fields of a new file, besides its location
+FILE_INFO_FIELDS = ("fileDataType", "fileReadyTime", "fileExpirationTime", "fileSize", "fileCompression",
+                    "fileFormat")
+
+
+def filter_matches(subscription_filter, value):
+    """
+    Partially matches a subscription filter against (nested) file content, like the REST API.
+
+    Objects match if every key of the filter matches, arrays in the file match if any element
+    matches, and an array in the filter lists alternatives.
+    """
+    if value is None:
+        return False
+    if isinstance(value, list):
+        return any(filter_matches(subscription_filter, element) for element in value)
+    if isinstance(subscription_filter, list):
+        return any(filter_matches(alternative, value) for alternative in subscription_filter)
+    if isinstance(subscription_filter, dict):
+        if not isinstance(value, dict):
+            return False
+        return all(filter_matches(expected, value.get(key)) for key, expected in subscription_filter.items())
+    return subscription_filter == value
+
+
+class FileDataReportingStandIn:
+    """
+        Serves files and notifications from memory in place of the File Data Reporting REST API.
+    """
+
+    def __init__(self, base_url, buffer_size=10, linger_ms=5000, tracer=None):
+        """
+                Initializes the stand-in.
+
+                Args:
+                    base_url (str): The URL the stand-in is served at, fileLocations point there.
+                    buffer_size (int): Number of buffered file infos that triggers a notification.
+                    linger_ms (float): A subscriber's buffer is notified once no file was added
+                        to it for this long.
+                    tracer (Tracer, optional): Records the spans of the files.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.files_url = f"{self.base_url}{API_PREFIX}/files"
+        self.buffer_size = buffer_size
+        self.linger_seconds = linger_ms / 1000
+        self.tracer = tracer or Tracer("file-data-reporting")
+
+        self.files = {}
+        self.subscriptions = []
+        self.session = None
+        # Buffered (file info, buffered at in Unix nanoseconds) and linger timers by subscriber
+        self._buffers = {}
+        self._timers = {}
+        self._deliveries = set()
+
+        # Counters
+        self.files_created = 0
+        self.notifications_sent = 0
+        self.notified_files = 0
+        self.failed_notifications = 0
+
+        self.app = FastAPI(lifespan=self.lifespan_context, default_response_class=FastJSONResponse)
+        self.app.post(f"{API_PREFIX}/files", status_code=201)(self.create_file)
+        self.app.post(f"{API_PREFIX}/files/create_many", status_code=201)(self.create_files)
+        self.app.post(f"{API_PREFIX}/files/retrieve_many")(self.retrieve_files)
+        self.app.get(f"{API_PREFIX}/files/{{file_id}}")(self.get_file)
+        self.app.post(f"{API_PREFIX}/subscriptions", status_code=201)(self.create_subscription)
+        self.app.post(f"{API_PREFIX}/subscriptions/", status_code=201)(self.create_subscription)
+        self.app.get("/stats")(self.get_stats)
+
+    @asynccontextmanager
+    async def lifespan_context(self, app: FastAPI):
+        self.session = aiohttp.ClientSession()
+        try:
+            yield
+        finally:
+            for timer in self._timers.values():
+                timer.cancel()
+            if self._deliveries:
+                await asyncio.gather(*self._deliveries, return_exceptions=True)
+            await self.session.close()
+            self.tracer.close()
+
+    @property
+    def pending(self):
+        """The number of file infos buffered or being delivered."""
+        return sum(len(buffer) for buffer in self._buffers.values()) + len(self._deliveries)
+
+    async def create_file(self, request: Request):
+        file = loads(await request.body())
+        return {"fileId": self.add_file(file)}
+
+    async def create_files(self, request: Request):
+        return [self.add_file(file) for file in loads(await request.body())]
+
+    async def get_file(self, file_id: str):
+        file = self.files.get(file_id)
+        if file is None:
+            raise HTTPException(status_code=404, detail=f"file with id: {file_id} not found")
+        return file
+
+    async def retrieve_files(self, request: Request):
+        return [self.files[file_id] for file_id in dict.fromkeys(loads(await request.body())) if file_id in self.files]
+
+    async def create_subscription(self, request: Request):
+        subscription = loads(await request.body())
+        self.subscriptions.append((subscription["consumerReference"], subscription.get("filter") or {}))
+        return subscription
+
+    async def get_stats(self):
+        return {
+            "files": len(self.files),
+            "files_created": self.files_created,
+            "subscriptions": len(self.subscriptions),
+            "pending": self.pending,
+            "notifications_sent": self.notifications_sent,
+            "notified_files": self.notified_files,
+            "failed_notifications": self.failed_notifications,
+        }
+
+    def add_file(self, file):
+        """Stores a new file and buffers its file info for every matching subscriber."""
+        span = self.tracer.start_span("fdr.file_ingest", file.get(TRACEPARENT), fileDataType=file.get("fileDataType"))
+        self.files_created += 1
+        file_id = f"{self.files_created:024x}"
+        file_info = {field: file[field] for field in FILE_INFO_FIELDS if field in file}
+        file_info["fileLocation"] = f"{self.files_url}/{file_id}"
+        file_info[TRACEPARENT] = span.traceparent
+        content = file.get("fileContent") or {}
+        self.files[file_id] = {**content, "_id": file_id, "fileInfo": file_info}
+        span.set_attribute("fileId", file_id)
+        span.end()
+
+        consumers = dict.fromkeys(
+            consumer for consumer, subscription_filter in self.subscriptions
+            if subscription_filter.get("fileDataType", file_info.get("fileDataType")) == file_info.get("fileDataType")
+            and ("fileContent" not in subscription_filter
+                 or filter_matches(subscription_filter["fileContent"], content))
+        )
+        for consumer in consumers:
+            self._buffer(consumer, file_info)
+        return file_id
+
+    def _buffer(self, consumer, file_info):
+        buffer = self._buffers.setdefault(consumer, [])
+        buffer.append((file_info, time.time_ns()))
+        timer = self._timers.pop(consumer, None)
+        if timer is not None:
+            timer.cancel()
+        if len(buffer) >= self.buffer_size:
+            self._notify(consumer)
+        else:
+            self._timers[consumer] = asyncio.get_running_loop().call_later(self.linger_seconds, self._notify, consumer)
+
+    def _notify(self, consumer):
+        self._timers.pop(consumer, None)
+        buffered = self._buffers.pop(consumer, None)
+        if not buffered:
+            return
+        now_ns = time.time_ns()
+        if self.tracer.recording:
+            for file_info, buffered_ns in buffered:
+                self.tracer.record_span("fdr.notification_buffer", file_info[TRACEPARENT], buffered_ns, now_ns,
+                                        subscriber=consumer, bufferedFiles=len(buffered))
+        file_info_list = [file_info for file_info, _ in buffered]
+        task = asyncio.create_task(self._deliver(consumer, file_info_list))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, consumer, file_info_list):
+        body = {
+            "href": self.base_url,
+            "notificationId": 1,
+            "notificationType": "notifyFileReady",
+            "eventTime": file_info_list[0].get("fileReadyTime"),
+            "systemDN": "",
+            "fileInfoList": file_info_list,
+            "additionalText": "",
+        }
+        sent_ns = time.time_ns()
+        status = None
+        try:
+            async with self.session.post(consumer, data=dumps(body),
+                                         headers={"Content-Type": "application/json"}) as response:
+                status = response.status
+        except aiohttp.ClientError as e:
+            logger.error(f"Failed to notify {consumer}: {e}")
+        if status is not None and status < 300:
+            self.notifications_sent += 1
+            self.notified_files += len(file_info_list)
+        else:
+            self.failed_notifications += 1
+        if self.tracer.recording:
+            end_ns = time.time_ns()
+            for file_info in file_info_list:
+                self.tracer.record_span("fdr.notification_delivery", file_info[TRACEPARENT], sent_ns, end_ns,
+                                        subscriber=consumer, status=status)
@@ -0,0 +1,156 @@
+"""
+Synthetic anomaly events for the benchmarks.
+
+The events follow the documents file-generator.py creates, as the examiner agents forward them
+to Hermes: one notification with one abnormal behaviour and the additional measurements of its
+anomaly type (Berlin locations, radio measurements or service experience).
+"""
+from datetime import datetime, timedelta, timezone
+
+ANOMALY_TYPES = [
+    "UNEXPECTED_UE_LOCATION",
+    "UNEXPECTED_LONG_LIVE_FLOWS",
+    "SUSPICION_OF_DDOS_ATTACK",
+    "TOO_FREQUENT_SERVICE_ACCESS",
+    "UNEXPECTED_RADIO_LINK_FAILURES",
+    "UNEXPECTED_LOW_RATE_FLOWS",
+    "UNEXPECTED_LARGE_RATE_FLOW",
+]
+
+# Same weights as file-generator.py
+ANOMALY_WEIGHTS = [1, 1, 0.5, 1, 1, 0.5, 0.5]
+
+# The fileDataType file-generator.py reports each anomaly type as
+ANOMALY_FILE_TYPES = {
+    "UNEXPECTED_UE_LOCATION": "Trace",
+    "UNEXPECTED_LONG_LIVE_FLOWS": "Analytics",
+    "SUSPICION_OF_DDOS_ATTACK": "Proprietary",
+    "TOO_FREQUENT_SERVICE_ACCESS": "Performance",
+    "UNEXPECTED_RADIO_LINK_FAILURES": "Trace",
+    "UNEXPECTED_LOW_RATE_FLOWS": "Performance",
+    "UNEXPECTED_LARGE_RATE_FLOW": "Analytics",
+}
+
+BERLIN_COORDS = {
+    "lat_min": 52.3,
+    "lat_max": 52.7,
+    "lon_min": 13.0,
+    "lon_max": 13.7,
+}
+
+
+def build_supis(rng, count):
+    """Returns count random SUPIs."""
+    return [f"imsi-{rng.randrange(10 ** 14, 10 ** 15)}" for _ in range(count)]
+
+
+def berlin_location(rng):
+    return {
+        "longitude": round(rng.uniform(BERLIN_COORDS["lon_min"], BERLIN_COORDS["lon_max"]), 6),
+        "latitude": round(rng.uniform(BERLIN_COORDS["lat_min"], BERLIN_COORDS["lat_max"]), 6),
+        "tac": rng.randrange(10 ** 4, 10 ** 5),
+    }
+
+
+def _uuid(rng):
+    return "%08x-%04x-%04x-%04x-%012x" % (rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(16),
+                                          rng.getrandbits(16), rng.getrandbits(48))
+
+
+def _measurements(rng, anomaly_type):
+    if anomaly_type in ("UNEXPECTED_UE_LOCATION", "SUSPICION_OF_DDOS_ATTACK"):
+        measurements = {
+            "circums": [
+                {
+                    "freq": rng.random(),
+                    "tm": datetime.now(timezone.utc).isoformat(),
+                    "locArea": berlin_location(rng),
+                    "vol": rng.randint(100, 1000),
+                }
+            ]
+        }
+        if anomaly_type == "SUSPICION_OF_DDOS_ATTACK":
+            measurements["ddosAttack"] = {"ipv4Addrs": [f"10.{rng.randrange(256)}.{rng.randrange(256)}.1"]}
+        return measurements
+
+    if anomaly_type == "UNEXPECTED_RADIO_LINK_FAILURES":
+        return {
+            "nwPerfs": [
+                {
+                    "cellId": _uuid(rng),
+                    "failureCount": rng.randint(1, 10),
+                    "failureType": rng.choice(["Signal loss", "Failed handover"]),
+                    "signalQuality": {
+                        "RSRP": f"{rng.uniform(-120, -80):.2f} dBm",
+                        "SINR": f"{rng.uniform(-10, 20):.2f} dB",
+                    },
+                    "neighboringCells": [_uuid(rng) for _ in range(3)],
+                    "networkSlice": rng.choice(["SliceA", "SliceB", "SliceC"]),
+                    "details": "Unexpected radio link failures detected",
+                }
+            ]
+        }
+
+    return {
+        "svcExps": [
+            {
+                "svcExprc": {"serviceQuality": rng.uniform(0.1, 1.0), "expectedPerformance": "Moderate"},
+                "svcExprcVariance": rng.uniform(0, 0.3),
+                "supis": build_supis(rng, 1),
+                "snssai": {"sst": rng.randint(1, 3), "sd": f"{rng.randrange(10 ** 6):06d}"},
+                "appId": _uuid(rng),
+                "ueLocs": [berlin_location(rng)],
+                "upfInfo": {"upfName": "ExampleUPF", "upfIpAddress": f"10.0.{rng.randrange(256)}.1"},
+                "dnai": "dna1-network",
+                "confidence": rng.randint(70, 100),
+                "dnn": "internet",
+                "networkArea": {"areaCode": rng.randint(1000, 9999), "locationId": _uuid(rng)},
+                "nsiId": _uuid(rng),
+                "ratio": rng.uniform(0.1, 1.0),
+                "pduSesInfo": {"sessionId": _uuid(rng), "status": "ACTIVE"},
+            }
+        ]
+    }
+
+
+def build_event(rng, supis, anomaly_type=None, max_age_minutes=0):
+    """
+    Builds an event in the shape the examiner agents forward to Hermes.
+
+    Args:
+        rng (random.Random): The random generator.
+        supis (list[str]): The SUPIs to pick the event's UE ID from.
+        anomaly_type (str, optional): The excepId, drawn with file-generator.py's weights if not given.
+        max_age_minutes (float): timeStampGen is drawn up to this many minutes into the past.
+
+    Returns:
+        dict: The event document.
+    """
+    if anomaly_type is None:
+        anomaly_type = rng.choices(ANOMALY_TYPES, weights=ANOMALY_WEIGHTS)[0]
+    generated = datetime.now(timezone.utc) - timedelta(minutes=rng.uniform(0, max_age_minutes))
+    return {
+        "subscriptionId": _uuid(rng),
+        "eventNotifications": [
+            {
+                "event": "ABNORMAL_BEHAVIOUR",
+                "expiry": (generated + timedelta(days=rng.randint(1, 30))).isoformat(timespec="seconds"),
+                "timeStampGen": generated.isoformat(),
+                "abnorBehavrs": [
+                    {
+                        "supis": [rng.choice(supis)],
+                        "excep": {
+                            "excepId": anomaly_type,
+                            "excepLevel": rng.randint(1, 5),
+                            "excepTrend": rng.choice(["UP", "STABLE", "DOWN"]),
+                        },
+                        "dnn": "internet",
+                        "snssai": {"sst": rng.randint(1, 3), "sd": f"{rng.randrange(10 ** 6):06d}"},
+                        "ratio": rng.random(),
+                        "confidence": rng.randint(70, 100),
+                        "addtMeasInfo": _measurements(rng, anomaly_type),
+                    }
+                ],
+            }
+        ],
+    }
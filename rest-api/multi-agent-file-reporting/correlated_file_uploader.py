@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import random
+import time
+import aiohttp
+from instrumentation import UPLOAD
+from serialization import dumps_str, loads
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FILE_DATA_REPORTING_URL = "http://localhost:8080/fileDataReportingMnS/v1/files"
+
+# Statuses worth retrying, anything else is a permanent failure
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class CorrelatedFileUploader:
+    """
+        Uploads the files Hermes generates for correlated events to the File Data Reporting service
+        in the background.
+
+        Files are put on a bounded queue and a single worker drains it, coalescing everything pending
+        (up to max_batch_size) into one POST to the bulk /files/create_many endpoint. Requests share a
+        persistent aiohttp session, so connections are kept alive between uploads. Failed uploads are
+        retried with exponential backoff.
+    """
+
+    def __init__(self, files_url=FILE_DATA_REPORTING_URL, max_batch_size=50, max_queue_size=1000, max_retries=3,
+                 backoff_seconds=0.5, connection_limit=10, timeout_seconds=10, metrics=None):
+        """
+                Initializes the uploader.
+
+                Args:
+                    files_url (str): The /files endpoint of the File Data Reporting service.
+                    max_batch_size (int): Maximum number of files sent in one bulk request.
+                    max_queue_size (int): Maximum number of files waiting for upload.
+                    max_retries (int): How often a failed bulk request is retried.
+                    backoff_seconds (float): Base delay of the exponential backoff between retries.
+                    connection_limit (int): Maximum number of pooled connections.
+                    timeout_seconds (float): Total timeout of a single request.
+                    metrics (Metrics, optional): Records the duration of every batch upload, retries
+                        included, as upload.
+        """
+        self.bulk_url = f"{files_url.rstrip('/')}/create_many"
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.connection_limit = connection_limit
+        self.timeout_seconds = timeout_seconds
+        self.metrics = metrics
+
+        self._queue = asyncio.Queue(maxsize=max_queue_size)
+        self._session = None
+        self._worker_task = None
+
+        # Counters
+        self.uploaded_files = 0
+        self.failed_files = 0
+        self.dropped_files = 0
+        self.requests = 0
+        self.retries = 0
+
+    async def start(self):
+        """Opens the HTTP session and starts the upload worker."""
+        if self._worker_task is not None:
+            return
+        connector = aiohttp.TCPConnector(limit=self.connection_limit, keepalive_timeout=60)
+        # Correlation data may reference ObjectIds of events that had no _id of their own
+        self._session = aiohttp.ClientSession(connector=connector,
+                                              timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+                                              json_serialize=dumps_str)
+        self._worker_task = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout_seconds=10):
+        """
+        Waits for pending uploads, then stops the worker and closes the session.
+
+        Args:
+            drain_timeout_seconds (float): How long to wait for the queue to drain.
+        """
+        if self._worker_task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.error(f"Stopping uploader with {self._queue.qsize()} files still pending")
+        self._worker_task.cancel()
+        try:
+            await self._worker_task
+        except asyncio.CancelledError:
+            pass
+        self._worker_task = None
+        await self._session.close()
+
+    def enqueue(self, file_data):
+        """
+        Schedules a file for upload without waiting for it.
+
+        Args:
+            file_data (dict): The file as built by HermesAgent.generate_file_content.
+
+        Returns:
+            bool: False if the queue is full and the file was dropped.
+        """
+        try:
+            self._queue.put_nowait(file_data)
+            return True
+        except asyncio.QueueFull:
+            self.dropped_files += 1
+            logger.error("Upload queue is full, dropping correlated file")
+            return False
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            start = time.perf_counter()
+            try:
+                await self._upload(batch)
+            except Exception as e:
+                self.failed_files += len(batch)
+                logger.error(f"Error uploading {len(batch)} files: {e}")
+            finally:
+                if self.metrics is not None:
+                    self.metrics.observe(UPLOAD, time.perf_counter() - start)
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _upload(self, batch):
+        """Posts a batch to the bulk endpoint, retrying transient failures with backoff."""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(self.backoff_seconds * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            self.requests += 1
+            try:
+                async with self._session.post(self.bulk_url, json=batch) as response:
+                    if response.status == 201:
+                        file_ids = await response.json(loads=loads)
+                        self.uploaded_files += len(batch)
+                        logger.info(f"Successfully uploaded {len(batch)} files. File IDs: {file_ids}")
+                        return
+                    text = await response.text()
+                    if response.status not in RETRYABLE_STATUSES:
+                        break
+                    logger.warning(f"Upload attempt {attempt + 1} failed. Status Code: {response.status}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                text = str(e)
+                logger.warning(f"Upload attempt {attempt + 1} failed: {e}")
+
+        self.failed_files += len(batch)
+        logger.error(f"Failed to upload {len(batch)} files. Response: {text}")
+
+    def stats(self):
+        """
+        Returns the uploader's counters.
+
+        Returns:
+            dict: Queue length, upload, retry and failure counts.
+        """
+        return {
+            "pending": self._queue.qsize(),
+            "uploaded_files": self.uploaded_files,
+            "failed_files": self.failed_files,
+            "dropped_files": self.dropped_files,
+            "requests": self.requests,
+            "retries": self.retries,
+        }
@@ -0,0 +1,164 @@
+import sys
+from datetime import datetime, timezone
+
+# Interned anomaly types, the position in the list is the type's ID
+ANOMALY_TYPES = []
+_ANOMALY_TYPE_IDS = {}
+
+
+def to_utc(timestamp):
+    """
+    Normalizes a timeStampGen value to a timezone-aware UTC datetime.
+
+    MongoDB hands back naive datetimes (stored as UTC), while freshly received events
+    carry aware ones, so both are accepted here.
+
+    Args:
+        timestamp (datetime or str): The timestamp to normalize.
+
+    Returns:
+        datetime: The timestamp in UTC.
+    """
+    if not isinstance(timestamp, datetime):
+        timestamp = datetime.fromisoformat(str(timestamp))
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+def anomaly_type_id(anomaly_type):
+    """
+    Returns the small integer ID of an anomaly type, assigning the next free one on first use.
+
+    Args:
+        anomaly_type (str): The excepId.
+
+    Returns:
+        int: The ID of the anomaly type.
+    """
+    type_id = _ANOMALY_TYPE_IDS.get(anomaly_type)
+    if type_id is None:
+        anomaly_type = sys.intern(anomaly_type)
+        type_id = _ANOMALY_TYPE_IDS.setdefault(anomaly_type, len(ANOMALY_TYPES))
+        if type_id == len(ANOMALY_TYPES):
+            ANOMALY_TYPES.append(anomaly_type)
+    return type_id
+
+
+def _parse_measurement(value):
+    """Parses a measurement like "-95.12 dBm" into its number."""
+    return float(str(value).split()[0])
+
+
+class CorrelationEvent:
+    """
+        The fields of an anomaly event the correlation engine works on, parsed once when the event
+        arrives or is loaded from MongoDB.
+
+        Holding these records instead of the documents keeps the correlation window small and
+        spares the scoring functions from walking the nested event structure for every pair.
+    """
+    __slots__ = ("key", "time", "type_id", "supis", "latitude", "longitude", "rsrp", "sinr", "confidence",
+                 "excep_level", "ratio")
+
+    def __init__(self, key, time, type_id, supis, latitude=None, longitude=None, rsrp=None, sinr=None,
+                 confidence=0, excep_level=0, ratio=0):
+        """
+                Initializes a record.
+
+                Args:
+                    key: The _id of the event document.
+                    time (float): timeStampGen as POSIX timestamp.
+                    type_id (int): The interned excepId, see anomaly_type_id.
+                    supis (frozenset): The UE IDs of the event.
+                    latitude (float, optional): Latitude of the event's location.
+                    longitude (float, optional): Longitude of the event's location.
+                    rsrp (float, optional): The measured RSRP in dBm, None without signal measurements.
+                    sinr (float, optional): The measured SINR in dB, None without signal measurements.
+                    confidence (float): The confidence of the anomaly.
+                    excep_level (float): The level of the exception.
+                    ratio (float): The ratio of the anomaly.
+        """
+        self.key = key
+        self.time = time
+        self.type_id = type_id
+        self.supis = supis
+        self.latitude = latitude
+        self.longitude = longitude
+        self.rsrp = rsrp
+        self.sinr = sinr
+        self.confidence = confidence
+        self.excep_level = excep_level
+        self.ratio = ratio
+
+    def __repr__(self):
+        return f"CorrelationEvent(key={self.key!r}, type={self.anomaly_type!r}, time={self.timestamp.isoformat()})"
+
+    @property
+    def anomaly_type(self):
+        """str: The excepId of the event."""
+        return ANOMALY_TYPES[self.type_id]
+
+    @property
+    def timestamp(self):
+        """datetime: timeStampGen in UTC."""
+        return datetime.fromtimestamp(self.time, timezone.utc)
+
+    @property
+    def location(self):
+        """tuple or None: (latitude, longitude), None if the event has no complete location."""
+        if self.latitude is None or self.longitude is None:
+            return None
+        return self.latitude, self.longitude
+
+    @classmethod
+    def from_document(cls, document):
+        """
+        Builds the record of an event document.
+
+        Args:
+            document (dict): The event as forwarded by an examiner agent or stored in MongoDB.
+
+        Returns:
+            CorrelationEvent: The record.
+        """
+        notification = document["eventNotifications"][0]
+        abnormal_behavior = notification["abnorBehavrs"][0]
+        measurements = abnormal_behavior.get("addtMeasInfo", {})
+
+        location = measurements.get("circums", [{}])[0].get("locArea", {})
+        latitude, longitude = location.get("latitude"), location.get("longitude")
+        if latitude is None or longitude is None:
+            latitude = longitude = None
+        else:
+            latitude, longitude = float(latitude), float(longitude)
+
+        # Like the scoring always did, missing values of a present measurement take defaults
+        rsrp = sinr = None
+        signal = measurements.get("nwPerfs", [{}])[0]
+        if signal:
+            signal_quality = signal.get("signalQuality", {})
+            try:
+                rsrp = _parse_measurement(signal_quality.get("RSRP", "-120 dBm"))
+                sinr = _parse_measurement(signal_quality.get("SINR", "0 dB"))
+            except (ValueError, IndexError):
+                rsrp = sinr = None
+
+        return cls(
+            key=document.get("_id"),
+            time=to_utc(notification["timeStampGen"]).timestamp(),
+            type_id=anomaly_type_id(abnormal_behavior["excep"]["excepId"]),
+            supis=frozenset(abnormal_behavior.get("supis", [])),
+            latitude=latitude,
+            longitude=longitude,
+            rsrp=rsrp,
+            sinr=sinr,
+            confidence=abnormal_behavior.get("confidence", 0),
+            excep_level=abnormal_behavior["excep"].get("excepLevel", 0),
+            ratio=abnormal_behavior.get("ratio", 0),
+        )
+
+    @classmethod
+    def coerce(cls, event):
+        """Returns the record of an event given as record or document."""
+        return event if isinstance(event, cls) else cls.from_document(event)
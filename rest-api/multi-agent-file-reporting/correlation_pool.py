@@ -0,0 +1,234 @@
+import asyncio
+import logging
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from correlation_event import ANOMALY_TYPES, anomaly_type_id
+from correlation_scoring import CorrelationScorer
+from correlation_window import CorrelationWindow
+from instrumentation import Metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# State of a worker process: its shard of the correlation window and the scorer using it
+_window = None
+_scorer = None
+
+
+class _ShardScorer(CorrelationScorer):
+    """
+        Scores against a worker's shard with Hermes' scoring, without importing the application.
+    """
+
+    def __init__(self, window, correlation_rules, exact_proximity_margin_km, batch_min_candidates):
+        self.correlation_window = window
+        self.correlation_rules = correlation_rules
+        self.exact_proximity_margin_km = exact_proximity_margin_km
+        self.batch_min_candidates = batch_min_candidates
+        # Timings of a worker stay in the worker; Hermes times the whole call
+        self.metrics = Metrics("correlation_worker")
+
+
+def _sync_anomaly_types(anomaly_types):
+    """Interns the anomaly types in the parent's order, so type IDs of shipped records stay valid."""
+    for anomaly_type in anomaly_types[len(ANOMALY_TYPES):]:
+        anomaly_type_id(anomaly_type)
+
+
+def _init_worker(anomaly_types, correlation_rules, window_minutes, exact_proximity_margin_km, batch_min_candidates,
+                 events):
+    global _window, _scorer
+    _sync_anomaly_types(anomaly_types)
+    _window = CorrelationWindow(window_minutes)
+    for event in events:
+        _window.add(event)
+    _scorer = _ShardScorer(_window, correlation_rules, exact_proximity_margin_km, batch_min_candidates)
+
+
+def _apply(anomaly_types, correlation_rules, added):
+    _sync_anomaly_types(anomaly_types)
+    if correlation_rules is not None:
+        _scorer.correlation_rules = correlation_rules
+    for event in added:
+        _window.add(event)
+
+
+def _add_in_worker(anomaly_types, added):
+    _apply(anomaly_types, None, added)
+
+
+def _correlate_in_worker(anomaly_types, correlation_rules, added, event):
+    _apply(anomaly_types, correlation_rules, added)
+    candidates = _window.candidates(event, _scorer.correlation_rules.relevant_anomaly_types(event.anomaly_type))
+    if not candidates:
+        return []
+    return _scorer.check_correlation_rules(event, candidates)
+
+
+class CorrelationPool:
+    """
+        Scores correlations in worker processes, so large candidate sets use more than the one core
+        running the event loop and the loop stays responsive while they are scored.
+
+        The correlation window is split into shards, one per worker process. Every worker keeps its
+        shard resident: it receives its events once at start-up and afterwards only the events added
+        since its last call, never the window itself. An incoming event is scored by all workers
+        in parallel against their shards and the results are merged.
+
+        Each shard has a single-process executor of its own, so its calls run in the order they
+        were submitted and the deltas always arrive before the events that depend on them.
+
+        If a worker process dies, the pool shuts all workers down and stops running; Hermes then
+        scores inline against its own window, which holds every event of the shards.
+    """
+
+    def __init__(self, workers, correlation_rules, window_minutes=60, exact_proximity_margin_km=None,
+                 batch_min_candidates=200, max_pending_events=1000):
+        """
+                Initializes the pool; the worker processes are started by start().
+
+                Args:
+                    workers (int): Number of worker processes, i.e. shards of the window.
+                    correlation_rules (CorrelationRuleIndex): The rules; changes are shipped to the workers.
+                    window_minutes (float): How many minutes of recent events the shards keep.
+                    exact_proximity_margin_km (float, optional): See HermesAgent.
+                    batch_min_candidates (int, optional): See HermesAgent.
+                    max_pending_events (int): Added events held back for a shard before they are
+                        sent on their own instead of with the next scoring call.
+        """
+        self.workers = workers
+        self.correlation_rules = correlation_rules
+        self.window_minutes = window_minutes
+        self.exact_proximity_margin_km = exact_proximity_margin_km
+        self.batch_min_candidates = batch_min_candidates
+        self.max_pending_events = max_pending_events
+
+        self._executors = []
+        self._pending = []
+        self._rules_sent = []
+        self._next_shard = 0
+
+        # Counters
+        self.correlated_events = 0
+        self.shipped_events = 0
+        self.failures = 0
+
+    @property
+    def running(self):
+        return bool(self._executors)
+
+    def start(self, events=()):
+        """
+        Starts the worker processes with the given events spread over their shards.
+
+        Args:
+            events (Iterable[CorrelationEvent]): The events already in the window, e.g. after warming.
+        """
+        if self._executors:
+            return
+        shards = [[] for _ in range(self.workers)]
+        for index, event in enumerate(events):
+            shards[index % self.workers].append(event)
+        self._next_shard = sum(len(shard) for shard in shards) % self.workers
+
+        anomaly_types = tuple(ANOMALY_TYPES)
+        for shard in shards:
+            self._executors.append(ProcessPoolExecutor(
+                max_workers=1, initializer=_init_worker,
+                initargs=(anomaly_types, self.correlation_rules, self.window_minutes, self.exact_proximity_margin_km,
+                          self.batch_min_candidates, shard)))
+        self._pending = [[] for _ in range(self.workers)]
+        self._rules_sent = [self.correlation_rules.rules] * self.workers
+        logger.info(f"Correlation pool started {self.workers} workers")
+
+    def stop(self):
+        """Shuts the worker processes down."""
+        for executor in self._executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self._executors = []
+
+    def _fail(self, error):
+        """Shuts the pool down after a worker process died, its shard cannot be trusted anymore."""
+        logger.error(f"Correlation worker failed, scoring inline from now on: {error!r}")
+        self.failures += 1
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors = []
+        self._pending = [[] for _ in range(self.workers)]
+
+    def add(self, event):
+        """
+        Adds an event to the window of one shard. It is shipped with that shard's next call.
+
+        Args:
+            event (CorrelationEvent): The event record, with its key set.
+        """
+        shard = self._next_shard
+        self._next_shard = (shard + 1) % self.workers
+        self._pending[shard].append(event)
+        if len(self._pending[shard]) >= self.max_pending_events:
+            added, self._pending[shard] = self._pending[shard], []
+            self.shipped_events += len(added)
+            try:
+                self._executors[shard].submit(_add_in_worker, tuple(ANOMALY_TYPES), added)
+            except BrokenExecutor as e:
+                self._fail(e)
+
+    def _take_updates(self, shard):
+        """Returns the rules if they changed since the shard's last call, and its pending events."""
+        rules = self.correlation_rules.rules
+        correlation_rules = None
+        if self._rules_sent[shard] is not rules:
+            correlation_rules = self.correlation_rules
+            self._rules_sent[shard] = rules
+        added, self._pending[shard] = self._pending[shard], []
+        self.shipped_events += len(added)
+        return correlation_rules, added
+
+    async def check_correlation_rules(self, event, recent_events):
+        """
+        Scores an event against the shards of all workers without blocking the event loop.
+
+        Args:
+            event (CorrelationEvent): The incoming event.
+            recent_events (list[CorrelationEvent]): Its candidates in Hermes' window; they fix the
+                order of the merged correlations, which is the order of check_correlation_rules.
+
+        Returns:
+            list: The correlations of the event.
+
+        Raises:
+            BrokenExecutor: If a worker process died; the pool is stopped and the event has to be
+                scored inline.
+        """
+        loop = asyncio.get_running_loop()
+        anomaly_types = tuple(ANOMALY_TYPES)
+        calls = []
+        try:
+            for shard, executor in enumerate(self._executors):
+                correlation_rules, added = self._take_updates(shard)
+                calls.append(loop.run_in_executor(executor, _correlate_in_worker, anomaly_types, correlation_rules,
+                                                  added, event))
+            results = await asyncio.gather(*calls)
+        except BrokenExecutor as e:
+            # The other shards' calls are cancelled with their executors
+            await asyncio.gather(*calls, return_exceptions=True)
+            self._fail(e)
+            raise
+        self.correlated_events += 1
+
+        position = {recent_event.key: index for index, recent_event in enumerate(recent_events)}
+        correlations = [correlation for shard_correlations in results for correlation in shard_correlations]
+        # Stable, so the rules of one candidate keep their order
+        correlations.sort(key=lambda correlation: position.get(correlation["correlated_event_id"], len(position)))
+        return correlations
+
+    def stats(self):
+        """Returns the pool's counters."""
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "correlated_events": self.correlated_events,
+            "shipped_events": self.shipped_events,
+            "failures": self.failures,
+            "pending_events": sum(len(pending) for pending in self._pending),
+        }
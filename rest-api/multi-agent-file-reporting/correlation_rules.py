@@ -0,0 +1,324 @@
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Used when a rule has no "time" condition
+DEFAULT_TIME_THRESHOLD_MINUTES = 60
+
+DEFAULT_CORRELATION_RULES = [
+    {
+        "name": "Radio Link Failures might be leading to frequent service access attempts",
+        "anomalies": ["UNEXPECTED_RADIO_LINK_FAILURES", "TOO_FREQUENT_SERVICE_ACCESS"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time", "match": "overlap", "threshold_minutes": 60}
+        ]
+    },
+    {
+        "name": "Unexpected UE Location could relate to Radio Link Failures",
+        "anomalies": ["UNEXPECTED_UE_LOCATION", "UNEXPECTED_RADIO_LINK_FAILURES"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "location", "match": "proximity", "threshold_km": 5},
+            {"type": "time", "match": "overlap", "threshold_minutes": 30}
+        ]
+    },
+    {
+        "name": "A DDoS attack might be overloading network resources, leading to Radio Link Failures",
+        "anomalies": ["UNEXPECTED_RADIO_LINK_FAILURES", "SUSPICION_OF_DDOS_ATTACK"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time", "match": "overlap", "threshold_minutes": 30}
+        ]
+    },
+    {
+        "name": "Unexpected Large Rate Flows could be straining network resources and contribute to Radio Link Failures",
+        "anomalies": ["UNEXPECTED_RADIO_LINK_FAILURES", "UNEXPECTED_LARGE_RATE_FLOWS"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time", "match": "overlap", "threshold_minutes": 30}
+        ]
+    },
+    {
+        "name": "Long-lived flows might be consuming network resources leading to Radio Link Failures",
+        "anomalies": ["UNEXPECTED_RADIO_LINK_FAILURES", "UNEXPECTED_LONG_LIVE_FLOWS"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time", "match": "overlap", "threshold_minutes": 30}
+        ]
+    },
+    {
+        "name": "A DDoS attack might be overloading network resources, leading to Radio Link Failures",
+        "anomalies": ["SUSPICION_OF_DDOS_ATTACK", "UNEXPECTED_RADIO_LINK_FAILURES"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time", "match": "overlap", "threshold_minutes": 60}
+        ]
+    },
+    {
+        "name": "A DDoS attack might be causing Frequent Service Access Attempts",
+        "anomalies": ["SUSPICION_OF_DDOS_ATTACK", "TOO_FREQUENT_SERVICE_ACCESS"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time_interval", "match": "contains"}
+        ]
+    },
+    {
+        "name": "Frequent Service Access attempts might be causing Unexpected Large Rate Flows",
+        "anomalies": ["UNEXPECTED_LARGE_RATE_FLOWS", "TOO_FREQUENT_SERVICE_ACCESS"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time_interval", "match": "overlap"}
+        ]
+    },
+    {
+        "name": "Frequent service access might be causing Long-Lived Flows",
+        "anomalies": ["UNEXPECTED_LONG_LIVE_FLOWS", "TOO_FREQUENT_SERVICE_ACCESS"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time_interval", "match": "overlap"}
+        ]
+    },
+    {
+        "name": "Too Frequent Service Access might be due to Radio Link Failure",
+        "anomalies": ["TOO_FREQUENT_SERVICE_ACCESS", "UNEXPECTED_RADIO_LINK_FAILURES"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time", "match": "overlap", "threshold_minutes": 60}
+        ]
+    },
+    {
+        "name": "Too Frequent Service Access might be causing Unexpected Large Rate Flows",
+        "anomalies": ["TOO_FREQUENT_SERVICE_ACCESS", "UNEXPECTED_LARGE_RATE_FLOWS"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time", "match": "overlap", "threshold_minutes": 30}
+        ]
+    },
+    {
+        "name": "Too Frequent Service Access might be resulting in Long-Live Flows",
+        "anomalies": ["TOO_FREQUENT_SERVICE_ACCESS", "UNEXPECTED_LONG_LIVE_FLOWS"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time", "match": "overlap", "threshold_minutes": 30}
+        ]
+    },
+    {
+        "name": "Radio Link Failures might be leading to Unexpectedly Low Rate Flows",
+        "anomalies": ["UNEXPECTED_LOW_RATE_FLOWS", "UNEXPECTED_RADIO_LINK_FAILURES"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time", "match": "overlap", "threshold_minutes": 60}
+        ]
+    },
+    {
+        "name": "A DDoS attack might be leading to Low Rate Flows",
+        "anomalies": ["UNEXPECTED_LOW_RATE_FLOWS", "SUSPICION_OF_DDOS_ATTACK"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time", "match": "overlap", "threshold_minutes": 30}
+        ]
+    },
+    {
+        "name": "Large rate flows could temporarily be disrupting normal traffic, leading to unexpectedly Low Rate Flows",
+        "anomalies": ["UNEXPECTED_LOW_RATE_FLOWS", "UNEXPECTED_LARGE_RATE_FLOWS"],
+        "conditions": [
+            {"type": "ue_ids", "match": "intersection"},
+            {"type": "time", "match": "overlap", "threshold_minutes": 30}
+        ]
+    }
+]
+
+
+@dataclass(frozen=True)
+class CorrelationRule:
+    """
+        A correlation rule compiled from its dict definition, with every threshold and condition
+        flag resolved once instead of on each comparison.
+    """
+    name: str
+    anomalies: tuple
+    conditions: tuple
+    time_threshold: timedelta
+    time_overlap: bool
+    location_threshold_km: Optional[float]
+    additional_metrics: tuple
+
+    @classmethod
+    def from_dict(cls, rule):
+        """
+        Compiles a rule definition.
+
+        Args:
+            rule (dict): A rule with "name", "anomalies" and "conditions" as in DEFAULT_CORRELATION_RULES.
+
+        Returns:
+            CorrelationRule: The compiled rule.
+        """
+        conditions = tuple(rule["conditions"])
+        time_threshold_minutes = next(
+            (cond["threshold_minutes"] for cond in conditions if cond["type"] == "time"),
+            DEFAULT_TIME_THRESHOLD_MINUTES
+        )
+        location_threshold_km = next(
+            (float(cond["threshold_km"]) for cond in conditions
+             if cond["type"] == "location" and cond["match"] == "proximity"),
+            None
+        )
+        return cls(
+            name=rule["name"],
+            anomalies=tuple(rule["anomalies"]),
+            conditions=conditions,
+            time_threshold=timedelta(minutes=float(time_threshold_minutes)),
+            time_overlap=any(cond["type"] == "time" and cond["match"] == "overlap" for cond in conditions),
+            location_threshold_km=location_threshold_km,
+            additional_metrics=tuple(cond for cond in conditions if cond["type"] == "additional_metric"),
+        )
+
+    def time_condition_met(self, time_difference):
+        """Whether two events lie close enough in time for this rule to apply."""
+        return self.time_overlap and time_difference <= self.time_threshold
+
+
+class CorrelationRuleIndex:
+    """
+        Holds the compiled correlation rules indexed by (event type, recent event type), so the rules
+        applying to a pair of anomalies are found with one dict lookup.
+
+        When a rules file is given, its rules replace the defaults and are reloaded whenever the
+        file changes on disk.
+    """
+
+    def __init__(self, rules=None, rules_path=None, reload_interval_seconds=5.0):
+        """
+                Initializes the index.
+
+                Args:
+                    rules (list[dict], optional): Rule definitions, defaults to DEFAULT_CORRELATION_RULES.
+                    rules_path (str, optional): A JSON file containing a list of rule definitions.
+                    reload_interval_seconds (float): Minimum time between two checks of the rules file.
+        """
+        self.rules_path = rules_path
+        self.reload_interval_seconds = reload_interval_seconds
+        self._rules_mtime = None
+        self._last_reload_check = 0.0
+        self.compile(DEFAULT_CORRELATION_RULES if rules is None else rules)
+        if rules_path:
+            self.reload_if_changed(force=True)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def compile(self, rules):
+        """
+        Compiles rule definitions and atomically replaces the current index.
+
+        Args:
+            rules (list[dict]): The rule definitions.
+        """
+        compiled = tuple(CorrelationRule.from_dict(rule) for rule in rules)
+
+        by_pair = {}
+        partners = {}
+        for rule in compiled:
+            for event_type in rule.anomalies:
+                for recent_event_type in rule.anomalies:
+                    # Same-type correlations are never made
+                    if event_type == recent_event_type:
+                        continue
+                    by_pair.setdefault((event_type, recent_event_type), []).append(rule)
+                    partners.setdefault(event_type, set()).add(recent_event_type)
+
+        self.rules = compiled
+        self._by_pair = {pair: tuple(pair_rules) for pair, pair_rules in by_pair.items()}
+        self._partners = {event_type: frozenset(types) for event_type, types in partners.items()}
+
+    def rules_for(self, event_type, recent_event_type):
+        """
+        Returns the rules correlating two anomaly types.
+
+        Args:
+            event_type (str): The excepId of the incoming event.
+            recent_event_type (str): The excepId of the recent event.
+
+        Returns:
+            tuple[CorrelationRule]: The matching rules, empty if there are none.
+        """
+        return self._by_pair.get((event_type, recent_event_type), ())
+
+    def relevant_anomaly_types(self, event_type):
+        """
+        Returns the anomaly types that share at least one rule with the given type.
+
+        Args:
+            event_type (str): The excepId of the incoming event.
+
+        Returns:
+            frozenset: The excepIds of possible correlation partners.
+        """
+        return self._partners.get(event_type, frozenset())
+
+    @property
+    def max_time_threshold(self):
+        """The largest time threshold of all rules."""
+        return max((rule.time_threshold for rule in self.rules),
+                   default=timedelta(minutes=DEFAULT_TIME_THRESHOLD_MINUTES))
+
+    @staticmethod
+    def load(rules_path):
+        """
+        Reads rule definitions from a JSON file.
+
+        Args:
+            rules_path (str): Path of the rules file.
+
+        Returns:
+            list[dict]: The rule definitions.
+        """
+        with open(rules_path, encoding="utf-8") as rules_file:
+            rules = json.load(rules_file)
+        if not isinstance(rules, list):
+            raise ValueError("The rules file must contain a list of rules")
+        return rules
+
+    def reload_if_changed(self, force=False):
+        """
+        Reloads the rules file if it was modified since it was last loaded. Invalid files are
+        logged and the previous rules stay active.
+
+        Args:
+            force (bool): Skip the reload interval check.
+
+        Returns:
+            bool: Whether new rules were loaded.
+        """
+        if not self.rules_path:
+            return False
+
+        now = time.monotonic()
+        if not force and now - self._last_reload_check < self.reload_interval_seconds:
+            return False
+        self._last_reload_check = now
+
+        try:
+            mtime = os.stat(self.rules_path).st_mtime
+            if mtime == self._rules_mtime:
+                return False
+            self.compile(self.load(self.rules_path))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Failed to load correlation rules from {self.rules_path}: {e}")
+            return False
+
+        self._rules_mtime = mtime
+        logger.info(f"Loaded {len(self.rules)} correlation rules from {self.rules_path}")
+        return True
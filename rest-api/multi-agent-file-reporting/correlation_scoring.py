@@ -0,0 +1,245 @@
+import time
+from datetime import timedelta
+from geopy.distance import geodesic
+from batch_scoring import score_candidates
+from correlation_event import CorrelationEvent
+from instrumentation import SCORING
+
+
+class CorrelationScorer:
+    """
+        Hermes' correlation scoring, without the application, store and uploader of a HermesAgent,
+        so the correlation pool's worker processes can score without importing them.
+
+        Subclasses provide the attributes the scoring relies on: correlation_window
+        (CorrelationWindow), correlation_rules (CorrelationRuleIndex), exact_proximity_margin_km,
+        batch_min_candidates and metrics (Metrics).
+    """
+
+    def calculate_correlation_score(self, ue_ids_match, time_difference, rule, event, recent_event,
+                                    proximity_score=None):
+        """
+        Calculates a correlation score based on the matching UE IDs, time difference,
+        and rule-specific conditions.
+
+        Args:
+            ue_ids_match (bool): Whether UE IDs intersect.
+            time_difference (timedelta): The difference between event and recent event timestamps.
+            rule (CorrelationRule): The compiled correlation rule.
+            event (CorrelationEvent): The current event being checked for correlation.
+            recent_event (CorrelationEvent): The recent event being compared.
+            proximity_score (float, optional): The precomputed location proximity of the events,
+                computed from their locations if not given.
+
+        Returns:
+            float: The calculated correlation score.
+        """
+        # Initialize score components
+        score = 0.0
+
+        # Weight assignments
+        weight_ue_ids = 0.3
+        weight_time_proximity = 0.4
+        weight_location_proximity = 0.3
+        weight_additional_conditions = 0.1
+
+        # print("\n--- Calculating Correlation Score ---")
+
+        # 🛠 UE ID match contribution
+        if ue_ids_match:
+            score += weight_ue_ids
+            # print(f"✔ UE ID Match: +{weight_ue_ids}")
+
+        # 🛠 Time proximity contribution
+        time_threshold = rule.time_threshold
+        if time_difference <= time_threshold:
+            time_proximity_score = 1 - (time_difference.total_seconds() / time_threshold.total_seconds())
+            time_score = weight_time_proximity * time_proximity_score
+            score += time_score
+            # print(f"✔ Time Proximity: {time_proximity_score:.2f} * {weight_time_proximity} = +{time_score:.2f}")
+
+        # 🛠 Rule-specific conditions
+        if rule.location_threshold_km is not None:
+            if proximity_score is None and event.location is not None and recent_event.location is not None:
+                proximity_score = CorrelationScorer.calculate_proximity_score(event.location, recent_event.location,
+                                                                              rule.location_threshold_km)
+            if proximity_score is not None:
+                loc_score = weight_location_proximity * proximity_score
+                score += loc_score
+                # print(
+                #     f"✔ Location Proximity: {proximity_score:.2f} * {weight_location_proximity} = +{loc_score:.2f}")
+
+        for condition in rule.additional_metrics:
+            additional_metric_score = CorrelationScorer.calculate_additional_metric(event, recent_event, condition)
+            add_score = weight_additional_conditions * additional_metric_score
+            score += add_score
+            # print(
+            #     f"✔ Additional Metric: {additional_metric_score:.2f} * {weight_additional_conditions} = +{add_score:.2f}")
+
+        # Ensure the score is within bounds (0 to 1)
+        final_score = min(score, 1.0)
+        # print(f"✅ Final Score: {final_score:.2f}")
+        return final_score
+
+    @staticmethod
+    def calculate_proximity_score(location1, location2, threshold_km):
+        """
+        Calculate proximity score based on geographical locations.
+
+        Args:
+            location1 (tuple): The first location as (latitude, longitude).
+            location2 (tuple): The second location as (latitude, longitude).
+            threshold_km (float): Maximum distance in kilometers for full proximity score.
+
+        Returns:
+            float: A proximity score between 0 and 1.
+        """
+        distance_km = geodesic(location1, location2).kilometers
+        return max(0.0, 1 - (distance_km / threshold_km))
+
+    @staticmethod
+    def calculate_additional_metric(event, recent_event, condition):
+        """
+        Calculates an additional metric score based on specific conditions such as signal quality,
+        confidence, exception level, or ratio.
+
+        Args:
+            event (CorrelationEvent): The current event being checked.
+            recent_event (CorrelationEvent): The recent event being compared.
+            condition (dict): Specific condition details.
+
+        Returns:
+            float: A score between 0 and 1.
+        """
+        score = 0.0
+
+        try:
+            if condition["type"] == "signal_quality":
+                # RSRP and SINR were parsed when the records were built
+                if event.rsrp is not None and recent_event.rsrp is not None:
+                    rsrp_diff = abs(event.rsrp - recent_event.rsrp)
+                    sinr_diff = abs(event.sinr - recent_event.sinr)
+
+                    score += max(0.0, 1 - rsrp_diff / 20) * 0.5
+                    score += max(0.0, 1 - sinr_diff / 20) * 0.5
+
+            elif condition["type"] == "confidence":
+                score += min(event.confidence, recent_event.confidence) / 100
+
+            elif condition["type"] == "exception_level":
+                level_diff = abs(event.excep_level - recent_event.excep_level)
+                score += max(0, 1 - level_diff / 5)
+
+            elif condition["type"] == "ratio":
+                ratio_diff = abs(event.ratio - recent_event.ratio)
+                score += max(0, 1 - ratio_diff)
+
+        except Exception as e:
+            print(f"Error calculating metric: {e}")
+
+        return min(score, 1.0)
+
+    def check_correlation_rules(self, event, recent_events):
+        """
+        Checks correlations between the current event and recent events based on predefined rules.
+
+        Args:
+            event (CorrelationEvent or dict): The current event being evaluated.
+            recent_events (list): A list of recent events, as records or documents.
+
+        Returns:
+            list: A list of correlations matching the predefined rules.
+        """
+        # Large candidate sets are scored column-wise, below that NumPy's overhead does not pay off
+        if self.batch_min_candidates is not None and len(recent_events) >= self.batch_min_candidates:
+            return self.check_correlation_rules_batch(event, recent_events)
+
+        correlations = []
+
+        event = CorrelationEvent.coerce(event)
+        recent_events = [CorrelationEvent.coerce(recent_event) for recent_event in recent_events]
+        event_type = event.anomaly_type
+
+        # Proximity scores of all candidates per location threshold, computed when first needed
+        proximity_by_threshold = {}
+        scoring_seconds = 0.0
+
+        for recent_event in recent_events:
+            # Same-type pairs have no rules, so they are skipped by the lookup as well
+            rules = self.correlation_rules.rules_for(event_type, recent_event.anomaly_type)
+            if not rules:
+                continue
+
+            # Check UE IDs
+            if event.supis.isdisjoint(recent_event.supis):
+                continue
+
+            # Calculate time difference
+            time_difference = timedelta(seconds=abs(event.time - recent_event.time))
+
+            for rule in rules:
+                if not rule.time_condition_met(time_difference):
+                    continue
+
+                # Events of the window are scored in one vectorized pass per threshold
+                scoring_start = time.perf_counter()
+                proximity_score = None
+                threshold_km = rule.location_threshold_km
+                if threshold_km is not None and event.location is not None \
+                        and recent_event.key in self.correlation_window.coordinates:
+                    if threshold_km not in proximity_by_threshold:
+                        proximity_by_threshold[threshold_km] = self.correlation_window.proximity_scores(
+                            event.location, threshold_km, recent_events, self.exact_proximity_margin_km)
+                    proximity_score = proximity_by_threshold[threshold_km].get(recent_event.key, 0.0)
+
+                # Calculate correlation score
+                correlation_score = self.calculate_correlation_score(
+                    ue_ids_match=True,
+                    time_difference=time_difference,
+                    rule=rule,
+                    event=event,
+                    recent_event=recent_event,
+                    proximity_score=proximity_score
+                )
+                scoring_seconds += time.perf_counter() - scoring_start
+                correlations.append({
+                    "rule_name": rule.name,
+                    "correlated_event_id": recent_event.key,
+                    "correlation_score": correlation_score
+                })
+        if scoring_seconds:
+            self.metrics.observe(SCORING, scoring_seconds)
+        return correlations
+
+    def check_correlation_rules_batch(self, event, recent_events):
+        """
+        Same as check_correlation_rules, but scores all candidates of a rule at once with NumPy
+        column operations instead of pair by pair.
+
+        Location proximity uses the haversine distance (refined with geodesic within
+        exact_proximity_margin_km of the threshold) for every candidate, like the scalar path
+        does for the events of the correlation window.
+
+        Args:
+            event (CorrelationEvent or dict): The current event being evaluated.
+            recent_events (list): A list of recent events, as records or documents.
+
+        Returns:
+            list: A list of correlations matching the predefined rules, in the order
+                check_correlation_rules returns them.
+        """
+        event = CorrelationEvent.coerce(event)
+        recent_events = [CorrelationEvent.coerce(recent_event) for recent_event in recent_events]
+        if not recent_events:
+            return []
+
+        with self.metrics.time(SCORING):
+            found = score_candidates(event, recent_events, self.correlation_rules, self.exact_proximity_margin_km)
+        return [
+            {
+                "rule_name": rule.name,
+                "correlated_event_id": recent_events[row].key,
+                "correlation_score": score
+            }
+            for row, _, rule, score in found
+        ]
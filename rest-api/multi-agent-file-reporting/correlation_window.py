@@ -0,0 +1,160 @@
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta, timezone
+from correlation_event import CorrelationEvent, anomaly_type_id
+from spatial_index import CoordinateIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CorrelationWindow:
+    """
+        A resident sliding window over the most recent anomaly events, held as CorrelationEvent records.
+
+        Events are indexed by SUPI and, per SUPI, by excepId, so the candidates for a new event
+        are only those sharing at least one UE ID and having one of the requested anomaly types.
+        Events older than the window are evicted lazily, ordered by their timeStampGen.
+        The coordinates of the events are kept in a CoordinateIndex for vectorized proximity scoring.
+    """
+
+    def __init__(self, window_minutes=60, grid_cell_degrees=0.1):
+        """
+                Initializes an empty window.
+
+                Args:
+                    window_minutes (float): How far back (relative to now) events are kept.
+                    grid_cell_degrees (float): Cell size of the grid bucketing event coordinates.
+        """
+        self.window = timedelta(minutes=window_minutes)
+        self._events = {}
+        # supi -> anomaly type ID -> {event key: record}
+        self._index = {}
+        # (timestamp, sequence, event key), oldest first
+        self._expiry = []
+        self._sequence = itertools.count()
+        self.coordinates = CoordinateIndex(cell_degrees=grid_cell_degrees)
+
+    def __len__(self):
+        return len(self._events)
+
+    def __iter__(self):
+        return iter(self._events.values())
+
+    def add(self, event):
+        """
+        Adds an event to the window. Events that are already outside the window are ignored.
+
+        Args:
+            event (CorrelationEvent or dict): The event record or document; its key is the document's "_id".
+        """
+        event = CorrelationEvent.coerce(event)
+        key = event.key
+        if key is None or key in self._events:
+            return
+        if event.time < (datetime.now(timezone.utc) - self.window).timestamp():
+            return
+
+        self._events[key] = event
+        for supi in event.supis:
+            self._index.setdefault(supi, {}).setdefault(event.type_id, {})[key] = event
+        heapq.heappush(self._expiry, (event.time, next(self._sequence), key))
+        if event.location is not None:
+            self.coordinates.add(key, *event.location)
+
+    def _remove(self, key):
+        event = self._events.pop(key, None)
+        if event is None:
+            return
+        self.coordinates.remove(key)
+        for supi in event.supis:
+            by_type = self._index.get(supi)
+            if by_type is None:
+                continue
+            events = by_type.get(event.type_id)
+            if events is not None:
+                events.pop(key, None)
+                if not events:
+                    del by_type[event.type_id]
+            if not by_type:
+                del self._index[supi]
+
+    def evict(self, now=None):
+        """
+        Drops every event whose timestamp lies before the start of the window.
+
+        Args:
+            now (datetime, optional): The reference time, defaults to the current UTC time.
+
+        Returns:
+            int: The number of evicted events.
+        """
+        cutoff = ((now or datetime.now(timezone.utc)) - self.window).timestamp()
+        evicted = 0
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, _, key = heapq.heappop(self._expiry)
+            self._remove(key)
+            evicted += 1
+        return evicted
+
+    def candidates(self, event, anomaly_types):
+        """
+        Returns the events in the window that share a UE ID with the given event and
+        have one of the given anomaly types.
+
+        Args:
+            event (CorrelationEvent or dict): The event looking for correlation partners.
+            anomaly_types (Iterable[str]): The excepIds that are relevant for the event.
+
+        Returns:
+            list[CorrelationEvent]: The candidate events, each at most once.
+        """
+        self.evict()
+        supis = CorrelationEvent.coerce(event).supis
+        anomaly_types = tuple(anomaly_type_id(anomaly_type) for anomaly_type in anomaly_types)
+
+        candidates = {}
+        for supi in supis:
+            by_type = self._index.get(supi)
+            if not by_type:
+                continue
+            for anomaly_type in anomaly_types:
+                candidates.update(by_type.get(anomaly_type, {}))
+        return list(candidates.values())
+
+    def proximity_scores(self, location, threshold_km, candidates, exact_margin_km=None):
+        """
+        Scores the proximity of candidate events to a location in one vectorized pass.
+
+        Args:
+            location (tuple): (latitude, longitude) of the incoming event.
+            threshold_km (float): Distance at which the proximity score drops to 0.
+            candidates (Iterable[CorrelationEvent]): Events of the window to score.
+            exact_margin_km (float, optional): Distances this close to the threshold are
+                recomputed with the exact geodesic distance.
+
+        Returns:
+            dict: The proximity score by event key, for candidates closer than threshold_km.
+        """
+        return self.coordinates.proximity_scores(*location, threshold_km,
+                                                 keys=[candidate.key for candidate in candidates],
+                                                 exact_margin_km=exact_margin_km)
+
+    def warm(self, events):
+        """
+        Loads a batch of stored events, e.g. the last window of anomalies from MongoDB.
+        Only their records are kept, the documents can be released afterwards.
+
+        Args:
+            events (Iterable[dict]): The stored events.
+
+        Returns:
+            int: The number of events held by the window afterwards.
+        """
+        for event in events:
+            try:
+                self.add(event)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                logger.error(f"Skipping malformed event {event.get('_id')} while warming window: {e}")
+        return len(self)
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FileContentCache:
+    """
+        An LRU cache of fetched files, keyed by fileLocation and bounded by the total size of the
+        cached files.
+
+        Entries expire after ttl_seconds, or earlier if the file's fileExpirationTime is reached.
+        Concurrent lookups of a missing file share a single fetch. Cached files are shared between
+        callers and must not be modified.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl_seconds=300):
+        """
+                Initializes an empty cache.
+
+                Args:
+                    max_bytes (int): Upper bound of the summed size of the cached files.
+                    ttl_seconds (float): Maximum time a file stays cached.
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (value, size, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self.size_bytes = 0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self._lookup(key, count=False) is not None
+
+    def _lookup(self, key, count=True):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, size, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += count
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def get(self, key):
+        """
+        Returns a cached file.
+
+        Args:
+            key (str): The fileLocation of the file.
+
+        Returns:
+            dict or None: The file, None if it is not cached.
+        """
+        value = self._lookup(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key, value, size):
+        """
+        Caches a file, evicting the least recently used files if the cache grows too large.
+        Files larger than the whole cache or already expired are not cached.
+
+        Args:
+            key (str): The fileLocation of the file.
+            value (dict): The file as returned by the File Data Reporting service.
+            size (int): The size of the file's response body in bytes.
+        """
+        ttl = self._ttl_for(value)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, size, time.monotonic() + ttl)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _ttl_for(self, value):
+        expiration_time = (value.get("fileInfo") or {}).get("fileExpirationTime")
+        if not expiration_time:
+            return self.ttl_seconds
+        try:
+            expires = datetime.fromisoformat(str(expiration_time).replace("Z", "+00:00"))
+        except ValueError:
+            return self.ttl_seconds
+        if expires.tzinfo is None:
+            expires = expires.replace(tzinfo=timezone.utc)
+        return min(self.ttl_seconds, (expires - datetime.now(timezone.utc)).total_seconds())
+
+    async def get_or_fetch(self, key, fetch):
+        """
+        Returns a cached file, or fetches and caches it. Concurrent calls for the same missing
+        file wait for the first call's fetch instead of fetching it again.
+
+        Args:
+            key (str): The fileLocation of the file.
+            fetch (Callable): Coroutine function fetching the file, returning the file and the size
+                of its response body in bytes, or None if it failed.
+
+        Returns:
+            dict or None: The file.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        if key in self._in_flight:
+            self.coalesced += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            fetched = await fetch()
+            value = None
+            if fetched is not None:
+                value, size = fetched
+                self.put(key, value, size)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieve the exception, so waiting for no caller is not reported
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def get_many_or_fetch(self, keys, fetch_many):
+        """
+        Returns many files, fetching everything that is neither cached nor being fetched with a
+        single call. Files being fetched by other calls are waited for.
+
+        Args:
+            keys (list[str]): The fileLocations of the files.
+            fetch_many (Callable): Coroutine function taking the missing keys and returning the
+                fetched files and the sizes of their response bodies in bytes, as (file, size)
+                pairs by key. Keys it leaves out are not resolved.
+
+        Returns:
+            dict: The files by key, None for the files fetch_many returned as None.
+        """
+        values = {}
+        waiting = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+            elif key in self._in_flight:
+                self.coalesced += 1
+                waiting[key] = self._in_flight[key]
+            else:
+                missing.append(key)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in missing}
+            self._in_flight.update(futures)
+            try:
+                fetched = await fetch_many(missing)
+            except BaseException as e:
+                for future in futures.values():
+                    future.set_exception(e)
+                    future.exception()
+                raise
+            finally:
+                for key in missing:
+                    del self._in_flight[key]
+            for key, future in futures.items():
+                if key in fetched:
+                    value, size = fetched[key]
+                    values[key] = value
+                    if value is not None:
+                        self.put(key, value, size)
+                    future.set_result(value)
+                else:
+                    # Left for the caller to fetch on its own
+                    future.set_result(None)
+
+        for key, future in waiting.items():
+            try:
+                value = await asyncio.shield(future)
+            except Exception:
+                continue
+            if value is not None:
+                values[key] = value
+        return values
+
+    def stats(self):
+        """
+        Returns the cache's counters.
+
+        Returns:
+            dict: Size, hit, miss and eviction counts.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,25 +1,42 @@
 import asyncio
 import logging
-import requests
-from fastapi import FastAPI, Request
-from pymongo import MongoClient
+import time
+from concurrent.futures import BrokenExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 import uvicorn
 from datetime import datetime, timedelta, timezone
-from geopy.distance import geodesic
+from anomaly_archive import AnomalyArchiver
+from anomaly_store import CORRELATION_PROJECTION, MongoAnomalyStore
+from anomaly_write_buffer import AnomalyWriteBuffer
+from correlated_file_uploader import CorrelatedFileUploader, FILE_DATA_REPORTING_URL
+from correlation_rules import CorrelationRuleIndex, DEFAULT_CORRELATION_RULES
+from correlation_event import CorrelationEvent, anomaly_type_id
+from correlation_window import CorrelationWindow
+from correlation_pool import CorrelationPool
+from correlation_scoring import CorrelationScorer
+from instrumentation import (CORRELATIONS_FOUND, EVENTS_PROCESSED, JSON_DECODE, REQUEST, RULE_EVALUATION,
+                             WINDOW_QUERY, Metrics)
+from serialization import FastJSONResponse, decode_event, decode_events
+from tracing import TRACEPARENT, Tracer, span_exporter_from_env
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-FILE_DATA_REPORTING_URL = "http://localhost:8080/fileDataReportingMnS/v1/files"
 
-
-class HermesAgent:
+class HermesAgent(CorrelationScorer):
     """
         The HermesAgent class processes anomaly data, identifies correlations based on predefined rules,
         and stores the enriched data in MongoDB.
     """
 
-    def __init__(self, host="127.0.0.1", port=8081, mongo_uri="mongodb://localhost:27017", db_name="anomaly_data"):
+    def __init__(self, host="127.0.0.1", port=8081, mongo_uri="mongodb://localhost:27017", db_name="anomaly_data",
+                 window_minutes=60, rules_path=None, mongo_pool_size=100, store=None,
+                 write_batch_size=100, write_max_latency_ms=200, files_url=FILE_DATA_REPORTING_URL,
+                 upload_batch_size=50, exact_proximity_margin_km=None, batch_min_candidates=200,
+                 correlation_workers=0, parallel_min_candidates=5000, retention_days=None, resident_window=True,
+                 archive=None, archive_interval_seconds=60, span_exporter=None):
         """
                 Initializes the HermesAgent instance, FastAPI app, MongoDB client, and correlation rules.
 
@@ -28,368 +45,183 @@ class HermesAgent:
                     port (int): The port number for the FastAPI application.
                     mongo_uri (str): The MongoDB connection URI.
                     db_name (str): The MongoDB database name.
+                    window_minutes (float): How many minutes of recent events are kept for correlation.
+                    rules_path (str, optional): A JSON file with correlation rules replacing the defaults.
+                        The file is reloaded whenever it changes.
+                    mongo_pool_size (int): The maximum number of pooled MongoDB connections.
+                    store (optional): The anomaly store to use instead of MongoDB, e.g. an InMemoryAnomalyStore.
+                    write_batch_size (int): Number of buffered events that triggers a write to MongoDB.
+                    write_max_latency_ms (float): Maximum time an event stays buffered before it is written.
+                    files_url (str): The /files endpoint correlated files are uploaded to.
+                    upload_batch_size (int): Maximum number of correlated files uploaded in one request.
+                    exact_proximity_margin_km (float, optional): Event distances this close to a rule's
+                        location threshold are recomputed with the exact geodesic distance.
+                    batch_min_candidates (int, optional): Events with at least this many candidates are
+                        scored with NumPy column operations, see check_correlation_rules_batch.
+                        None always scores pair by pair.
+                    correlation_workers (int): Number of worker processes scoring events with many
+                        candidates, see CorrelationPool. 0 scores every event in the event loop.
+                    parallel_min_candidates (int): Events with fewer candidates are scored inline,
+                        where shipping them to the workers would cost more than it saves.
+                    retention_days (float, optional): Stored anomalies are deleted by MongoDB this many
+                        days after they were generated. None keeps them. With an archive, it must
+                        exceed the hot window plus archive_interval_seconds, so events are archived
+                        before they expire.
+                    resident_window (bool): Keeps the last window of events in memory. False queries
+                        the candidates of every event from MongoDB instead, for deployments whose
+                        window does not fit in memory; correlation_workers is ignored then.
+                    archive (optional): Where events are moved once they are older than the window
+                        and every rule's time threshold, a MongoAnomalyArchive or NdjsonAnomalyArchive.
+                        None keeps them in the anomalies collection.
+                    archive_interval_seconds (float): The time between two archiving runs.
+                    span_exporter (optional): Where the spans of traced events are exported, a
+                        FileSpanExporter or InMemorySpanCollector. Defaults to the file named by
+                        the TRACE_EXPORT_PATH environment variable, if set.
+
+                Raises:
+                    ValueError: If retention_days would delete events before they are archived.
         """
         self.host = host
         self.port = port
-        self.app = FastAPI()
-        self.client = MongoClient(mongo_uri)
-        self.db = self.client[db_name]
-        self.collection = self.db["anomalies"]
+        self.app = FastAPI(lifespan=self.lifespan_context, default_response_class=FastJSONResponse)
+        self.metrics = Metrics("hermes")
+        self.tracer = Tracer("hermes", span_exporter if span_exporter is not None else span_exporter_from_env())
+        self.store = store if store is not None else MongoAnomalyStore(mongo_uri, db_name, pool_size=mongo_pool_size)
+        self.write_buffer = AnomalyWriteBuffer(self.store, max_batch_size=write_batch_size,
+                                               max_latency_seconds=write_max_latency_ms / 1000, metrics=self.metrics)
+        self.uploader = CorrelatedFileUploader(files_url, max_batch_size=upload_batch_size, metrics=self.metrics)
+        self.correlation_window = CorrelationWindow(window_minutes)
+        self.exact_proximity_margin_km = exact_proximity_margin_km
+        self.batch_min_candidates = batch_min_candidates
+        self.parallel_min_candidates = parallel_min_candidates
+        self.retention_days = retention_days
+        self.resident_window = resident_window
         self.app.post("/receive_shared_data")(self.receive_shared_data)
-
-        # Define correlation rules
-        self.correlation_rules = [
-            {
-                "name": "Radio Link Failures might be leading to frequent service access attempts",
-                "anomalies": ["UNEXPECTED_RADIO_LINK_FAILURES", "TOO_FREQUENT_SERVICE_ACCESS"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 60}
-                ]
-            },
-            {
-                "name": "Unexpected UE Location could relate to Radio Link Failures",
-                "anomalies": ["UNEXPECTED_UE_LOCATION", "UNEXPECTED_RADIO_LINK_FAILURES"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "location", "match": "proximity", "threshold_km": 5},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 30}
-                ]
-            },
-            {
-                "name": "A DDoS attack might be overloading network resources, leading to Radio Link Failures",
-                "anomalies": ["UNEXPECTED_RADIO_LINK_FAILURES", "SUSPICION_OF_DDOS_ATTACK"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 30}
-                ]
-            },
-            {
-                "name": "Unexpected Large Rate Flows could be straining network resources and contribute to Radio Link Failures",
-                "anomalies": ["UNEXPECTED_RADIO_LINK_FAILURES", "UNEXPECTED_LARGE_RATE_FLOWS"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 30}
-                ]
-            },
-            {
-                "name": "Long-lived flows might be consuming network resources leading to Radio Link Failures",
-                "anomalies": ["UNEXPECTED_RADIO_LINK_FAILURES", "UNEXPECTED_LONG_LIVE_FLOWS"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 30}
-                ]
-            },
-            {
-                "name": "A DDoS attack might be overloading network resources, leading to Radio Link Failures",
-                "anomalies": ["SUSPICION_OF_DDOS_ATTACK", "UNEXPECTED_RADIO_LINK_FAILURES"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 60}
-                ]
-            },
-            {
-                "name": "A DDoS attack might be causing Frequent Service Access Attempts",
-                "anomalies": ["SUSPICION_OF_DDOS_ATTACK", "TOO_FREQUENT_SERVICE_ACCESS"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time_interval", "match": "contains"}
-                ]
-            },
-            {
-                "name": "Frequent Service Access attempts might be causing Unexpected Large Rate Flows",
-                "anomalies": ["UNEXPECTED_LARGE_RATE_FLOWS", "TOO_FREQUENT_SERVICE_ACCESS"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time_interval", "match": "overlap"}
-                ]
-            },
-            {
-                "name": "Frequent service access might be causing Long-Lived Flows",
-                "anomalies": ["UNEXPECTED_LONG_LIVE_FLOWS", "TOO_FREQUENT_SERVICE_ACCESS"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time_interval", "match": "overlap"}
-                ]
-            },
-            {
-                "name": "Too Frequent Service Access might be due to Radio Link Failure",
-                "anomalies": ["TOO_FREQUENT_SERVICE_ACCESS", "UNEXPECTED_RADIO_LINK_FAILURES"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 60}
-                ]
-            },
-            {
-                "name": "Too Frequent Service Access might be causing Unexpected Large Rate Flows",
-                "anomalies": ["TOO_FREQUENT_SERVICE_ACCESS", "UNEXPECTED_LARGE_RATE_FLOWS"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 30}
-                ]
-            },
-            {
-                "name": "Too Frequent Service Access might be resulting in Long-Live Flows",
-                "anomalies": ["TOO_FREQUENT_SERVICE_ACCESS", "UNEXPECTED_LONG_LIVE_FLOWS"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 30}
-                ]
-            },
-            {
-                "name": "Radio Link Failures might be leading to Unexpectedly Low Rate Flows",
-                "anomalies": ["UNEXPECTED_LOW_RATE_FLOWS", "UNEXPECTED_RADIO_LINK_FAILURES"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 60}
-                ]
-            },
-            {
-                "name": "A DDoS attack might be leading to Low Rate Flows",
-                "anomalies": ["UNEXPECTED_LOW_RATE_FLOWS", "SUSPICION_OF_DDOS_ATTACK"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 30}
-                ]
-            },
-            {
-                "name": "Large rate flows could temporarily be disrupting normal traffic, leading to unexpectedly Low Rate Flows",
-                "anomalies": ["UNEXPECTED_LOW_RATE_FLOWS", "UNEXPECTED_LARGE_RATE_FLOWS"],
-                "conditions": [
-                    {"type": "ue_ids", "match": "intersection"},
-                    {"type": "time", "match": "overlap", "threshold_minutes": 30}
-                ]
-            }
-        ]
-
-    def calculate_correlation_score(self, ue_ids_match, time_difference, time_threshold, rule_conditions, event,
-                                    recent_event):
+        self.app.post("/receive_shared_data/batch")(self.receive_shared_data_batch)
+        self.app.get("/stats")(self.get_stats)
+        self.app.get("/metrics")(self.get_metrics)
+        self.correlation_rules = CorrelationRuleIndex(DEFAULT_CORRELATION_RULES, rules_path=rules_path)
+        self.archiver = None
+        if archive is not None:
+            self.archiver = AnomalyArchiver(self.store, archive, self.hot_window,
+                                            interval_seconds=archive_interval_seconds)
+            # An event is archived at most one interval after it leaves the hot window
+            archived_within = self.hot_window() + timedelta(seconds=archive_interval_seconds)
+            if retention_days is not None and timedelta(days=retention_days) <= archived_within:
+                raise ValueError(f"retention_days={retention_days} expires events before they are archived, "
+                                 f"it must exceed the hot window plus the archive interval ({archived_within})")
+        self.correlation_pool = None
+        if correlation_workers and resident_window:
+            self.correlation_pool = CorrelationPool(correlation_workers, self.correlation_rules,
+                                                    window_minutes=window_minutes,
+                                                    exact_proximity_margin_km=exact_proximity_margin_km,
+                                                    batch_min_candidates=batch_min_candidates)
+
+    @asynccontextmanager
+    async def lifespan_context(self, app: FastAPI):
         """
-        Calculates a correlation score based on the matching UE IDs, time difference,
-        and rule-specific conditions.
+                Creates the indexes of the anomalies collection and warms the correlation window from
+                MongoDB before the application starts serving.
+                On shutdown, buffered events are flushed and pending uploads sent before the store is closed.
 
-        Args:
-            ue_ids_match (bool): Whether UE IDs intersect.
-            time_difference (timedelta): The difference between event and recent event timestamps.
-            time_threshold (timedelta): The maximum allowable time difference for correlation.
-            rule_conditions (list): The conditions defined in the correlation rule.
-            event (dict): The current event being checked for correlation.
-            recent_event (dict): The recent event being compared.
+                Args:
+                    app (FastAPI): The FastAPI application.
 
-        Returns:
-            float: The calculated correlation score.
-        """
-        # Initialize score components
-        score = 0.0
-
-        # Weight assignments
-        weight_ue_ids = 0.3
-        weight_time_proximity = 0.4
-        weight_location_proximity = 0.3
-        weight_additional_conditions = 0.1
-
-        # print("\n--- Calculating Correlation Score ---")
-
-        # 🛠 UE ID match contribution
-        if ue_ids_match:
-            score += weight_ue_ids
-            # print(f"✔ UE ID Match: +{weight_ue_ids}")
-
-        # 🛠 Time proximity contribution
-        if time_difference <= time_threshold:
-            time_proximity_score = 1 - (time_difference.total_seconds() / time_threshold.total_seconds())
-            time_score = weight_time_proximity * time_proximity_score
-            score += time_score
-            # print(f"✔ Time Proximity: {time_proximity_score:.2f} * {weight_time_proximity} = +{time_score:.2f}")
-
-        # 🛠 Rule-specific conditions
-        for condition in rule_conditions:
-            if condition["type"] == "location" and condition["match"] == "proximity":
-                event_location = \
-                event["eventNotifications"][0]["abnorBehavrs"][0].get("addtMeasInfo", {}).get("circums", [{}])[0].get(
-                    "locArea", {})
-                recent_location = \
-                recent_event["eventNotifications"][0]["abnorBehavrs"][0].get("addtMeasInfo", {}).get("circums", [{}])[
-                    0].get("locArea", {})
-
-                if event_location and recent_location:
-                    proximity_score = HermesAgent.calculate_proximity_score(event_location, recent_location,
-                                                                            condition["threshold_km"])
-                    loc_score = weight_location_proximity * proximity_score
-                    score += loc_score
-                    # print(
-                    #     f"✔ Location Proximity: {proximity_score:.2f} * {weight_location_proximity} = +{loc_score:.2f}")
-
-            if condition["type"] == "additional_metric":
-                additional_metric_score = HermesAgent.calculate_additional_metric(event, recent_event, condition)
-                add_score = weight_additional_conditions * additional_metric_score
-                score += add_score
-                # print(
-                #     f"✔ Additional Metric: {additional_metric_score:.2f} * {weight_additional_conditions} = +{add_score:.2f}")
-
-        # Ensure the score is within bounds (0 to 1)
-        final_score = min(score, 1.0)
-        # print(f"✅ Final Score: {final_score:.2f}")
-        return final_score
-
-    @staticmethod
-    def calculate_proximity_score(location1, location2, threshold_km):
+                Yields:
+                    None
         """
-        Calculate proximity score based on geographical locations.
+        await self.ensure_indexes()
+        if self.resident_window:
+            await self.warm_correlation_window()
+        if self.correlation_pool is not None:
+            self.correlation_pool.start(self.correlation_window)
+        await self.write_buffer.start()
+        await self.uploader.start()
+        if self.archiver is not None:
+            await self.archiver.start()
+        yield
+        if self.archiver is not None:
+            await self.archiver.stop()
+        await self.uploader.stop()
+        await self.write_buffer.stop()
+        if self.correlation_pool is not None:
+            self.correlation_pool.stop()
+        self.store.close()
+        self.tracer.close()
+
+    async def ensure_indexes(self):
+        """Creates the indexes of the anomalies collection; Hermes still starts if that fails."""
+        retention_seconds = None if self.retention_days is None else self.retention_days * 24 * 3600
+        try:
+            await self.store.ensure_indexes(retention_seconds=retention_seconds)
+        except Exception as e:
+            logger.error(f"Failed to create the indexes of the anomalies collection: {e}")
 
-        Args:
-            location1 (dict): The first location with latitude and longitude.
-            location2 (dict): The second location with latitude and longitude.
-            threshold_km (float): Maximum distance in kilometers for full proximity score.
+    def hot_window(self):
+        """Returns how long events can still be correlated: the window or the largest rule threshold."""
+        return max(self.correlation_window.window, self.correlation_rules.max_time_threshold)
 
-        Returns:
-            float: A proximity score between 0 and 1.
-        """
-        coords1 = (location1.get("latitude"), location1.get("longitude"))
-        coords2 = (location2.get("latitude"), location2.get("longitude"))
-
-        distance_km = geodesic(coords1, coords2).kilometers
-        return max(0.0, 1 - (distance_km / threshold_km))
+    async def warm_correlation_window(self):
+        """Loads the events of the last window from MongoDB into the correlation window."""
+        time_threshold = datetime.now(timezone.utc) - self.correlation_window.window
+        recent_events = await self.store.find_recent(time_threshold, projection=CORRELATION_PROJECTION)
+        loaded = self.correlation_window.warm(recent_events)
+        logger.info(f"Correlation window warmed with {loaded} events")
 
-    @staticmethod
-    def calculate_additional_metric(event, recent_event, condition):
+    def relevant_anomaly_types(self, event_type):
         """
-        Calculates an additional metric score based on specific conditions such as signal quality,
-        confidence, exception level, or ratio.
+        Returns the anomaly types that share at least one correlation rule with the given type.
 
         Args:
-            event (dict): The current event being checked.
-            recent_event (dict): The recent event being compared.
-            condition (dict): Specific condition details.
+            event_type (str): The excepId of the incoming event.
 
         Returns:
-            float: A score between 0 and 1.
+            frozenset: The excepIds of possible correlation partners.
         """
-        score = 0.0
+        return self.correlation_rules.relevant_anomaly_types(event_type)
 
-        try:
-            if condition["type"] == "signal_quality":
-                event_signal = event["eventNotifications"][0]["abnorBehavrs"][0].get(
-                    "addtMeasInfo", {}).get("nwPerfs", [{}])[0]
-                recent_signal = recent_event["eventNotifications"][0]["abnorBehavrs"][0].get(
-                    "addtMeasInfo", {}).get("nwPerfs", [{}])[0]
-
-                if event_signal and recent_signal:
-                    event_rsrp = float(event_signal.get("signalQuality", {}).get("RSRP", "-120 dBm").split()[0])
-                    recent_rsrp = float(recent_signal.get("signalQuality", {}).get("RSRP", "-120 dBm").split()[0])
-                    event_sinr = float(event_signal.get("signalQuality", {}).get("SINR", "0 dB").split()[0])
-                    recent_sinr = float(recent_signal.get("signalQuality", {}).get("SINR", "0 dB").split()[0])
-
-                    rsrp_diff = abs(event_rsrp - recent_rsrp)
-                    sinr_diff = abs(event_sinr - recent_sinr)
-
-                    score += max(0.0, 1 - rsrp_diff / 20) * 0.5
-                    score += max(0.0, 1 - sinr_diff / 20) * 0.5
-
-            elif condition["type"] == "confidence":
-                event_confidence = event["eventNotifications"][0]["abnorBehavrs"][0].get("confidence", 0)
-                recent_confidence = recent_event["eventNotifications"][0]["abnorBehavrs"][0].get("confidence", 0)
-
-                score += min(event_confidence, recent_confidence) / 100
-
-            elif condition["type"] == "exception_level":
-                event_level = event["eventNotifications"][0]["abnorBehavrs"][0]["excep"].get("excepLevel", 0)
-                recent_level = recent_event["eventNotifications"][0]["abnorBehavrs"][0]["excep"].get("excepLevel", 0)
-
-                level_diff = abs(event_level - recent_level)
-                score += max(0, 1 - level_diff / 5)
-
-            elif condition["type"] == "ratio":
-                event_ratio = event["eventNotifications"][0]["abnorBehavrs"][0].get("ratio", 0)
-                recent_ratio = recent_event["eventNotifications"][0]["abnorBehavrs"][0].get("ratio", 0)
-
-                ratio_diff = abs(event_ratio - recent_ratio)
-                score += max(0, 1 - ratio_diff)
-
-        except Exception as e:
-            print(f"Error calculating metric: {e}")
-
-        return min(score, 1.0)
-
-    def check_correlation_rules(self, event, recent_events):
+    async def find_candidates(self, event):
         """
-        Checks correlations between the current event and recent events based on predefined rules.
+        Returns the recent events sharing a UE ID and a relevant anomaly type with an event: from
+        the correlation window, or, without a resident window, from MongoDB and the events still
+        waiting in the write buffer.
 
         Args:
-            event (dict): The current event being evaluated.
-            recent_events (list): A list of recent events.
+            event (CorrelationEvent): The incoming event.
 
         Returns:
-            list: A list of correlations matching the predefined rules.
+            list[CorrelationEvent]: The candidate events, each at most once.
         """
-        correlations = []
-
-        # Assume 'timeStampGen' is valid and in the correct format
-        event_time_str = str(event['eventNotifications'][0]['timeStampGen'])
-        event_time = datetime.fromisoformat(event_time_str).astimezone(timezone.utc)
-
-        event_type = event['eventNotifications'][0]['abnorBehavrs'][0]['excep']['excepId']
-        event_ue_ids = set(event['eventNotifications'][0]['abnorBehavrs'][0].get('supis', []))
-
-        for rule in self.correlation_rules:
-            if event_type in rule['anomalies']:
-                for recent_event in recent_events:
-                    recent_event_time_str = str(recent_event['eventNotifications'][0]['timeStampGen'])
-                    recent_event_time = datetime.fromisoformat(recent_event_time_str).replace(tzinfo=timezone.utc)
-                    recent_event_type = recent_event['eventNotifications'][0]['abnorBehavrs'][0]['excep']['excepId']
-                    recent_event_ue_ids = set(recent_event['eventNotifications'][0]['abnorBehavrs'][0].get('supis', []))
-
-                    # Skip same-type correlations
-                    if event_type == recent_event_type:
-                        continue
-
-                    # Calculate time difference
-                    time_difference = abs(event_time - recent_event_time)
-
-                    time_threshold = timedelta(minutes=float(
-                        next((cond["threshold_minutes"] for cond in rule["conditions"] if cond["type"] == "time"), 60)
-                        # Default to 60 minutes if missing
-                    ))
-
-                    # Check UE IDs and time conditions
-                    ue_ids_match = event_ue_ids & recent_event_ue_ids
-
-                    time_condition_met = any(
-                        cond["type"] == "time" and cond["match"] == "overlap" and time_difference <= time_threshold
-                        for cond in rule["conditions"]
-                    )
-
-
-
-
-                    # Calculate correlation score
-                    correlation_score = self.calculate_correlation_score(
-                        ue_ids_match=bool(ue_ids_match),
-                        time_difference=time_difference,
-                        time_threshold=timedelta(minutes=float(
-                            next((cond["threshold_minutes"] for cond in rule["conditions"] if cond["type"] == "time"),
-                                 60)  # Default to 60 minutes if missing
-                        )),
-                        rule_conditions=rule["conditions"],
-                        event=event,
-                        recent_event=recent_event
-                    )
-
-                    if recent_event_type in rule['anomalies'] and ue_ids_match and time_condition_met:
-                        correlations.append({
-                            "rule_name": rule["name"],
-                            "correlated_event_id": recent_event["_id"],
-                            "correlation_score": correlation_score
-                        })
-                    # else:
-                    #     logger.info(f"No correlation: Rule '{rule['name']}', "
-                    #                 f"Event Type: {event_type}, Recent Type: {recent_event_type}, "
-                    #                 f"UE ID Match: {bool(ue_ids_match)}, Time Condition Met: {time_condition_met}")
-        return correlations
+        anomaly_types = self.relevant_anomaly_types(event.anomaly_type)
+        if self.resident_window:
+            return self.correlation_window.candidates(event, anomaly_types)
+
+        since = datetime.now(timezone.utc) - self.correlation_window.window
+        stored = await self.store.find_candidates(since, event.supis, anomaly_types)
+        candidates = {}
+        for document in stored:
+            try:
+                record = CorrelationEvent.from_document(document)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                logger.error(f"Skipping malformed event {document.get('_id')}: {e}")
+                continue
+            candidates[record.key] = record
+
+        # Buffered events are not in MongoDB yet
+        since = since.timestamp()
+        type_ids = {anomaly_type_id(anomaly_type) for anomaly_type in anomaly_types}
+        for document in self.write_buffer.pending():
+            if document["_id"] in candidates:
+                continue
+            record = CorrelationEvent.from_document(document)
+            if record.time >= since and record.type_id in type_ids and not record.supis.isdisjoint(event.supis):
+                candidates[record.key] = record
+        return list(candidates.values())
 
     def generate_file_content(self, event, correlation_data):
         """
         Generates the appropriate file structure for AMF, SMF, or UDM based on the event type.
+        The file carries the event's traceparent, so its upload continues the event's trace.
         """
         event_notifications = event['eventNotifications'][0]
         abnormal_behavior = event_notifications['abnorBehavrs'][0]
@@ -483,21 +315,16 @@ class HermesAgent:
             "fileCompression": "zip",
             "fileFormat": "JSON"
         })
+        if event.get(TRACEPARENT):
+            file_content[TRACEPARENT] = event[TRACEPARENT]
 
         return file_content
 
 
     def upload_file_to_reporting_system(self, file_data):
-        """Uploads the generated file to the File Data Reporting System."""
-        headers = {"Content-Type": "application/json"}
-        try:
-            response = requests.post(FILE_DATA_REPORTING_URL, headers=headers, json=file_data)
-            if response.status_code == 201:
-                logger.info(f"Successfully uploaded file. File ID: {response.json().get('fileId')}")
-            else:
-                logger.error(f"Failed to upload file. Status Code: {response.status_code}, Response: {response.text}")
-        except Exception as e:
-            logger.error(f"Error uploading file: {e}")
+        """Schedules the generated file for upload to the File Data Reporting System without waiting for it."""
+        if file_data:
+            self.uploader.enqueue(file_data)
 
     async def receive_shared_data(self, request: Request):
         """
@@ -509,57 +336,157 @@ class HermesAgent:
                 Returns:
                     dict: A response indicating the success of the operation.
         """
+        start = time.perf_counter()
 
-        # Processing Start Time
-        processing_start_time = datetime.now(timezone.utc)
-        logger.info(f"[PROCESSING START] Hermes Received data at: {processing_start_time}")
+        # timeStampGen is decoded as datetime right away
+        body = await request.body()
+        with self.metrics.time(JSON_DECODE):
+            shared_data = decode_event(body)
+        await self.process_event(shared_data)
 
-        shared_data = await request.json()
-
-        # Convert timeStampGen to timezone-aware datetime in UTC
-        for notification in shared_data['eventNotifications']:
-            notification['timeStampGen'] = datetime.fromisoformat(str(notification['timeStampGen'])).astimezone(
-                timezone.utc)
+        self.metrics.observe(REQUEST, time.perf_counter() - start)
+        return {"status": "success"}
 
-        # Retrieve recent events to compare for correlation
-        time_threshold = datetime.now(timezone.utc) - timedelta(minutes=60)
+    async def receive_shared_data_batch(self, request: Request):
+        """
+                Handles a batch of events forwarded at once by an examiner agent, see HermesForwarder.
 
-        recent_events = list(self.collection.find({
-            "eventNotifications.timeStampGen": {
-                "$gte": time_threshold
-            }
-        }))
+                Args:
+                    request (Request): The incoming HTTP request containing a JSON array of events.
 
+                Returns:
+                    dict: A response indicating the success of the operation and the number of events.
+        """
+        start = time.perf_counter()
 
+        body = await request.body()
+        try:
+            with self.metrics.time(JSON_DECODE):
+                events = decode_events(body)
+        except ValueError as e:
+            logger.error(f"Invalid event batch: {e}")
+            raise HTTPException(status_code=422, detail="Invalid event batch")
+        await self.process_events(events)
 
-        # Calculate correlations based on rules
-        correlation_data = self.check_correlation_rules(shared_data, recent_events)
+        self.metrics.observe(REQUEST, time.perf_counter() - start)
+        return {"status": "success", "events": len(events)}
 
-        # Add correlation data to the event document
-        shared_data['correlation_data'] = correlation_data
+    async def process_events(self, events):
+        """
+                Correlates a batch of events in their order. Every event joins the window before the
+                next one is correlated, so the events of a batch are correlated against each other as
+                well as against the window, exactly as if they had been received one by one.
 
-        if correlation_data:
-            file_data = self.generate_file_content(shared_data, correlation_data)
-            self.upload_file_to_reporting_system(file_data)
+                Args:
+                    events (list[dict]): The events as forwarded by an examiner agent.
 
-        # Insert updated event data into MongoDB
-        try:
-            self.collection.insert_one(shared_data)
-            # logger.info("Event stored with correlation data.")
+                Returns:
+                    list[list]: The correlations found for each event.
+        """
+        results = []
+        for shared_data in events:
+            try:
+                results.append(await self.process_event(shared_data))
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                logger.error(f"Skipping malformed event {shared_data.get('_id')} of a batch: {e}")
+                results.append([])
+            # Lets other requests and the write buffer's flushes run between the events
+            await asyncio.sleep(0)
+        return results
+
+    async def process_event(self, shared_data):
+        """
+                Computes the correlations of an event against the window and stores the enriched event.
 
-            #  Processing End Time
-            processing_end_time = datetime.now(timezone.utc)
-            logger.info(f"[PROCESSING END] Hermes Processing completed at: {processing_end_time}")
+                Args:
+                    shared_data (dict): The event as forwarded by an examiner agent, decoded with
+                        decode_event so its timeStampGen values are UTC datetimes.
 
-            #  Calculate and Log Total Processing Time
-            processing_duration = (processing_end_time - processing_start_time).total_seconds()
-            logger.info(f"[PROCESSING TIME] Total Hermes processing time: {processing_duration:.2f} seconds")
-        except Exception as e:
-            logger.error(f"Failed to insert data: {e}")
+                Returns:
+                    list: The correlations found for the event.
+        """
+        self.correlation_rules.reload_if_changed()
+
+        # The event continues the trace of the file it was found in, if the examiner agent sent one
+        with self.tracer.start_span("hermes.process_event", shared_data.get(TRACEPARENT)) as span:
+            # The fields used for correlation are parsed once
+            event = CorrelationEvent.from_document(shared_data)
+
+            # Retrieve recent events sharing a UE ID and a relevant anomaly type
+            start = time.perf_counter()
+            recent_events = await self.find_candidates(event)
+            self.metrics.observe(WINDOW_QUERY, time.perf_counter() - start)
+
+            # Calculate correlations based on rules, in the worker processes for large candidate sets
+            start = time.perf_counter()
+            if self.correlation_pool is not None and self.correlation_pool.running \
+                    and len(recent_events) >= self.parallel_min_candidates:
+                try:
+                    correlation_data = await self.correlation_pool.check_correlation_rules(event, recent_events)
+                except BrokenExecutor:
+                    # The pool stopped itself; Hermes' own window holds every event of the shards
+                    correlation_data = self.check_correlation_rules(event, recent_events)
+            else:
+                correlation_data = self.check_correlation_rules(event, recent_events)
+            self.metrics.observe(RULE_EVALUATION, time.perf_counter() - start)
+            self.metrics.increment(EVENTS_PROCESSED)
+            self.metrics.increment(CORRELATIONS_FOUND, len(correlation_data))
+            span.set_attribute("candidates", len(recent_events))
+            span.set_attribute("correlations", len(correlation_data))
+
+            # The stored event and its correlated file refer to this span
+            shared_data[TRACEPARENT] = span.traceparent
+
+            # Add correlation data to the event document
+            shared_data['correlation_data'] = correlation_data
+
+            if correlation_data:
+                file_data = self.generate_file_content(shared_data, correlation_data)
+                self.upload_file_to_reporting_system(file_data)
+
+            # Buffer the enriched event for MongoDB; it is correlated against right away
+            try:
+                await self.write_buffer.add(shared_data)
+                event.key = shared_data["_id"]
+                span.set_attribute("eventId", str(event.key))
+                if self.resident_window:
+                    self.correlation_window.add(event)
+                if self.correlation_pool is not None and self.correlation_pool.running:
+                    self.correlation_pool.add(event)
+                # logger.info("Event stored with correlation data.")
+            except Exception as e:
+                logger.error(f"Failed to insert data: {e}")
+
+        return correlation_data
+
+    async def get_stats(self):
+        """
+                Returns Hermes' internal counters.
 
+                Returns:
+                    dict: The write buffer, uploader, archiver and correlation pool statistics.
+        """
+        stats = {"write_buffer": self.write_buffer.stats(), "uploader": self.uploader.stats()}
+        if self.archiver is not None:
+            stats["archiver"] = self.archiver.stats()
+        if self.correlation_pool is not None:
+            stats["correlation_pool"] = self.correlation_pool.stats()
+        return stats
+
+    async def get_metrics(self, format: str = "prometheus"):
+        """
+                Returns the per-stage latency histograms and counters of Hermes.
 
+                Args:
+                    format (str): "prometheus" for the text exposition format, "json" for a summary
+                        with p50/p95/p99 per stage.
 
-        return {"status": "success"}
+                Returns:
+                    PlainTextResponse or dict: The metrics.
+        """
+        if format == "json":
+            return self.metrics.snapshot()
+        return PlainTextResponse(self.metrics.render(), media_type="text/plain; version=0.0.4")
 
     async def start(self):
         server = uvicorn.Server(uvicorn.Config(self.app, host=self.host, port=self.port, log_level="info"))
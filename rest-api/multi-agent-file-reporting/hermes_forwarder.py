@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+import aiohttp
+from instrumentation import HERMES_FORWARD
+from serialization import dumps
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class HermesForwarder:
+    """
+        Forwards an examiner agent's events to Hermes in micro-batches.
+
+        Events are collected and posted as one JSON array to Hermes' batch endpoint once
+        max_batch_size events are collected or the first of them waited linger_ms, whichever
+        comes first. Under load batches fill up, so Hermes handles one request per batch instead
+        of one per event; when idle, an event is delayed by at most linger_ms.
+    """
+
+    def __init__(self, batch_url, max_batch_size=100, linger_ms=5, max_concurrent_requests=4, max_buffered=10000,
+                 metrics=None):
+        """
+                Initializes the forwarder; start() hands it the agent's HTTP session.
+
+                Args:
+                    batch_url (str): Hermes' /receive_shared_data/batch endpoint.
+                    max_batch_size (int): Number of collected events that triggers a request.
+                    linger_ms (float): Maximum time an event waits for others to join its batch.
+                    max_concurrent_requests (int): Maximum number of batches posted at the same time.
+                    max_buffered (int): Upper bound of collected events, adding more waits for a request.
+                    metrics (Metrics, optional): Records the duration of every request as hermes_forward.
+        """
+        self.batch_url = batch_url
+        self.max_batch_size = max_batch_size
+        self.linger_seconds = linger_ms / 1000
+        self.max_buffered = max(max_buffered, max_batch_size)
+        self.metrics = metrics
+
+        self.session = None
+        self._buffer = []
+        self._timer = None
+        self._requests = asyncio.Semaphore(max_concurrent_requests)
+        self._flush_tasks = set()
+
+        # Counters
+        self.batches = 0
+        self.forwarded_events = 0
+        self.failed_events = 0
+
+    def __len__(self):
+        return len(self._buffer)
+
+    async def start(self, session):
+        """
+        Starts forwarding through the given session.
+
+        Args:
+            session (aiohttp.ClientSession): The agent's shared HTTP session.
+        """
+        self.session = session
+
+    async def stop(self):
+        """Forwards every collected event; the session has to stay open until this returns."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        while self._buffer:
+            await self.flush()
+
+    async def add(self, shared_data):
+        """
+        Collects an event for forwarding.
+
+        Args:
+            shared_data (dict): The event for Hermes.
+        """
+        if len(self._buffer) >= self.max_buffered:
+            await self.flush()
+
+        self._buffer.append(shared_data)
+        if len(self._buffer) >= self.max_batch_size:
+            self._flush_soon()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.linger_seconds, self._flush_soon)
+
+    def _flush_soon(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        task = asyncio.create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self):
+        """
+        Posts the collected events, at most max_batch_size of them, in one request.
+
+        Returns:
+            bool: False if Hermes did not accept the batch. Its events are counted as failed
+            and not retried, like a failed per-event request.
+        """
+        # The batch is taken without awaiting, so concurrent flushes never share events
+        batch = self._buffer[:self.max_batch_size]
+        if not batch:
+            return True
+        del self._buffer[:len(batch)]
+        if self._buffer and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.linger_seconds, self._flush_soon)
+
+        async with self._requests:
+            start = time.perf_counter()
+            try:
+                async with self.session.post(self.batch_url, data=dumps(batch),
+                                             headers={"Content-Type": "application/json"}) as response:
+                    if response.status == 200:
+                        self.batches += 1
+                        self.forwarded_events += len(batch)
+                        return True
+                    logger.error(f"Failed to send {len(batch)} events to Hermes. Status code: {response.status}")
+            except aiohttp.ClientError as e:
+                logger.error(f"Failed to send {len(batch)} events to Hermes: {e}")
+            finally:
+                if self.metrics is not None:
+                    self.metrics.observe(HERMES_FORWARD, time.perf_counter() - start)
+        self.failed_events += len(batch)
+        return False
+
+    def stats(self):
+        """
+        Returns the forwarder's counters.
+
+        Returns:
+            dict: Collected, forwarded and failed events and the mean batch size.
+        """
+        return {
+            "buffered": len(self._buffer),
+            "batches": self.batches,
+            "forwarded_events": self.forwarded_events,
+            "failed_events": self.failed_events,
+            "average_batch_size": self.forwarded_events / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,176 @@
+import bisect
+import time
+
+# The stages of the pipeline timed by the agents and Hermes
+JSON_DECODE = "json_decode"
+FILE_FETCH = "file_fetch"
+FILTER = "filter"
+HERMES_FORWARD = "hermes_forward"
+WINDOW_QUERY = "window_query"
+RULE_EVALUATION = "rule_evaluation"
+SCORING = "scoring"
+MONGO_INSERT = "mongo_insert"
+UPLOAD = "upload"
+# The handling of a whole request, from receiving it to responding
+REQUEST = "request"
+
+# Counters
+RELEVANT_FILES = "relevant_files"
+IGNORED_FILES = "ignored_files"
+CORRELATIONS_FOUND = "correlations_found"
+EVENTS_PROCESSED = "events_processed"
+
+# Upper bounds of the histogram buckets: 1 us to about 2 minutes, four buckets per doubling
+BUCKET_BOUNDS = tuple(1e-6 * 2 ** (index / 4) for index in range(108))
+
+
+class LatencyHistogram:
+    """
+        A histogram of durations with fixed, exponentially growing buckets.
+
+        Observing a duration costs one binary search and two additions, so stages can be timed on
+        every request. Percentiles are estimated from the buckets, within about 10 %.
+    """
+
+    def __init__(self, bounds=BUCKET_BOUNDS):
+        self.bounds = bounds
+        # The last bucket takes everything above the largest bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        """Records a duration in seconds."""
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def percentile(self, fraction):
+        """
+        Estimates a percentile, interpolating geometrically within its bucket.
+
+        Args:
+            fraction (float): The percentile as fraction, e.g. 0.99.
+
+        Returns:
+            float: The estimated duration in seconds, 0.0 without observations.
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                upper = self.bounds[index]
+                lower = self.bounds[index - 1] if index else upper / 2 ** 0.25
+                return lower * (upper / lower) ** ((rank - seen) / count)
+            seen += count
+        return self.bounds[-1]
+
+    def snapshot(self):
+        """Returns count, sum, mean and the p50/p95/p99 estimates in seconds."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+        Per-stage latency histograms and counters of one agent, served by its /metrics endpoint.
+
+        Usage:
+            with metrics.time(FILE_FETCH):
+                file_details = await self.fetch_file_details(file_location)
+            metrics.increment(RELEVANT_FILES)
+    """
+
+    def __init__(self, agent):
+        """
+                Initializes empty metrics.
+
+                Args:
+                    agent (str): The name of the agent, the agent label of the exported metrics.
+        """
+        self.agent = agent
+        self.histograms = {}
+        self.counters = {}
+
+    def histogram(self, stage):
+        """Returns the histogram of a stage, creating it on first use."""
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        return histogram
+
+    def observe(self, stage, seconds):
+        """Records the duration of a stage in seconds."""
+        self.histogram(stage).observe(seconds)
+
+    def time(self, stage):
+        """Returns a context manager recording the duration of its block as the given stage."""
+        return _StageTimer(self.histogram(stage))
+
+    def increment(self, counter, amount=1):
+        """Adds to a counter."""
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def snapshot(self):
+        """
+        Returns the metrics as JSON-compatible dict.
+
+        Returns:
+            dict: The agent name, the histogram summaries by stage and the counters.
+        """
+        return {
+            "agent": self.agent,
+            "stages": {stage: histogram.snapshot() for stage, histogram in sorted(self.histograms.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def render(self):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: One stage_duration_seconds histogram per stage and one <counter>_total per counter.
+        """
+        agent = self.agent.replace("\\", "\\\\").replace('"', '\\"')
+        lines = [
+            "# HELP stage_duration_seconds Duration of a processing stage.",
+            "# TYPE stage_duration_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            labels = f'agent="{agent}",stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                lines.append(f'stage_duration_seconds_bucket{{{labels},le="{bound:.9g}"}} {cumulative}')
+            lines.append(f'stage_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"stage_duration_seconds_sum{{{labels}}} {histogram.sum:.9g}")
+            lines.append(f"stage_duration_seconds_count{{{labels}}} {histogram.count}")
+        for counter, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {counter}_total counter")
+            lines.append(f'{counter}_total{{agent="{agent}"}} {value}')
+        return "\n".join(lines) + "\n"
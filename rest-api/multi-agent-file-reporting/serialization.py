@@ -0,0 +1,279 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, TypedDict
+from fastapi.responses import JSONResponse
+from correlation_event import to_utc
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FileInfo(TypedDict, total=False):
+    """A FileInfo of a notifyFileReady notification."""
+    fileLocation: str
+    fileDataType: str
+    fileReadyTime: str
+    fileExpirationTime: str
+    fileSize: int
+    fileCompression: str
+    fileFormat: str
+    traceparent: str
+
+
+class NotifyFileReady(TypedDict, total=False):
+    """A notifyFileReady notification of the File Data Reporting service."""
+    href: str
+    notificationId: int
+    notificationType: str
+    eventTime: str
+    systemDN: str
+    fileInfoList: List[FileInfo]
+    additionalText: str
+
+
+class EventNotification(TypedDict, total=False):
+    """An entry of the eventNotifications of an anomaly event, as far as Hermes relies on it."""
+    event: str
+    expiry: str
+    timeStampGen: datetime
+    abnorBehavrs: List[Dict[str, Any]]
+
+
+def _default(value):
+    """Encodes what JSON has no type for: datetimes as ISO 8601, anything else (e.g. ObjectIds) as string."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _file_info_list(notification):
+    file_info_list = notification.get("fileInfoList") if isinstance(notification, dict) else None
+    if not file_info_list or not isinstance(file_info_list, list):
+        raise ValueError("Invalid fileInfoList structure")
+    return file_info_list
+
+
+def _event_list(documents):
+    if not isinstance(documents, list) or not all(isinstance(document, dict) for document in documents):
+        raise ValueError("Expected a list of events")
+    return documents
+
+
+def _utc_timestamps(document, parse=None):
+    """
+    Replaces the timeStampGen values of an event by timezone-aware UTC datetimes.
+
+    Every backend normalizes through to_utc, so naive timestamps are read as UTC whichever
+    backend decoded them, like the events read back from MongoDB.
+
+    Args:
+        document (dict): The decoded event.
+        parse (callable, optional): Parses a timestamp string, to_utc's fromisoformat if not given.
+    """
+    for notification in document.get("eventNotifications") or []:
+        if "timeStampGen" in notification:
+            timestamp = notification["timeStampGen"]
+            if parse is not None and isinstance(timestamp, str):
+                timestamp = parse(timestamp)
+            notification["timeStampGen"] = to_utc(timestamp)
+    return document
+
+
+class JsonBackend:
+    """The standard library json module."""
+    name = "json"
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, value):
+        return json.dumps(value, default=_default).encode()
+
+    def decode_file_info_list(self, data):
+        return _file_info_list(self.loads(data))
+
+    def decode_event(self, data):
+        return _utc_timestamps(self.loads(data))
+
+    def decode_events(self, data):
+        return [_utc_timestamps(document) for document in _event_list(self.loads(data))]
+
+
+class OrjsonBackend(JsonBackend):
+    """orjson, which encodes datetimes natively; it has no datetime decoding, timestamps go through to_utc."""
+    name = "orjson"
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, value):
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MsgspecBackend(JsonBackend):
+    """
+        msgspec, which validates notifications against their typed schema and parses the
+        timestamps of events with its native RFC 3339 parser.
+    """
+    name = "msgspec"
+
+    def __init__(self):
+        self._decoder = msgspec.json.Decoder()
+        self._notification_decoder = msgspec.json.Decoder(NotifyFileReady)
+        self._encoder = msgspec.json.Encoder(enc_hook=_default)
+
+    def loads(self, data):
+        return self._decoder.decode(data)
+
+    def dumps(self, value):
+        return self._encoder.encode(value)
+
+    def decode_file_info_list(self, data):
+        try:
+            notification = self._notification_decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+        return _file_info_list(notification)
+
+    def decode_event(self, data):
+        # The body is decoded once, untyped, so the event keeps all of its fields; only the
+        # timestamps of the result are converted
+        try:
+            document = self.loads(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+        return _utc_timestamps(document, self._parse_datetime)
+
+    def decode_events(self, data):
+        try:
+            documents = _event_list(self.loads(data))
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+        return [_utc_timestamps(document, self._parse_datetime) for document in documents]
+
+    @staticmethod
+    def _parse_datetime(value):
+        try:
+            return msgspec.convert(value, datetime)
+        except msgspec.ValidationError:
+            # ISO 8601 forms beyond RFC 3339, e.g. a space instead of the T
+            return datetime.fromisoformat(value)
+
+
+BACKENDS = {
+    "json": JsonBackend,
+    "orjson": OrjsonBackend,
+    "msgspec": MsgspecBackend,
+}
+
+
+def _available():
+    return {"json": True, "orjson": orjson is not None, "msgspec": msgspec is not None}
+
+
+def select_backend(name=None):
+    """
+    Selects the serializer used by the agents and Hermes.
+
+    Args:
+        name (str, optional): "msgspec", "orjson" or "json". Defaults to the SERIALIZATION_BACKEND
+            environment variable, otherwise the fastest installed backend; msgspec is preferred
+            since it also parses the timestamps of events natively.
+
+    Returns:
+        The selected backend.
+    """
+    global backend
+    name = name or os.environ.get("SERIALIZATION_BACKEND")
+    if name is None:
+        name = next(candidate for candidate in ("msgspec", "orjson", "json") if _available()[candidate])
+    elif name not in BACKENDS:
+        raise ValueError(f"Unknown serialization backend {name!r}, expected one of {sorted(BACKENDS)}")
+    elif not _available()[name]:
+        logger.warning(f"Serialization backend {name} is not installed, falling back to json")
+        name = "json"
+    backend = BACKENDS[name]()
+    return backend
+
+
+backend = None
+select_backend()
+
+
+def loads(data):
+    """Decodes JSON bytes or text."""
+    return backend.loads(data)
+
+
+def dumps(value):
+    """Encodes a value as JSON bytes; datetimes become ISO 8601 strings, ObjectIds strings."""
+    return backend.dumps(value)
+
+
+def dumps_str(value):
+    """Encodes a value as JSON text, e.g. as json_serialize of an aiohttp ClientSession."""
+    return backend.dumps(value).decode()
+
+
+def decode_file_info_list(data):
+    """
+    Decodes a notifyFileReady notification and returns its FileInfos.
+
+    Args:
+        data (bytes): The request body.
+
+    Returns:
+        list[dict]: The FileInfos.
+
+    Raises:
+        ValueError: If the body is no valid notification or has no FileInfos.
+    """
+    return backend.decode_file_info_list(data)
+
+
+def decode_event(data):
+    """
+    Decodes an anomaly event, with its timeStampGen values as timezone-aware UTC datetimes.
+
+    Args:
+        data (bytes): The request body.
+
+    Returns:
+        dict: The event document.
+    """
+    return backend.decode_event(data)
+
+
+def decode_events(data):
+    """
+    Decodes a batch of anomaly events, like decode_event.
+
+    Args:
+        data (bytes): The request body, a JSON array of events.
+
+    Returns:
+        list[dict]: The event documents.
+
+    Raises:
+        ValueError: If the body is no array of events.
+    """
+    return backend.decode_events(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """FastAPI response class encoding with the selected serializer."""
+
+    def render(self, content):
+        return dumps(content)
@@ -0,0 +1,195 @@
+import logging
+import math
+import numpy as np
+from geopy.distance import geodesic
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Mean earth radius (IUGG), the haversine distance is within ~0.5% of the geodesic one
+EARTH_RADIUS_KM = 6371.0088
+
+# Kilometres per degree of latitude
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """
+    Computes the great-circle distances from one point to many points in one vectorized pass.
+
+    Args:
+        latitude (float): Latitude of the point in degrees.
+        longitude (float): Longitude of the point in degrees.
+        latitudes (np.ndarray): Latitudes of the other points in degrees.
+        longitudes (np.ndarray): Longitudes of the other points in degrees.
+
+    Returns:
+        np.ndarray: The distances in kilometres.
+    """
+    lat1 = math.radians(latitude)
+    lat2 = np.radians(latitudes)
+    d_lat = lat2 - lat1
+    d_lon = np.radians(longitudes) - math.radians(longitude)
+    a = np.sin(d_lat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class CoordinateIndex:
+    """
+        The coordinates of the events in the correlation window, kept in NumPy arrays and bucketed
+        by a lat/lon grid.
+
+        Each event occupies a slot of the coordinate arrays; slots of removed events are reused.
+        A distance query only looks at the slots of the grid cells overlapping the query radius,
+        so events far away are pruned before any distance is computed.
+    """
+
+    def __init__(self, cell_degrees=0.1, capacity=1024):
+        """
+                Initializes an empty index.
+
+                Args:
+                    cell_degrees (float): Edge length of a grid cell in degrees (0.1° is ~11 km).
+                    capacity (int): Initial number of slots of the coordinate arrays.
+        """
+        self.cell_degrees = cell_degrees
+        self.latitudes = np.zeros(capacity)
+        self.longitudes = np.zeros(capacity)
+        self._keys = [None] * capacity
+        self._slots = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        # (lat cell, lon cell) -> set of slots
+        self._grid = {}
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def _cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def _grow(self):
+        capacity = len(self._keys)
+        self.latitudes = np.concatenate([self.latitudes, np.zeros(capacity)])
+        self.longitudes = np.concatenate([self.longitudes, np.zeros(capacity)])
+        self._keys.extend([None] * capacity)
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def add(self, key, latitude, longitude):
+        """
+        Adds or moves the coordinates of an event.
+
+        Args:
+            key: The event key.
+            latitude (float): Latitude in degrees.
+            longitude (float): Longitude in degrees.
+        """
+        if key in self._slots:
+            self.remove(key)
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        self.latitudes[slot] = latitude
+        self.longitudes[slot] = longitude
+        self._keys[slot] = key
+        self._slots[key] = slot
+        self._grid.setdefault(self._cell(latitude, longitude), set()).add(slot)
+
+    def remove(self, key):
+        """Removes the coordinates of an event, if it has any."""
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        cell = self._cell(self.latitudes[slot], self.longitudes[slot])
+        slots = self._grid[cell]
+        slots.discard(slot)
+        if not slots:
+            del self._grid[cell]
+        self._keys[slot] = None
+        self._free.append(slot)
+
+    def _slots_near(self, latitude, longitude, radius_km):
+        """Returns the slots in the grid cells overlapping the circle around the point."""
+        lat_span = radius_km / KM_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(abs(latitude) + lat_span, 90.0)))
+        lon_span = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+        if abs(longitude) + lon_span > 180.0:
+            # The circle crosses the antimeridian, only the latitude band prunes
+            lon_span = 180.0
+
+        lat_low, lon_low = self._cell(latitude - lat_span, longitude - lon_span)
+        lat_high, lon_high = self._cell(latitude + lat_span, longitude + lon_span)
+        cell_count = (lat_high - lat_low + 1) * (lon_high - lon_low + 1)
+
+        # Walking more cells than there are occupied ones does not pay off
+        if lon_span >= 180.0 or cell_count > len(self._grid):
+            near = [slot for (lat_cell, lon_cell), slots in self._grid.items()
+                    if lat_low <= lat_cell <= lat_high and (lon_span >= 180.0 or lon_low <= lon_cell <= lon_high)
+                    for slot in slots]
+        else:
+            near = []
+            for lat_cell in range(lat_low, lat_high + 1):
+                for lon_cell in range(lon_low, lon_high + 1):
+                    near.extend(self._grid.get((lat_cell, lon_cell), ()))
+        return np.fromiter(near, dtype=np.intp, count=len(near))
+
+    def within(self, latitude, longitude, radius_km, keys=None, exact_margin_km=None):
+        """
+        Returns the events within radius_km of a point, with their distances.
+
+        Distances are haversine distances. With exact_margin_km, distances within that margin of
+        the radius are recomputed with the exact geodesic distance, so events right at the
+        boundary are classified like geopy would.
+
+        Args:
+            latitude (float): Latitude of the point in degrees.
+            longitude (float): Longitude of the point in degrees.
+            radius_km (float): The search radius in kilometres.
+            keys (Iterable, optional): Only consider these events.
+            exact_margin_km (float, optional): Margin around the radius refined with geodesic.
+
+        Returns:
+            dict: The distance in kilometres by event key.
+        """
+        if keys is not None:
+            slots = [self._slots[key] for key in keys if key in self._slots]
+            # The grid only pays off if it prunes more than it costs
+            if len(slots) * 4 > len(self._slots):
+                slots = np.intersect1d(self._slots_near(latitude, longitude, radius_km),
+                                       np.asarray(slots, dtype=np.intp), assume_unique=True)
+            else:
+                slots = np.asarray(slots, dtype=np.intp)
+        else:
+            slots = self._slots_near(latitude, longitude, radius_km)
+        if not len(slots):
+            return {}
+
+        distances = haversine_km(latitude, longitude, self.latitudes[slots], self.longitudes[slots])
+        if exact_margin_km:
+            for index in np.flatnonzero(np.abs(distances - radius_km) <= exact_margin_km):
+                slot = slots[index]
+                distances[index] = geodesic((latitude, longitude),
+                                            (self.latitudes[slot], self.longitudes[slot])).kilometers
+
+        inside = np.flatnonzero(distances <= radius_km)
+        return {self._keys[slots[index]]: float(distances[index]) for index in inside}
+
+    def proximity_scores(self, latitude, longitude, threshold_km, keys=None, exact_margin_km=None):
+        """
+        Computes HermesAgent's proximity score, 1 - distance / threshold_km, for the events
+        closer than threshold_km. Events further away score 0 and are left out.
+
+        Args:
+            latitude (float): Latitude of the incoming event in degrees.
+            longitude (float): Longitude of the incoming event in degrees.
+            threshold_km (float): Distance at which the score drops to 0.
+            keys (Iterable, optional): Only score these events.
+            exact_margin_km (float, optional): See within.
+
+        Returns:
+            dict: The proximity score by event key.
+        """
+        distances = self.within(latitude, longitude, threshold_km, keys=keys, exact_margin_km=exact_margin_km)
+        return {key: max(0.0, 1 - distance / threshold_km) for key, distance in distances.items()}
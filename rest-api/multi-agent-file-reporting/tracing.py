@@ -0,0 +1,288 @@
+import logging
+import os
+import random
+import time
+from serialization import dumps
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The W3C trace context field carried by notifications, events and correlated files
+TRACEPARENT = "traceparent"
+
+# Environment variable naming the NDJSON file spans are exported to, shared with the REST API
+TRACE_EXPORT_PATH_VARIABLE = "TRACE_EXPORT_PATH"
+
+_random = random.Random()
+
+
+def parse_traceparent(traceparent):
+    """
+    Parses a W3C traceparent, e.g. 00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01.
+
+    Args:
+        traceparent (str): The traceparent value.
+
+    Returns:
+        tuple or None: The trace ID and the parent span ID as hex strings, None if the value is
+        missing or malformed.
+    """
+    if not isinstance(traceparent, str):
+        return None
+    parts = traceparent.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff" or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    trace_id, span_id = parts[1], parts[2]
+    try:
+        if not int(trace_id, 16) or not int(span_id, 16):
+            return None
+    except ValueError:
+        return None
+    return trace_id, span_id
+
+
+def new_trace_id():
+    return f"{_random.getrandbits(128) or 1:032x}"
+
+
+def new_span_id():
+    return f"{_random.getrandbits(64) or 1:016x}"
+
+
+class Span:
+    """
+        One timed step of the pipeline, e.g. Hermes correlating an event.
+
+        A span belongs to the trace of its parent, or starts a new trace without one. Its
+        traceparent is handed to the next hop, which makes its own spans children of this one.
+        Timestamps are wall-clock Unix nanoseconds, so spans of different processes line up.
+    """
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, tracer, name, trace_id, parent_span_id=None, start_ns=None, attributes=None):
+        """
+                Starts a span; use Tracer.start_span instead.
+
+                Args:
+                    tracer (Tracer): The tracer exporting the span once it ends.
+                    name (str): The name of the step.
+                    trace_id (str): The trace the span belongs to.
+                    parent_span_id (str, optional): The span this one is a child of.
+                    start_ns (int, optional): The start in Unix nanoseconds, defaults to now.
+                    attributes (dict, optional): Details of the step, e.g. the number of candidates.
+        """
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_span_id = parent_span_id
+        self.start_ns = time.time_ns() if start_ns is None else start_ns
+        self.end_ns = None
+        self.attributes = attributes or {}
+
+    @property
+    def traceparent(self):
+        """Returns the W3C traceparent making the next hop's spans children of this one."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, end_ns=None):
+        """Ends the span and exports it; ending it again has no effect."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns() if end_ns is None else end_ns
+        self.tracer.export(self)
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self):
+        """
+        Returns the exported form of the span.
+
+        Returns:
+            dict: The IDs, name, service, start and end in Unix nanoseconds, duration and attributes.
+            The timestamps are decimal strings like in OTLP's JSON encoding, so JavaScript readers
+            such as the REST API do not lose precision.
+        """
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "service": self.tracer.service,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "durationMs": self.duration_ms,
+            "attributes": self.attributes,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.attributes["error"] = repr(exc)
+        self.end()
+        return False
+
+
+class InMemorySpanCollector:
+    """
+        Keeps exported spans in memory, for benchmarks and tools running the pipeline in one process.
+    """
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span.to_dict())
+
+    def by_trace(self):
+        """
+        Groups the collected spans by trace.
+
+        Returns:
+            dict: The spans of every trace ID, ordered by their start.
+        """
+        traces = {}
+        for span in self.spans:
+            traces.setdefault(span["traceId"], []).append(span)
+        for spans in traces.values():
+            spans.sort(key=lambda span: int(span["startTimeUnixNano"]))
+        return traces
+
+    def clear(self):
+        self.spans.clear()
+
+    def close(self):
+        pass
+
+
+class FileSpanExporter:
+    """
+        Appends exported spans to a local NDJSON file, one span per line.
+
+        Spans are written in chunks of complete lines with a single unbuffered append each, so
+        several processes can export to the same file without interleaving their lines.
+    """
+
+    def __init__(self, path, max_buffered_spans=64, max_delay_seconds=1.0):
+        """
+                Initializes the exporter.
+
+                Args:
+                    path (str): The NDJSON file; it and its directory are created if missing.
+                    max_buffered_spans (int): Number of spans collected before they are written.
+                    max_delay_seconds (float): Spans are written at the latest with the first span
+                        exported this long after the oldest unwritten one.
+        """
+        self.path = path
+        self.max_buffered_spans = max_buffered_spans
+        self.max_delay_seconds = max_delay_seconds
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "ab", buffering=0)
+        self._lines = []
+        self._oldest = None
+
+    def export(self, span):
+        if not self._lines:
+            self._oldest = time.monotonic()
+        self._lines.append(dumps(span.to_dict()) + b"\n")
+        if len(self._lines) >= self.max_buffered_spans or time.monotonic() - self._oldest >= self.max_delay_seconds:
+            self.flush()
+
+    def flush(self):
+        """Writes the collected spans."""
+        if not self._lines:
+            return
+        lines, self._lines = self._lines, []
+        try:
+            self._file.write(b"".join(lines))
+        except OSError as e:
+            logger.error(f"Failed to export {len(lines)} spans to {self.path}: {e}")
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def span_exporter_from_env():
+    """Returns a FileSpanExporter if TRACE_EXPORT_PATH is set, otherwise None."""
+    path = os.environ.get(TRACE_EXPORT_PATH_VARIABLE)
+    return FileSpanExporter(path) if path else None
+
+
+class Tracer:
+    """
+        Starts the spans of one service and hands the ended ones to its exporter.
+
+        Without exporter, spans are still created so the trace context keeps flowing to the next
+        hop, they are only not recorded.
+
+        Usage:
+            with tracer.start_span("hermes.process_event", shared_data.get(TRACEPARENT)) as span:
+                ...
+                file_data[TRACEPARENT] = span.traceparent
+    """
+
+    def __init__(self, service, exporter=None):
+        """
+                Initializes the tracer.
+
+                Args:
+                    service (str): The name of the service, recorded on its spans.
+                    exporter (optional): Where ended spans go, a FileSpanExporter or
+                        InMemorySpanCollector. None does not record spans.
+        """
+        self.service = service
+        self.exporter = exporter
+        self.exported_spans = 0
+
+    @property
+    def recording(self):
+        """Whether ended spans are exported."""
+        return self.exporter is not None
+
+    def start_span(self, name, traceparent=None, start_ns=None, **attributes):
+        """
+        Starts a span.
+
+        Args:
+            name (str): The name of the step.
+            traceparent (str, optional): The trace context of the previous hop. A missing or
+                malformed one starts a new trace.
+            start_ns (int, optional): The start in Unix nanoseconds, defaults to now.
+            **attributes: Details of the step.
+
+        Returns:
+            Span: The started span; it is exported once ended.
+        """
+        parent = parse_traceparent(traceparent)
+        if parent is None:
+            return Span(self, name, new_trace_id(), start_ns=start_ns, attributes=attributes)
+        return Span(self, name, parent[0], parent[1], start_ns=start_ns, attributes=attributes)
+
+    def record_span(self, name, traceparent, start_ns, end_ns, **attributes):
+        """Exports a step that already ended, e.g. a bulk fetch shared by several traced files."""
+        span = self.start_span(name, traceparent, start_ns=start_ns, **attributes)
+        span.end(end_ns)
+        return span
+
+    def export(self, span):
+        if self.exporter is None:
+            return
+        try:
+            self.exporter.export(span)
+            self.exported_spans += 1
+        except Exception as e:
+            logger.error(f"Failed to export span {span.name}: {e}")
+
+    def close(self):
+        """Writes the remaining spans and closes the exporter."""
+        if self.exporter is not None:
+            self.exporter.close()
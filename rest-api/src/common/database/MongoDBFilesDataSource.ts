@@ -83,6 +83,30 @@ export default class MongoDBFilesDataSource implements FilesDataSource {
 		const fileDoc: FileDocument = file.toObject();
 		return fileDoc;
 	}
+	async getFiles(ids: string[]): Promise<FileDocument[]> {
+		// one query for the files and one for all of their fileInfos,
+		// however many IDs are requested
+		const files = await File.find({ _id: { $in: ids } })
+			.populate({
+				path: "fileInfo",
+				select: "-__v",
+			})
+			.select("-__v");
+		Logger.debug(`files: ${files.length} of ${ids.length} found`);
+
+		// $in does not keep the order of the IDs
+		const filesById = new Map<string, FileDocument>();
+		for (const file of files) {
+			const fileDoc: FileDocument = file.toObject();
+			filesById.set(fileDoc._id, fileDoc);
+		}
+		const fileDocs: FileDocument[] = [];
+		for (const id of new Set(ids.map((id) => id.toLowerCase()))) {
+			const fileDoc = filesById.get(id);
+			if (fileDoc && fileDoc.fileInfo) fileDocs.push(fileDoc);
+		}
+		return fileDocs;
+	}
 	async getFileInfo(filter: FilesGETQueryParams): Promise<IFileInfo[]> {
 		const fileInfos = await FileInfo.find({
 			fileDataType: filter["fileDataType"],
@@ -9,6 +9,7 @@ export interface FilesDataSource {
 	createFile(file: AddFile): Promise<FileDocument>;
 	createFiles(files: AddFile[]): Promise<FileDocument[]>;
 	getFile(id: string): Promise<FileDocument | null>;
+	getFiles(ids: string[]): Promise<FileDocument[]>;
 	getFileInfo(filterObj: FilesGETQueryParams): Promise<FileInfo[]>;
 	deleteFile(id: string): Promise<FileDocument | null>;
 }
@@ -19,6 +19,8 @@ export const FileInfoSchema = new Schema(
 			enum: ["Performance", "Trace", "Analytics", "Proprietary"],
 			required: true,
 		},
+		/** W3C trace context of the file's ingestion, carried on its notifications */
+		traceparent: String,
 	},
 	{
 		toObject: {
@@ -0,0 +1,306 @@
+import fs from "fs";
+import path from "path";
+import { randomBytes } from "crypto";
+import dotenv from "dotenv";
+import logger from "./logger";
+dotenv.config({ path: `.env.${process.env.NODE_ENV}` });
+
+const Logger = logger(__filename);
+
+/**
+ * A finished span, in the format the Python agents export as well,
+ * so the spans of one trace can be read from one NDJSON file.
+ * Timestamps are wall-clock Unix nanoseconds as decimal strings, like OTLP's JSON encoding:
+ * as numbers they would exceed Number.MAX_SAFE_INTEGER and lose precision.
+ */
+export type SpanData = {
+	traceId: string;
+	spanId: string;
+	parentSpanId: string | null;
+	name: string;
+	service: string;
+	startTimeUnixNano: string;
+	endTimeUnixNano: string;
+	durationMs: number;
+	attributes: Record<string, unknown>;
+};
+
+export interface SpanExporter {
+	export(span: SpanData): void;
+	close(): void;
+}
+
+const TRACEPARENT_PATTERN = /^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}/;
+
+/**
+ * Parses a W3C traceparent, e.g. 00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01
+ * @returns the trace ID and parent span ID, null if the value is missing or malformed
+ */
+export const parseTraceparent = (
+	traceparent?: string | null,
+): { traceId: string; spanId: string } | null => {
+	if (typeof traceparent !== "string") return null;
+	const match = TRACEPARENT_PATTERN.exec(traceparent.trim().toLowerCase());
+	if (!match || match[1] === "ff") return null;
+	if (/^0+$/.test(match[2]) || /^0+$/.test(match[3])) return null;
+	return { traceId: match[2], spanId: match[3] };
+};
+
+// the monotonic clock, anchored once to the wall clock at microsecond resolution
+const hrtimeOrigin = process.hrtime.bigint();
+const unixNanoOrigin =
+	BigInt(Math.round((performance.timeOrigin + performance.now()) * 1e3)) *
+	BigInt(1000);
+
+/**
+ * Current wall-clock time in Unix nanoseconds.
+ * A bigint, nanoseconds since the epoch are beyond Number.MAX_SAFE_INTEGER
+ */
+export const nowUnixNano = () =>
+	unixNanoOrigin + (process.hrtime.bigint() - hrtimeOrigin);
+
+export class Span {
+	traceId: string;
+	spanId: string;
+	parentSpanId: string | null;
+	name: string;
+	startTimeUnixNano: bigint;
+	endTimeUnixNano?: bigint;
+	attributes: Record<string, unknown>;
+	private tracer: Tracer;
+
+	constructor(
+		tracer: Tracer,
+		name: string,
+		traceparent?: string | null,
+		startTimeUnixNano?: bigint,
+		attributes: Record<string, unknown> = {},
+	) {
+		// a missing or malformed traceparent starts a new trace
+		const parent = parseTraceparent(traceparent);
+		this.tracer = tracer;
+		this.name = name;
+		this.traceId = parent ? parent.traceId : randomBytes(16).toString("hex");
+		this.spanId = randomBytes(8).toString("hex");
+		this.parentSpanId = parent ? parent.spanId : null;
+		this.startTimeUnixNano = startTimeUnixNano ?? nowUnixNano();
+		this.attributes = attributes;
+	}
+
+	/**
+	 * The W3C traceparent making the next hop's spans children of this one
+	 */
+	get traceparent() {
+		return `00-${this.traceId}-${this.spanId}-01`;
+	}
+
+	setAttribute = (key: string, value: unknown) => {
+		this.attributes[key] = value;
+	};
+
+	/**
+	 * Ends the span and exports it; ending it again has no effect
+	 */
+	end = (endTimeUnixNano?: bigint) => {
+		if (this.endTimeUnixNano !== undefined) return;
+		this.endTimeUnixNano = endTimeUnixNano ?? nowUnixNano();
+		this.tracer.export(this);
+	};
+
+	toJSON = (): SpanData => {
+		const endTimeUnixNano = this.endTimeUnixNano ?? nowUnixNano();
+		return {
+			traceId: this.traceId,
+			spanId: this.spanId,
+			parentSpanId: this.parentSpanId,
+			name: this.name,
+			service: this.tracer.service,
+			startTimeUnixNano: this.startTimeUnixNano.toString(),
+			endTimeUnixNano: endTimeUnixNano.toString(),
+			durationMs: Number(endTimeUnixNano - this.startTimeUnixNano) / 1e6,
+			attributes: this.attributes,
+		};
+	};
+}
+
+/**
+ * Keeps exported spans in memory, for tests and tools running in the same process
+ */
+export class InMemorySpanCollector implements SpanExporter {
+	spans: SpanData[] = [];
+
+	export = (span: SpanData) => {
+		this.spans.push(span);
+	};
+
+	clear = () => {
+		this.spans = [];
+	};
+
+	close = () => {};
+}
+
+/**
+ * Appends exported spans to a local NDJSON file, one span per line.
+ * Spans are collected and written in chunks of complete lines with one append each,
+ * so the Python agents can export to the same file without interleaving lines.
+ */
+export class FileSpanExporter implements SpanExporter {
+	private filePath: string;
+	private maxBufferedSpans: number;
+	private maxDelayMilliSeconds: number;
+	private lines: string[] = [];
+	private timer?: NodeJS.Timeout;
+
+	constructor(
+		filePath: string,
+		maxBufferedSpans: number = 64,
+		maxDelayMilliSeconds: number = 1000,
+	) {
+		this.filePath = filePath;
+		this.maxBufferedSpans = maxBufferedSpans;
+		this.maxDelayMilliSeconds = maxDelayMilliSeconds;
+		fs.mkdirSync(path.dirname(path.resolve(filePath)), { recursive: true });
+	}
+
+	export = (span: SpanData) => {
+		this.lines.push(JSON.stringify(span) + "\n");
+		if (this.lines.length >= this.maxBufferedSpans) {
+			this.flush();
+		} else if (!this.timer) {
+			this.timer = setTimeout(this.flush, this.maxDelayMilliSeconds);
+			// pending spans do not keep the process alive
+			this.timer.unref();
+		}
+	};
+
+	flush = () => {
+		if (this.timer) {
+			clearTimeout(this.timer);
+			this.timer = undefined;
+		}
+		if (!this.lines.length) return;
+		const chunk = this.lines.join("");
+		const count = this.lines.length;
+		this.lines = [];
+		fs.appendFile(this.filePath, chunk, (err) => {
+			if (err) {
+				Logger.error(
+					`failed to export ${count} spans to ${this.filePath}: ${err}`,
+				);
+			}
+		});
+	};
+
+	close = () => {
+		if (this.timer) {
+			clearTimeout(this.timer);
+			this.timer = undefined;
+		}
+		if (!this.lines.length) return;
+		fs.appendFileSync(this.filePath, this.lines.join(""));
+		this.lines = [];
+	};
+}
+
+export class Tracer {
+	service: string;
+	exporter?: SpanExporter;
+
+	/**
+	 * @param service name of the service, recorded on its spans
+	 * @param exporter where ended spans go. Without exporter spans are still created,
+	 * so the trace context keeps flowing to the next hop, but they are not recorded
+	 */
+	constructor(service: string, exporter?: SpanExporter) {
+		this.service = service;
+		this.exporter = exporter;
+	}
+
+	get recording() {
+		return this.exporter !== undefined;
+	}
+
+	startSpan = (
+		name: string,
+		traceparent?: string | null,
+		attributes: Record<string, unknown> = {},
+	) => {
+		return new Span(this, name, traceparent, undefined, attributes);
+	};
+
+	/**
+	 * Exports a step that already ended, e.g. the time a file info waited in a buffer
+	 */
+	recordSpan = (
+		name: string,
+		traceparent: string | null | undefined,
+		startTimeUnixNano: bigint,
+		endTimeUnixNano: bigint,
+		attributes: Record<string, unknown> = {},
+	) => {
+		const span = new Span(
+			this,
+			name,
+			traceparent,
+			startTimeUnixNano,
+			attributes,
+		);
+		span.end(endTimeUnixNano);
+		return span;
+	};
+
+	export = (span: Span) => {
+		if (!this.exporter) return;
+		try {
+			this.exporter.export(span.toJSON());
+		} catch (err) {
+			Logger.error(`failed to export span ${span.name}: ${err}`);
+		}
+	};
+
+	close = () => {
+		if (this.exporter) this.exporter.close();
+	};
+}
+
+/**
+ * The tracer of the File Data Reporting service.
+ * Spans are exported to the NDJSON file named by TRACE_EXPORT_PATH, if set
+ */
+const tracer = new Tracer(
+	"file-data-reporting",
+	process.env.TRACE_EXPORT_PATH
+		? new FileSpanExporter(process.env.TRACE_EXPORT_PATH)
+		: undefined,
+);
+// spans still waiting for their chunk are written on shutdown
+process.on("exit", tracer.close);
+
+/**
+ * Records a step of every traced file info, e.g. the notification that carried them
+ * @param startTimeUnixNano start of the step, the same for all file infos or one per file info
+ */
+export const recordFileInfoSpans = (
+	name: string,
+	fileInfos: { traceparent?: string }[],
+	startTimeUnixNano: bigint | bigint[],
+	endTimeUnixNano: bigint,
+	attributes: Record<string, unknown> = {},
+) => {
+	if (!tracer.recording) return;
+	fileInfos.forEach((fileInfo, index) => {
+		if (!fileInfo.traceparent) return;
+		tracer.recordSpan(
+			name,
+			fileInfo.traceparent,
+			Array.isArray(startTimeUnixNano)
+				? startTimeUnixNano[index]
+				: startTimeUnixNano,
+			endTimeUnixNano,
+			{ ...attributes },
+		);
+	});
+};
+
+export default tracer;
@@ -23,6 +23,13 @@ export interface paths {
 		/** Create many file reports */
 		post: operations["filesPOSTMany"];
 	};
+	"/files/retrieve_many": {
+		/**
+		 * Get many files by ID
+		 * @description The contents of several files are read with a single request. IDs that do not identify a file are skipped, the files are returned in the order of the request.
+		 */
+		post: operations["filesRetrieveMany"];
+	};
 	"/subscriptions": {
 		/**
 		 * Create a subscription
@@ -70,6 +77,8 @@ export interface components {
 			fileCompression?: string;
 			fileFormat?: string;
 			fileDataType: components["schemas"]["FileDataType"];
+			/** @description W3C trace context of the file's ingestion. Spans of the subscribers processing the file continue this trace. */
+			traceparent?: string;
 		};
 		NotifyFileReady: components["schemas"]["NotificationHeader"] &
 			components["schemas"]["NotifyFileReady_allOf"];
@@ -188,6 +197,8 @@ export interface components {
 			fileCompression?: string;
 			fileFormat?: string;
 			fileDataType: components["schemas"]["FileDataType"];
+			/** @description W3C trace context the file's ingestion continues, e.g. of the event a correlated file was generated for. A new trace is started without one. */
+			traceparent?: string;
 		};
 		FileInfoCreated: {
 			fileId: string;
@@ -369,6 +380,34 @@ export interface operations {
 			};
 		};
 	};
+	/**
+	 * Get many files by ID
+	 * @description The contents of several files are read with a single request. IDs that do not identify a file are skipped, the files are returned in the order of the request.
+	 */
+	filesRetrieveMany: {
+		requestBody: {
+			content: {
+				"application/json": string[];
+			};
+		};
+		responses: {
+			/** @description 'Success case ("200 OK"). The resources identified in the request for retrieval are returned in the response message body.' */
+			200: {
+				content: {
+					"application/json": {
+						fileInfo: components["schemas"]["FileInfo"];
+						[key: string]: unknown;
+					}[];
+				};
+			};
+			/** @description Error case. */
+			default: {
+				content: {
+					"application/json": components["schemas"]["ErrorResponse"];
+				};
+			};
+		};
+	};
 	/**
 	 * Create a subscription
 	 * @description To create a subscription the representation of the subscription is POSTed on the /subscriptions collection resource.
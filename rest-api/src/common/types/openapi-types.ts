@@ -38,6 +38,8 @@ export type Subscriber = Subscription & {
 
 export type FilesPOSTResponses = operations["filesPOST"]["responses"];
 export type FilesPOSTManyResponses = operations["filesPOSTMany"]["responses"];
+export type FilesRetrieveManyResponses =
+	operations["filesRetrieveMany"]["responses"];
 
 export type FilesDeleteResponses = operations["filesDELETE"]["responses"];
 
@@ -21,6 +21,14 @@ export default class FilesController {
 			this.filesService.filesGETById,
 		);
 	};
+	filesRetrieveMany = async (request, response) => {
+		await Controller.handleRequest(
+			request,
+			response,
+			this.filesService.filesRetrieveMany,
+		);
+	};
+
 	filesPOST = async (request, response) => {
 		await Controller.handleRequest(
 			request,
@@ -10,6 +10,11 @@ export default class FilesController {
 		res.sendStatus(400);
 	});
 
+	filesRetrieveMany = jest.fn(async (req, res) => {
+		console.log("filesRetrieveMany");
+		res.sendStatus(400);
+	});
+
 	filesPOST = jest.fn(async (req, res) => {
 		console.log("filesPOST");
 		res.sendStatus(400);
@@ -22,6 +22,7 @@ function FilesRouter(FilesController: FilesController) {
 	);
 	router.post("/files", FilesController.filesPOST);
 	router.post("/files/create_many", FilesController.filesPOSTMany);
+	router.post("/files/retrieve_many", FilesController.filesRetrieveMany);
 	router.delete(
 		"/files/:id",
 		checkValidIdMiddleware,
@@ -1,10 +1,13 @@
 import { FileInfo, NotifySubscriberData } from "../common/types/openapi-types";
 import logger from "../common/logger";
+import { nowUnixNano, recordFileInfoSpans } from "../common/tracing";
 const Logger = logger(__filename);
 
 type FileInfoBuffer = {
 	lastActivity: Date;
 	fileInfos: FileInfo[];
+	// when each of the fileInfos was buffered, in Unix nanoseconds
+	bufferedAt: bigint[];
 };
 
 class FileInfoBufferManager {
@@ -30,6 +33,7 @@ class FileInfoBufferManager {
 			this.fileInfoBuffers.set(subscriber, {
 				lastActivity: new Date(),
 				fileInfos: [fileInfo],
+				bufferedAt: [nowUnixNano()],
 			});
 
 			// Wait for x seconds before checking for inactivity
@@ -40,6 +44,7 @@ class FileInfoBufferManager {
 		}
 
 		fileInfoBuffer.fileInfos.push(fileInfo);
+		fileInfoBuffer.bufferedAt.push(nowUnixNano());
 		fileInfoBuffer.lastActivity = new Date();
 
 		// Check if buffer size has reached a certain limit
@@ -73,6 +78,18 @@ class FileInfoBufferManager {
 	private processNotification = (subscriber: string) => {
 		const fileInfoBuffer = this.fileInfoBuffers.get(subscriber);
 		if (fileInfoBuffer && fileInfoBuffer.fileInfos.length > 0) {
+			// how long each file info lingered in the buffer
+			recordFileInfoSpans(
+				"fdr.notification_buffer",
+				fileInfoBuffer.fileInfos,
+				fileInfoBuffer.bufferedAt,
+				nowUnixNano(),
+				{
+					subscriber,
+					bufferedFiles: fileInfoBuffer.fileInfos.length,
+				},
+			);
+
 			// build the request body
 			const data: NotifySubscriberData = {
 				url: subscriber,
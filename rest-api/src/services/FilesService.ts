@@ -4,6 +4,7 @@ import {
 	FilesGETQueryParams,
 	FilesGETResponses,
 	FilesPOSTManyResponses,
+	FilesRetrieveManyResponses,
 	FilesPOSTResponses,
 	FileInfo,
 	FilesDeleteResponses,
@@ -13,6 +14,7 @@ import { FilesDataSource } from "../common/database/interfaces/FilesDataSource";
 import NotificationsService from "./NotificationsService";
 import NotificationsServiceWithRetry from "./retryNotifications/NotificationsServiceWithRetry";
 import logger from "../common/logger";
+import tracer from "../common/tracing";
 
 const Logger = logger(__filename);
 
@@ -78,6 +80,24 @@ class FilesService {
 		}
 	};
 
+	filesRetrieveMany = async ({ body }) => {
+		const files = await this.filesDataSource.getFiles(body);
+		try {
+			const response: FilesRetrieveManyResponses["200"]["content"]["application/json"] =
+				files.map(this.formatFileResponse);
+			return Service.successResponse(response);
+		} catch (e) {
+			const errorResponse: FilesGETResponses["default"]["content"]["application/json"] =
+				{
+					error: {
+						// @ts-ignore
+						errorInfo: e.message,
+					},
+				};
+			return Service.rejectResponse(errorResponse.error, 400);
+		}
+	};
+
 	filesPOST = async ({ body }) => {
 		const file = body;
 		if (!file.fileContent || !file.fileDataType) {
@@ -96,7 +116,15 @@ class FilesService {
 				};
 			return Service.rejectResponse(errorResponse);
 		}
+		// the file's traceparent continues the trace of its producer, if it sent one,
+		// and is carried on the file's notifications
+		const span = tracer.startSpan("fdr.file_ingest", file.traceparent, {
+			fileDataType: file.fileDataType,
+		});
+		file.traceparent = span.traceparent;
 		const newFile = await this.filesDataSource.createFile(file);
+		span.setAttribute("fileId", String(newFile._id));
+		span.end();
 
 		// notify subscribers of new file
 		this.sendFileCreatedEvent(newFile);
@@ -123,7 +151,20 @@ class FilesService {
 
 	filesPOSTMany = async ({ body }) => {
 		const files = body;
+		const spans = files.map((file) =>
+			tracer.startSpan("fdr.file_ingest", file.traceparent, {
+				fileDataType: file.fileDataType,
+				files: files.length,
+			}),
+		);
+		files.forEach((file, index) => {
+			file.traceparent = spans[index].traceparent;
+		});
 		const newFiles = await this.filesDataSource.createFiles(files);
+		newFiles.forEach((file, index) => {
+			spans[index].setAttribute("fileId", String(file._id));
+			spans[index].end();
+		});
 
 		// notify subscribers of new files
 		for (const file of newFiles) {
@@ -3,6 +3,7 @@ import axios from "axios";
 import { NotifySubscriberData } from "../common/types/openapi-types";
 import FileInfoBufferManager from "../services/FileInfoBufferManager";
 import logger from "../common/logger";
+import { nowUnixNano, recordFileInfoSpans } from "../common/tracing";
 
 const Logger = logger(__filename);
 
@@ -26,13 +27,24 @@ export default class NotificationsService {
 	};
 
 	notifySubscriber = (data: NotifySubscriberData) => {
+		const sentAt = nowUnixNano();
+		const recordDelivery = (status?: number) =>
+			recordFileInfoSpans(
+				"fdr.notification_delivery",
+				data.body.fileInfoList,
+				sentAt,
+				nowUnixNano(),
+				{ subscriber: data.url, status },
+			);
 		axios
 			.post(data.url, data.body)
-			.then(() => {
+			.then((response) => {
+				recordDelivery(response.status);
 				Logger.info(`notified: ${data.url}`);
 				this.fileInfoBufferManager.deleteFileInfoBuffer(data.url);
 			})
 			.catch((err) => {
+				recordDelivery(err.response?.status);
 				Logger.error(`err notifying ${data.url}: ${err}`);
 				this.fileInfoBufferManager.deleteFileInfoBuffer(data.url);
 			});
@@ -341,7 +341,9 @@ class SubscriptionsService {
 							 * 	}
 							 * }
 							 */
-							return this.iterateFilters(filterVal, fileContent);
+							if (!this.iterateFilters(filterVal, fileContent))
+								return false;
+							continue;
 						}
 						default: {
 							if (filterVal !== fileInfo[key]) return false;
@@ -355,50 +357,59 @@ class SubscriptionsService {
 	};
 
 	/**
-	 * Iterate through Nested JavaScript Objects
-	 * https://stackoverflow.com/a/54272512
+	 * Partially match a filter against (nested) file content.
+	 *
+	 * Objects match if every key of the filter matches the file.
+	 * Arrays in the file are searched: the filter matches if any element
+	 * matches, so anomaly events can be filtered by their excepId:
+	 * filter: {
+	 * 	eventNotifications: {
+	 * 		abnorBehavrs: { excep: { excepId: "UNEXPECTED_RADIO_LINK_FAILURES" } },
+	 * 	},
+	 * }
+	 * file: {
+	 * 	eventNotifications: [
+	 * 		{ abnorBehavrs: [{ excep: { excepId: "UNEXPECTED_RADIO_LINK_FAILURES", ... } }] },
+	 * 	],
+	 * }
+	 * An array in the filter lists alternatives, any of which has to match:
+	 * excepId: ["UNEXPECTED_LONG_LIVE_FLOWS", "SUSPICION_OF_DDOS_ATTACK"]
+	 * The search stops at the first match.
 	 * @param filter
 	 * @param file
 	 * @returns
 	 */
 	iterateFilters = (filter, file) => {
-		const stack = [{ filter, file }];
-
-		while (stack?.length > 0) {
-			const currentObj = stack.pop();
-
-			if (!currentObj) return false;
-
-			for (const key of Object.keys(currentObj.filter)) {
-				/**
-				 * filter is more specific than file, return false
-				 * filter: {
-				 * 	host: "server_0",
-				 * 	another_value: "d"
-				 * }
-				 * file: {
-				 * 	host: "server_0"
-				 * }
-				 */
-				if (!currentObj.file[key]) return false;
-
-				if (
-					typeof currentObj.filter[key] === "object" &&
-					currentObj.filter[key] !== null
-				) {
-					stack.push({
-						filter: currentObj.filter[key],
-						file: currentObj.file[key],
-					});
-					continue;
-				}
+		/**
+		 * filter is more specific than file, return false
+		 * filter: {
+		 * 	host: "server_0",
+		 * 	another_value: "d"
+		 * }
+		 * file: {
+		 * 	host: "server_0"
+		 * }
+		 */
+		if (file === undefined || file === null) return false;
 
-				if (currentObj.filter[key] !== currentObj.file[key]) {
-					return false;
-				}
+		if (Array.isArray(file))
+			return file.some((element) => this.iterateFilters(filter, element));
+
+		if (Array.isArray(filter))
+			return filter.some((alternative) =>
+				this.iterateFilters(alternative, file)
+			);
+
+		if (typeof filter === "object" && filter !== null) {
+			if (typeof file !== "object") return false;
+
+			for (const key of Object.keys(filter)) {
+				if (!this.iterateFilters(filter[key], file[key])) return false;
 			}
+			return true;
 		}
-		return true;
+
+		return filter === file;
 	};
 }
 
@@ -4,12 +4,15 @@ import {
 	NotifySubscriberData,
 } from "../../common/types/openapi-types";
 import logger from "../../common/logger";
+import { nowUnixNano, recordFileInfoSpans } from "../../common/tracing";
 import { v4 as uuidv4 } from "uuid";
 const Logger = logger(__filename);
 
 export type FileInfoBuffer = {
 	lastActivity: Date;
 	fileInfos: FileInfo[];
+	// when each of the fileInfos was buffered, in Unix nanoseconds
+	bufferedAt: bigint[];
 	isInRetryTimeout: boolean;
 };
 
@@ -65,6 +68,7 @@ export class FileInfoBufferManager {
 			const newFileInfoBuffer: FileInfoBuffer = {
 				lastActivity: new Date(),
 				fileInfos: [fileInfo],
+				bufferedAt: [nowUnixNano()],
 				isInRetryTimeout: false,
 			};
 			const fileInfoBufferKey = uuidv4();
@@ -94,6 +98,7 @@ export class FileInfoBufferManager {
 			const newFileInfoBuffer: FileInfoBuffer = {
 				lastActivity: new Date(),
 				fileInfos: [fileInfo],
+				bufferedAt: [nowUnixNano()],
 				isInRetryTimeout: false,
 			};
 			// fileInfoBufferKey should not be a time string of when the buffer was created
@@ -117,6 +122,7 @@ export class FileInfoBufferManager {
 		}
 		const [fileInfoBufferKey, fileInfoBuffer] = fileInfoBufferTuple;
 		fileInfoBuffer.fileInfos.push(fileInfo);
+		fileInfoBuffer.bufferedAt.push(nowUnixNano());
 		fileInfoBuffer.lastActivity = new Date();
 
 		if (fileInfoBuffer.isInRetryTimeout) {
@@ -181,6 +187,18 @@ export class FileInfoBufferManager {
 		// so that the notification is only sent once
 		this.timeoutManager.clearFileInfoBufferTimeouts(fileInfoBufferKey);
 
+		// how long each file info lingered in the buffer before its notification is sent
+		recordFileInfoSpans(
+			"fdr.notification_buffer",
+			fileInfoBuffer.fileInfos,
+			fileInfoBuffer.bufferedAt,
+			nowUnixNano(),
+			{
+				subscriber,
+				bufferedFiles: fileInfoBuffer.fileInfos.length,
+			},
+		);
+
 		// build the request body
 		const data: NotifySubscriberData = {
 			url: subscriber,
@@ -1,6 +1,9 @@
 import { EventEmitter } from "node:events";
 import axios, { AxiosError } from "axios";
-import { NotifySubscriberData } from "../../common/types/openapi-types";
+import {
+	FileInfo,
+	NotifySubscriberData,
+} from "../../common/types/openapi-types";
 import {
 	FileInfoBuffer,
 	FileInfoBufferManager,
@@ -10,6 +13,7 @@ import {
 	SubscriberNotifyShouldRetryError,
 } from "../../common/types/customErrors";
 import logger from "../../common/logger";
+import { nowUnixNano, recordFileInfoSpans } from "../../common/tracing";
 
 const Logger = logger(__filename);
 
@@ -121,14 +125,25 @@ export default class NotificationsService {
 	) => {
 		return new Promise((resolve, reject) => {
 			Logger.debug(`Sending notification: ${url}`);
+			const sentAt = nowUnixNano();
+			const recordDelivery = (status?: number) =>
+				recordFileInfoSpans(
+					"fdr.notification_delivery",
+					(body.fileInfoList as FileInfo[]) || [],
+					sentAt,
+					nowUnixNano(),
+					{ subscriber: url, retryCount, status },
+				);
 			axios
 				.post(url, body, {
 					timeout: 10000,
 				})
-				.then(() => {
+				.then((response) => {
+					recordDelivery(response.status);
 					resolve({ url, fileInfoBufferKey });
 				})
 				.catch((err: AxiosError) => {
+					recordDelivery(err.response?.status);
 					if (
 						err.response &&
 						(err.response!.status === 408 ||